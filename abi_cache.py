@@ -0,0 +1,36 @@
+import json
+import marshal
+import os
+import sys
+
+# Compact cache of contract ABIs. A Truffle build artifact is mostly bytecode, source maps and
+# the AST; only its "abi" entry is needed at runtime. The ABI is stored once in marshal format
+# (fast to load, a fraction of the artifact's size) and reused as long as the artifact's
+# mtime and size and the Python version are unchanged.
+
+ABI_CACHE_DIR = '.abi_cache'
+
+def cache_path_for(artifact_path, cache_dir=ABI_CACHE_DIR):
+    return os.path.join(cache_dir, os.path.basename(artifact_path) + '.abi')
+
+# Function to get the ABI of a build artifact, from the cache when it is current
+def load_abi(artifact_path, cache_dir=ABI_CACHE_DIR):
+    stat = os.stat(artifact_path)
+    key = (os.path.abspath(artifact_path), stat.st_mtime_ns, stat.st_size, sys.implementation.cache_tag)
+    cache_path = cache_path_for(artifact_path, cache_dir)
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, abi = marshal.load(f)
+        if cached_key == key:
+            return abi
+    except (OSError, EOFError, ValueError, TypeError):
+        pass  # missing, stale or written by another Python version
+
+    with open(artifact_path) as f:
+        abi = json.load(f)['abi']
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        marshal.dump((key, abi), f)
+    os.replace(tmp_path, cache_path)
+    return abi
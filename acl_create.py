@@ -1,27 +1,37 @@
 import json
 import hashlib
 import random
+import sys
+import streaming
 
 student_did_li = []
 
+ACL_JSONL = 'acl.jsonl'
+PAYLOAD_JSONL = 'batch_verification_payload.jsonl'
+
+# Function to build the i-th ACL entry
+def make_acl_entry(i):
+    # Generate student DID in the format did:university:studentXXX
+    student_did = f"did:university:student{i+1}"  # DID format with incrementing student numbers
+    email = f"hr{i+1}@gmail.com".lower().strip()  # Generate employer email
+    hashed_email = hashlib.sha256(email.encode()).hexdigest()  # Hash the email
+
+    return {
+        "student_did": student_did,
+        "employer_hashed_email": hashed_email,
+        "expiration": 1687581600 + i * 1000,  # Example expiration times (incremented)
+        "isValid": True,
+        "statusListIndex": i  # bit of this grant in the revocation status list (status_list.py)
+    }
+
 # Function to generate ACL entries
 def generate_acl(num_entries):
     acl_list = []
 
     for i in range(num_entries):
-        # Generate student DID in the format did:university:studentXXX
-        student_did = f"did:university:student{i+1}"  # DID format with incrementing student numbers
-        email = f"hr{i+1}@gmail.com".lower().strip()  # Generate employer email
-        hashed_email = hashlib.sha256(email.encode()).hexdigest()  # Hash the email
-
-        acl_entry = {
-            "student_did": student_did,
-            "employer_hashed_email": hashed_email,
-            "expiration": 1687581600 + i * 1000,  # Example expiration times (incremented)
-            "isValid": True
-        }
+        acl_entry = make_acl_entry(i)
 
-        student_did_li.append(student_did)
+        student_did_li.append(acl_entry["student_did"])
         acl_list.append(acl_entry)
 
     # Save ACL entries to acl.json
@@ -49,9 +59,55 @@ def create_batch_verification_payload(num_entries):
 
     print(f"Batch verification payload with {num_entries} entries successfully created in batch_verification_payload.json.")
 
+# Worker function for the streaming mode: ACL and payload lines for entries [start, end)
+def acl_chunk_lines(bounds):
+    start, end = bounds
+    acl_lines = []
+    payload_lines = []
+    for i in range(start, end):
+        acl_entry = make_acl_entry(i)
+        acl_lines.append(streaming.dump_line(acl_entry))
+        payload_lines.append(streaming.dump_line({
+            "email": f"hr{i+1}@gmail.com".lower().strip(),
+            "student_did": acl_entry["student_did"]
+        }))
+    return acl_lines, payload_lines
+
+# Function to get the number of an entry from its DID (did:university:student<i+1>)
+def entry_number(record):
+    return int(record["student_did"].rsplit("student", 1)[1])
+
+# Function to get the number of complete entries in a JSON Lines file written by
+# generate_acl_stream
+def entry_count(path):
+    last_entry = streaming.resume_jsonl(path)
+    return entry_number(last_entry) if last_entry else 0
+
+# Function to generate ACL entries and the batch verification payload as JSON Lines.
+# Chunks are hashed in worker processes and appended as they finish, so memory stays flat.
+def generate_acl_stream(num_entries, workers=None):
+    # Continue after the entries that are in both files. Each chunk is appended to one file and
+    # then the other, so an interrupted run can leave one of them ahead, or a line cut short:
+    # those lines are dropped and written again.
+    paths = (ACL_JSONL, PAYLOAD_JSONL)
+    start = min(entry_count(path) for path in paths)
+    for path in paths:
+        streaming.truncate_jsonl(path, lambda record: entry_number(record) <= start)
+
+    for acl_lines, payload_lines in streaming.parallel_map(acl_chunk_lines, streaming.ranges(start, start + num_entries), workers):
+        streaming.append_lines(ACL_JSONL, acl_lines)
+        streaming.append_lines(PAYLOAD_JSONL, payload_lines)
+
+    print(f"{num_entries} ACL entries appended to {ACL_JSONL} and {PAYLOAD_JSONL}.")
+
 # Main function to run the program
 def main():
     num_entries = int(input("Enter the number of ACL entries to create: "))
+
+    # --stream writes JSON Lines incrementally using all CPU cores
+    if '--stream' in sys.argv:
+        generate_acl_stream(num_entries)
+        return
     
     # Generate ACL entries
     generate_acl(num_entries)
@@ -1,28 +1,88 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, g
 from web3 import Web3
 import json
-import random
 import hashlib
 import time
+import asyncio
+import contextlib
+import threading
+import tx_pipeline
+import schnorr_batch
+import schnorr_groups
+import merkle
+import credential_store
+import jobs
+import verify_cache
+import status_list
+import event_indexer
+import os
+import rpc
+import abi_cache
+from instrumentation import log, stage, profiled
+import instrumentation
 
 app = Flask(__name__)
 
 # Web3 setup
-w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:7545", request_kwargs={'timeout': 500}))
-contract_address = Web3.to_checksum_address('0x73Dd3842730b975613fB78AA8f6ad25f260a141a')  # Replace with your deployed contract address
+RPC_URL = "http://127.0.0.1:7545"
+w3 = Web3(rpc.PooledHTTPProvider(RPC_URL, timeout=500))
+contract_address = Web3.to_checksum_address(os.environ.get('CONTRACT_ADDRESS', '0x73Dd3842730b975613fB78AA8f6ad25f260a141a'))  # Replace with your deployed contract address
 
-# Load the contract ABI
-with open('e-transcript/build/contracts/SchnorrBatchVerification.json') as f:
-    contract_json = json.load(f)
-    contract_abi = contract_json['abi']
+# "debug" is SchnorrBatchVerification with its debug events, "lean" the gas-lean production
+# build SchnorrBatchVerificationLean (bytes32 hashes, packed per-DID storage)
+CONTRACT_VARIANT = os.environ.get('CONTRACT_VARIANT', 'debug')
+CONTRACT_ARTIFACTS = {
+    'debug': 'e-transcript/build/contracts/SchnorrBatchVerification.json',
+    'lean': 'e-transcript/build/contracts/SchnorrBatchVerificationLean.json',
+}
+
+# Load the contract ABI (from the compact cache, not the whole build artifact)
+contract_abi = abi_cache.load_abi(CONTRACT_ARTIFACTS[CONTRACT_VARIANT])
 
 contract = w3.eth.contract(address=contract_address, abi=contract_abi)
 
+# Function to check whether the loaded artifact has a contract function. Artifacts built
+# before a contract change lack the new functions until e-transcript/ is compiled again.
+def has_function(name):
+    return any(item.get('type') == 'function' and item.get('name') == name for item in contract_abi)
+
+# Function to get a contract function, with a clear error when the artifact predates it
+def contract_function(name):
+    if not has_function(name):
+        raise ValueError(
+            f"{CONTRACT_ARTIFACTS[CONTRACT_VARIANT]} has no {name}(), run truffle compile and truffle migrate in e-transcript/"
+        )
+    return getattr(contract.functions, name)
+
+# Function to get the contract's owner, the account its admin functions must be sent from
+def owner_account():
+    return contract_function('owner')().call()
+
+# Default /batch_verify mode: verifyBatch when the artifact has it, else one verify() per proof
+DEFAULT_MODE = 'batch' if has_function('verifyBatch') else 'loop'
+
+# Function to convert a student DID to the key the selected contract uses for it
+def did_key(student_did, variant=None):
+    if (variant or CONTRACT_VARIANT) == 'lean':
+        return Web3.keccak(text=student_did)
+    return student_did
+
+# Function to convert a proof tuple to the arguments of the selected contract. The lean
+# build takes keccak256 of the employer hash and DID and the raw SHA-256 digests of the VCs.
+def contract_proof(proof, variant=None):
+    if (variant or CONTRACT_VARIANT) != 'lean':
+        return proof
+    R, s, challenge, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_vc = proof
+    with stage('hash'):
+        return (
+            R, s, challenge, Web3.keccak(text=employer_hashed_email), bytes.fromhex(hashed_vc_from_vp),
+            Web3.keccak(text=student_did), bytes.fromhex(ipfs_vc)
+        )
 
 @app.route('/', methods=['GET'])
 def batch_ver_page():
     # Render the HTML form page for batch verification
-    return render_template('batch_ver.html')
+    return render_template('batch_ver.html', default_mode=DEFAULT_MODE)
 
 @app.route('/store', methods=['GET'])
 def store_did_page():
@@ -42,12 +102,12 @@ def store_did_to_index():
             student_index = int(index)  # Convert index from string to integer
 
             # Call the smart contract function to store DID and index
-            tx_hash = contract.functions.storeDidToIndex(student_did, student_index).transact({
+            tx_hash = contract.functions.storeDidToIndex(did_key(student_did), student_index).transact({
                 'from': w3.eth.accounts[4], 'gas': 200000000
             })
             # Wait for the transaction to be mined
             receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-            print(f"Stored DID: {student_did} with index: {student_index} on the blockchain")
+            log.debug("Stored DID: %s with index: %s on the blockchain", student_did, student_index)
 
         return jsonify({
             "status": "success",
@@ -60,102 +120,775 @@ def store_did_to_index():
             "message": str(e)
         })
 
-# Static variables for Schnorr proof
-G = 2  # Generator
-P = 23  # Prime modulus
-
-@app.route('/batch_verify', methods=['POST'])
-def batch_verify_from_form():
+@app.route('/anchor_credential_root', methods=['POST'])
+def anchor_credential_root():
     try:
-        # Get loop count from the form input
-        loop_count = int(request.form['loop_count'])
-        
-        # Load the necessary data from JSON files
-        with open('batch_verification_payload.json', 'r') as f:
-            students_data = json.load(f)['students']
-
-        with open('token.json', 'r') as f:
-            token_data = json.load(f)
-
-        with open('ipfs.json', 'r') as f:
-            ipfs_data = json.load(f)
+        # The tree is built by hash_vc.store_hashed_vcs; only its root is stored on-chain
+        with merkle.MerkleTree() as tree:
+            root, leaf_count = tree.root, tree.leaf_count
 
-        valid_students = []
-        total_gas_used = 0  # Initialize total gas counter
-        start_time = time.time()
+        tx_hash = contract_function('anchorCredentialRoot')(root, leaf_count).transact({
+            'from': owner_account()
+        })
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt['status'] != 1:
+            raise RuntimeError("anchorCredentialRoot failed")
+        log.info("Anchored Merkle root 0x%s over %s credentials. Gas used: %s", root.hex(), leaf_count, receipt['gasUsed'])
 
-        # Since there's only 1 student data, use the first student repeatedly
-        student = students_data[0]
+        return jsonify({
+            "status": "success",
+            "message": f"Merkle root over {leaf_count} credentials has been stored on the blockchain",
+            "root": "0x" + root.hex(),
+            "gas_used": receipt['gasUsed']
+        })
 
-        for i in range(loop_count):
-            student_did = student['student_did']
-            student_email = student['email']
-            
-            # Log the student DID for debugging
-            print(f"Starting verification for student_did={student_did}, student_email={student_email}")
-            
-            # Get the hashed VC from the IPFS data for this student
-            ipfs_vc = ipfs_data.get("0", {}).get('hashed_vc')
-            print(f"Retrieved ipfs_vc: {ipfs_vc}")
+    except Exception as e:
+        return jsonify({
+            "status": "failed",
+            "message": str(e)
+        })
 
-            if not ipfs_vc:
-                print(f"Error: No hashed VC found for student {student_did}")
-                continue
+@app.route('/credential_proof/<int:ipfs_index>', methods=['GET'])
+def credential_proof(ipfs_index):
+    try:
+        with open('ipfs.json', 'r') as f:
+            vc_data = json.load(f)[str(ipfs_index)]
 
-            # Perform Schnorr proof and VC verification for each iteration
-            hashed_email = hashlib.sha256(student_email.encode()).hexdigest()
-            r = random.randint(1, P-1)  # Random integer r in the range (1, P-1)
-            R = pow(G, r, P)  # Calculate R = g^r mod P
+        # Look up the inclusion proof in the on-disk tree and check it against the anchored root
+        with merkle.MerkleTree() as tree:
+            position = tree.position_of(ipfs_index)
+            if position is None:
+                return jsonify({"status": "failed", "message": f"Index {ipfs_index} is not in the Merkle tree"})
+            proof = tree.proof(position)
 
-            # Get challenge from the contract
-            challenge = contract.functions.getChallenge(R).call()
+        included = contract_function('verifyCredentialInclusion')(vc_data['student_did'], vc_data['hashed_vc'], proof).call()
+        return jsonify({
+            "status": "success",
+            "student_did": vc_data['student_did'],
+            "hashed_vc": vc_data['hashed_vc'],
+            "proof": ["0x" + sibling.hex() for sibling in proof],
+            "included": included
+        })
 
-            # Hash student's email to create the secret
-            hashed_secret = int(hashlib.sha256(student_email.encode()).hexdigest(), 16) % P
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Calculate s = (r + challenge * hashed_secret) mod (P-1)
-            s = (r + challenge * hashed_secret) % (P-1)
+PAYLOAD_FILE = 'batch_verification_payload.json'
+
+# Schnorr group of the proofs, see schnorr_groups.py. "toy" (G = 2, P = 23) is checked by
+# verify() and verifyBatch(); larger groups by verifyInGroup(), against the group stored with
+# the contract's setGroup().
+SCHNORR_GROUP = schnorr_groups.get_group(os.environ.get('SCHNORR_GROUP', schnorr_groups.DEFAULT_GROUP))
+G = SCHNORR_GROUP.g  # Generator
+P = SCHNORR_GROUP.p  # Prime modulus
+# Group argument of the schnorr_batch checks: None mirrors verify(), a group verifyInGroup()
+PROOF_GROUP = None if SCHNORR_GROUP.fits_uint256_products else SCHNORR_GROUP
+
+# Gas per proof assumed for verifyBatch chunks when eth_estimateGas fails. record.txt (47267)
+# measured reverted verify() calls; a passing verify() with its storage writes is about 216k.
+GAS_PER_PROOF = 250000
+# Proofs of the sample chunk whose verifyBatch gas is estimated to size the chunks
+GAS_ESTIMATE_SAMPLE = 16
+# Headroom on the estimated gas per proof, since later chunks may hold costlier proofs (e.g.
+# DIDs verified for the first time, whose flags are written)
+GAS_ESTIMATE_MARGIN = 1.5
+# Fraction of the block gas limit a single verifyBatch transaction may use
+BLOCK_GAS_FRACTION = 0.9
+# Number of verify() transactions the pipelined mode keeps in flight
+PIPELINE_WINDOW = 32
+
+# Function to create the random commitment r, R = g^r mod P of a Schnorr proof. g^r comes
+# from the group's fixed-base table, which is built once and shared by all requests.
+def generate_commitment():
+    return SCHNORR_GROUP.commitment()
+
+# Function to get the contract call returning the challenge for commitment R
+def challenge_call(R):
+    if PROOF_GROUP:
+        return contract_function('getChallengeInGroup')(SCHNORR_GROUP.to_bytes(R))
+    return contract.functions.getChallenge(R)
+
+# Function to get the name and arguments of the contract function verifying one proof
+def verify_call(proof):
+    R, s, challenge, employer_arg, vp_arg, did_arg, ipfs_arg = contract_proof(proof)
+    if PROOF_GROUP:
+        return 'verifyInGroup', [SCHNORR_GROUP.to_bytes(R), s, challenge, employer_arg, vp_arg, did_arg, ipfs_arg]
+    return 'verify', [R, s, G, P, challenge, employer_arg, vp_arg, did_arg, ipfs_arg]
+
+# Function to finish a Schnorr proof once the contract's challenge for R is known
+def generate_proof(r, R, challenge, student_did, student_email, employer_hashed_email, hashed_vc_from_vp, ipfs_vc):
+    # Hash student's email to create the secret
+    with stage('hash'):
+        hashed_secret = int(hashlib.sha256(student_email.encode()).hexdigest(), 16) % SCHNORR_GROUP.q
+
+    # Calculate s = (r + challenge * hashed_secret) mod q (q = P - 1 for the toy group)
+    s = (r + challenge * hashed_secret) % SCHNORR_GROUP.q
+
+    # Same field order as the Proof struct of the contract
+    return (R, s, challenge, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_vc)
+
+# Function to log the outcome of one verify() transaction and return its gas
+def log_verify_receipt(i, student_did, receipt):
+    # Log if the transaction succeeded or failed
+    if receipt['status'] == 1:
+        log.debug("Transaction succeeded for student_did=%s", student_did)
+    else:
+        log.debug("Transaction failed for student_did=%s, iteration=%s. Gas used: %s", student_did, i + 1, receipt['gasUsed'])
+
+    # Log the gas used for each iteration
+    log.debug("Gas used for iteration %s: %s", i + 1, receipt['gasUsed'])
+    return receipt['gasUsed']
+
+# The verify functions below call on_result(i, passed, gas_used) once per proof if it is given;
+# gas_used is None when the proof shared a verifyBatch transaction with others
+
+# Function to verify proofs with one verify() transaction each
+def verify_proofs_loop(proofs, on_result=None):
+    total_gas_used = 0
+    for i, proof in enumerate(proofs):
+        R, s, challenge, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_vc = proof
+
+        # Log values to check
+        log.debug("R: %s, s: %s, G: %s, P: %s, challenge: %s, employer_hashed_email: %s", R, s, G, P, challenge, employer_hashed_email)
+
+        # Call the unified verification function on the blockchain (Schnorr + VC verification)
+        function_name, args = verify_call(proof)
+        with stage('tx_submit'):
+            tx_hash = contract.functions[function_name](*args).transact({'from': w3.eth.accounts[3], 'gas': 200000000})
+
+        # Wait for the transaction receipt
+        with stage('receipt_wait'):
+            receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        total_gas_used += log_verify_receipt(i, student_did, receipt)
+        if on_result:
+            on_result(i, receipt['status'] == 1, receipt['gasUsed'])
+
+    return total_gas_used
+
+# Function to verify proofs with one verify() transaction each, keeping up to `window`
+# transactions in flight instead of waiting for every receipt before sending the next one
+def verify_proofs_pipelined(proofs, window=PIPELINE_WINDOW, on_result=None):
+    payloads = [contract.encode_abi(function_name, args=args) for function_name, args in map(verify_call, proofs)]
+    with stage('tx_pipeline'):
+        receipts = asyncio.run(tx_pipeline.send_pipelined(
+            RPC_URL, w3.eth.accounts[3], contract_address, payloads, gas=200000000, window=window
+        ))
+
+    total_gas_used = 0
+    for i, (proof, receipt) in enumerate(zip(proofs, receipts)):
+        total_gas_used += log_verify_receipt(i, proof[5], receipt)
+        if on_result:
+            on_result(i, receipt['status'] == 1, receipt['gasUsed'])
+    return total_gas_used
+
+# Function to verify proofs with one verify() transaction each, sent back to back without
+# waiting for receipts. Only the last receipt is fetched; the outcomes (what verify()
+# returned, not just whether the transaction reverted) are then read from the event index.
+# Returns the passed flags; gas is not known without the receipts.
+def verify_proofs_indexed(proofs, on_result=None):
+    payloads = [contract.encode_abi(function_name, args=args) for function_name, args in map(verify_call, proofs)]
+    with stage('tx_submit'):
+        tx_hashes = asyncio.run(tx_pipeline.send_all(RPC_URL, w3.eth.accounts[3], contract_address, payloads, gas=200000000))
+    if not tx_hashes:
+        return []
+
+    # Transactions from one sender are mined in nonce order, so the last receipt covers all
+    with stage('receipt_wait'):
+        last_receipt = w3.eth.wait_for_transaction_receipt(tx_hashes[-1])
+    indexer = get_indexer()
+    with stage('event_index'):
+        indexer.sync(last_receipt['blockNumber'])
+    outcomes = indexer.outcomes(tx_hashes)
+
+    results = []
+    for i, tx_hash in enumerate(tx_hashes):
+        # No outcome logged: the transaction reverted
+        outcome = outcomes.get(event_indexer.hex_hash(tx_hash))
+        results.append(bool(outcome and outcome['passed']))
+        if on_result:
+            on_result(i, results[-1], None)
+    return results
+
+# Function to work out how many proofs fit into one verifyBatch transaction, from the gas
+# eth_estimateGas reports for a sample chunk of the proofs. Returns the chunk size and the gas
+# limit of a chunk transaction.
+def batch_chunk_size(proofs):
+    gas_limit = w3.eth.get_block('latest')['gasLimit']
+    chunk_gas = int(gas_limit * BLOCK_GAS_FRACTION)
+    sample = [contract_proof(proof) for proof in proofs[:GAS_ESTIMATE_SAMPLE]]
+    gas_per_proof = GAS_PER_PROOF
+    if sample:
+        try:
+            estimate = contract_function('verifyBatch')(sample, G, P).estimate_gas({'from': w3.eth.accounts[3]})
+            gas_per_proof = int(estimate / len(sample) * GAS_ESTIMATE_MARGIN)
+        except Exception as e:
+            log.warning("Could not estimate verifyBatch gas, assuming %s per proof: %s", GAS_PER_PROOF, e)
+    return max(1, chunk_gas // gas_per_proof), chunk_gas
+
+# Function to verify proofs with verifyBatch, split into chunks that fit the block gas limit.
+# A chunk that runs out of gas anyway is split in half and sent again.
+# Returns the total gas used and one pass/fail flag per proof.
+def verify_proofs_batch(proofs, on_result=None):
+    chunk_size, chunk_gas = batch_chunk_size(proofs)
+    total_gas_used = 0
+    results = [False] * len(proofs)
+    pending = [(start, min(start + chunk_size, len(proofs))) for start in range(0, len(proofs), chunk_size)]
+    pending.reverse()  # popped from the end, so chunks go out in order
+
+    while pending:
+        start, end = pending.pop()
+        batch = [contract_proof(proof) for proof in proofs[start:end]]
+        with stage('tx_submit'):
+            tx_hash = contract_function('verifyBatch')(batch, G, P).transact({
+                'from': w3.eth.accounts[3], 'gas': chunk_gas
+            })
+        with stage('receipt_wait'):
+            receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        total_gas_used += receipt['gasUsed']
+
+        if receipt['status'] != 1 and receipt['gasUsed'] >= chunk_gas and end - start > 1:
+            middle = (start + end) // 2
+            log.info("Batch transaction for proofs %s-%s ran out of gas, splitting it", start + 1, end)
+            pending.extend([(middle, end), (start, middle)])
+            continue
+
+        if receipt['status'] != 1:
+            log.info("Batch transaction failed for proofs %s-%s. Gas used: %s", start + 1, end, receipt['gasUsed'])
+            chunk_results = [False] * (end - start)
+        else:
+            # Decode the per-item pass/fail bitmap from the BatchVerification event
+            event = contract.events.BatchVerification().process_receipt(receipt)[0]
+            bitmap = event['args']['bitmap']
+            chunk_results = [bool((bitmap[j // 256] >> (j % 256)) & 1) for j in range(end - start)]
+            log.debug("Batch for proofs %s-%s: %s passed. Gas used: %s", start + 1, end, event['args']['passed'], receipt['gasUsed'])
+
+        results[start:end] = chunk_results
+        if on_result:
+            for j, passed in enumerate(chunk_results):
+                on_result(start + j, passed, None)
+
+    return total_gas_used, results
+
+# Payload of students to verify, re-read only when the file changes
+_students_cache = {"stat": None, "students": []}
+
+def load_students():
+    with stage('file_load'):
+        stat = os.stat(PAYLOAD_FILE)
+        if _students_cache["stat"] != (stat.st_mtime_ns, stat.st_size):
+            with open(PAYLOAD_FILE, 'r') as f:
+                _students_cache["students"] = json.load(f)['students']
+            _students_cache["stat"] = (stat.st_mtime_ns, stat.st_size)
+    return _students_cache["students"]
+
+# Function to build loop_count proofs, cycling through the students of the payload.
+# Each distinct student costs one credential store lookup. Returns the proofs and their
+# iteration numbers (students without credential data are skipped).
+def build_proofs(students_data, loop_count):
+    with stage('file_load'):
+        store = credential_store.get_store()
+    records = {}
+    pending = []
+    iterations = []
+
+    for i in range(loop_count):
+        student = students_data[i % len(students_data)]
+        student_did = student['student_did']
+
+        if student_did not in records:
+            # Log the student DID for debugging
+            log.debug("Starting verification for student_did=%s, student_email=%s", student_did, student['email'])
+            with stage('credential_lookup'):
+                records[student_did] = store.get(student_did)
+
+        record = records[student_did]
+        if not record or not record['hashed_vc'] or not record['vp_hashed_vc']:
+            log.warning("No hashed VC found for student %s", student_did)
+            continue
+
+        pending.append((generate_commitment(), student_did, student['email'], record))
+        iterations.append(i + 1)
+
+    # Get the challenges for all commitments from the contract in a few batched requests
+    with stage('get_challenge'):
+        challenges = rpc.batch_calls(w3, [challenge_call(R) for (r, R), *_ in pending])
+
+    proofs = [
+        generate_proof(r, R, challenge, student_did, student_email, record['employer_hashed_email'], record['vp_hashed_vc'], record['hashed_vc'])
+        for ((r, R), student_did, student_email, record), challenge in zip(pending, challenges)
+    ]
+    return proofs, iterations
+
+# Function to run the off-chain batch Schnorr check and keep only the proofs that pass it.
+# Returns the kept proofs, their iteration numbers and how many were rejected.
+def precheck_proofs(proofs, iterations):
+    # verify() skips the Schnorr check for DIDs that already passed it, before or during the
+    # run; proofs that set the flag are kept even when they fail, as later ones depend on it
+    dids = sorted({proof[5] for proof in proofs})
+    flags = rpc.batch_calls(w3, [contract.functions.schnorrProofVerified(did_key(did)) for did in dids])
+    verified_dids = {did for did, verified in zip(dids, flags) if verified}
+    invalid = set(schnorr_batch.find_invalid(proofs, G, P, verified_dids, group=PROOF_GROUP, keep_flag_setters=True))
+    log.info("Off-chain pre-check rejected %s of %s proofs", len(invalid), len(proofs))
+
+    kept = [i for i in range(len(proofs)) if i not in invalid]
+    return [proofs[i] for i in kept], [iterations[i] for i in kept], len(invalid)
+
+# Successful verifications, answered again without a transaction while the ACL entry is valid
+verification_cache = verify_cache.VerificationCache(int(os.environ.get('VERIFY_CACHE_SIZE', verify_cache.MAX_ENTRIES)))
+
+# Cache key of a proof: the credential it proves for an employer, on the current contract
+def cache_key(proof):
+    R, s, challenge, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_vc = proof
+    return (contract_address, student_did, employer_hashed_email, ipfs_vc)
+
+# ACL state a cached result depends on; the entry is dropped when this changes
+def cache_state(record):
+    return (record['expiration'], record['is_valid'], record['vp_hashed_vc'])
+
+# Function to look up the credential records of the DIDs of a set of proofs
+def proof_records(proofs):
+    with stage('credential_lookup'):
+        store = credential_store.get_store()
+        return {student_did: store.get(student_did) for student_did in {proof[5] for proof in proofs}}
+
+# Function to split proofs into those answered by the verification cache and those that
+# still need a transaction. Returns the cached (proof, iteration) pairs and the remaining
+# proofs and iterations.
+def split_cached(proofs, iterations, records):
+    cached, remaining, remaining_iterations = [], [], []
+    for proof, iteration in zip(proofs, iterations):
+        if verification_cache.get(cache_key(proof), cache_state(records[proof[5]])):
+            cached.append((proof, iteration))
+        else:
+            remaining.append(proof)
+            remaining_iterations.append(iteration)
+    return cached, remaining, remaining_iterations
+
+# Revocation status list, re-read only when the file changes
+_status_cache = {"stat": None, "status": status_list.StatusList()}
+_status_lock = threading.Lock()
+
+def load_status_list():
+    with stage('file_load'):
+        if not os.path.exists(status_list.STATUS_LIST_FILE):
+            return status_list.StatusList()
+        stat = os.stat(status_list.STATUS_LIST_FILE)
+        if _status_cache["stat"] != (stat.st_mtime_ns, stat.st_size):
+            _status_cache["status"] = status_list.StatusList.load()
+            _status_cache["stat"] = (stat.st_mtime_ns, stat.st_size)
+    return _status_cache["status"]
+
+# Function to drop proofs whose ACL grant is revoked, with one bit lookup per proof.
+# Returns the kept proofs and iterations and the revoked (proof, iteration) pairs.
+def drop_revoked(proofs, iterations, records):
+    status = load_status_list()
+    kept, kept_iterations, revoked = [], [], []
+    for proof, iteration in zip(proofs, iterations):
+        if status.is_revoked(status_list.status_index(records[proof[5]])):
+            revoked.append((proof, iteration))
+        else:
+            kept.append(proof)
+            kept_iterations.append(iteration)
+    return kept, kept_iterations, revoked
+
+# Number of status list words written by one setRevocationWords transaction
+REVOCATION_WORDS_PER_TX = 200
+
+# Function to write words of the status list to the contract. Returns the gas used.
+def publish_status_words(status, word_indexes):
+    total_gas_used = 0
+    for start in range(0, len(word_indexes), REVOCATION_WORDS_PER_TX):
+        chunk = word_indexes[start:start + REVOCATION_WORDS_PER_TX]
+        with stage('tx_submit'):
+            tx_hash = contract_function('setRevocationWords')(chunk, [status.word(word) for word in chunk]).transact({
+                'from': owner_account()
+            })
+        with stage('receipt_wait'):
+            receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt['status'] != 1:
+            raise RuntimeError(f"setRevocationWords failed for words {chunk[0]}-{chunk[-1]}")
+        total_gas_used += receipt['gasUsed']
+    return total_gas_used
+
+# Function to read and check the /batch_verify parameters from a form or JSON body
+def batch_verify_params(data):
+    mode = data.get('mode') or DEFAULT_MODE
+    if mode not in ('batch', 'loop', 'pipelined', 'indexed'):
+        raise ValueError(f"Unknown mode: {mode}")
+    for function_name in ((['verifyBatch'] if mode == 'batch' else []) + (['verifyInGroup'] if PROOF_GROUP else [])):
+        contract_function(function_name)  # fail before any proof is built
+    if mode == 'batch' and PROOF_GROUP:
+        raise ValueError(f"verifyBatch only supports the toy group, use loop or pipelined mode for {SCHNORR_GROUP.name}")
+    if mode == 'indexed' and CONTRACT_VARIANT == 'lean':
+        raise ValueError("The lean contract logs no per-proof events, indexed mode needs the debug build")
+    window = int(data.get('window') or PIPELINE_WINDOW)
+    if window < 1:
+        raise ValueError(f"window must be at least 1, got {window}")
+    return {
+        "loop_count": int(data['loop_count']),
+        # "batch" uses verifyBatch, "loop" sends one verify() transaction per proof,
+        # "pipelined" does the same but with many transactions in flight, "indexed" sends them
+        # all and reads the outcomes from the event index
+        "mode": mode,
+        "window": window,
+        "precheck": bool(data.get('precheck')),
+        "use_cache": not data.get('no_cache'),
+        "profile": bool(data.get('profile')),
+    }
+
+# Job runner for batch verification: reports every proof's result to the job as it comes in
+# and returns what batch_result.html shows
+def run_batch_verification(params, progress):
+    valid_students = []
+    start_time = time.time()
+
+    proofs, iterations = build_proofs(load_students(), params['loop_count'])
+
+    records = proof_records(proofs)
+
+    # Grants revoked in the status list fail without a transaction
+    proofs, iterations, revoked = drop_revoked(proofs, iterations, records)
+
+    # Credentials verified before are answered from the cache, without gas
+    cached = []
+    if params.get('use_cache', True):
+        cached, proofs, iterations = split_cached(proofs, iterations, records)
+
+    # Optionally drop proofs the contract would reject before paying gas for them
+    rejected_count = 0
+    if params['precheck']:
+        proofs, iterations, rejected_count = precheck_proofs(proofs, iterations)
+    progress.set_total(len(revoked) + len(cached) + len(proofs))
+
+    for proof, iteration in revoked:
+        progress.add_result({"student_did": proof[5], "loop_iteration": iteration, "passed": False, "gas_used": 0, "revoked": True})
+        instrumentation.PROOFS.labels('status_list', 'revoked').inc()
+
+    for proof, iteration in cached:
+        progress.add_result({"student_did": proof[5], "loop_iteration": iteration, "passed": True, "gas_used": 0, "cached": True})
+        instrumentation.PROOFS.labels('cache', 'passed').inc()
+        valid_students.append({"student_did": proof[5], "status": "verified (cached)", "loop_iteration": iteration})
+
+    def on_result(i, passed, gas_used):
+        progress.add_result({
+            "student_did": proofs[i][5], "loop_iteration": iterations[i], "passed": passed, "gas_used": gas_used
+        })
+        instrumentation.PROOFS.labels(params['mode'], 'passed' if passed else 'failed').inc()
+        # A mined verify() transaction may still have returned false, so for the receipt-based
+        # per-proof modes only results the off-chain mirror of verify() agrees with are cached
+        if passed and (params['mode'] in ('batch', 'indexed') or schnorr_batch.verify_proof(proofs[i], G, P, group=PROOF_GROUP)):
+            record = records[proofs[i][5]]
+            verification_cache.put(cache_key(proofs[i]), cache_state(record), record['expiration'], record['is_valid'])
+
+    if params['mode'] == 'loop':
+        total_gas_used = verify_proofs_loop(proofs, on_result)
+    elif params['mode'] == 'pipelined':
+        total_gas_used = verify_proofs_pipelined(proofs, params['window'], on_result)
+    else:
+        if params['mode'] == 'indexed':
+            total_gas_used, results = None, verify_proofs_indexed(proofs, on_result)
+        else:
+            total_gas_used, results = verify_proofs_batch(proofs, on_result)
+        for proof, iteration, passed in zip(proofs, iterations, results):
+            if passed:
+                valid_students.append({"student_did": proof[5], "status": "verified", "loop_iteration": iteration})
+
+    if total_gas_used is not None:
+        instrumentation.GAS_USED.labels(params['mode']).inc(total_gas_used)
+
+    # Measure the total time taken for the batch verification process
+    verification_time = time.time() - start_time
+
+    return {
+        "valid_students": valid_students,
+        "verification_time": verification_time,
+        "loop_count": params['loop_count'],
+        "total_gas_used": total_gas_used,
+        "rejected_count": rejected_count,
+        "cached_count": len(cached),
+        "revoked_count": len(revoked),
+    }
+
+# Function to run a job under the sampling profiler when it was submitted with profile=1
+def profiled_runner(name, runner):
+    def run(params, progress):
+        if not params.get('profile'):
+            return runner(params, progress)
+        with profiled(name):
+            return runner(params, progress)
+    return run
+
+JOB_RUNNERS = {"batch_verify": profiled_runner("batch_verify", run_batch_verification)}
+SSE_POLL_INTERVAL = 0.5  # seconds between checks for new results of a streamed job
+SSE_KEEPALIVE = 15  # seconds between keep-alive comments, so proxies keep the stream open
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+# Whether the job manager takes over the jobs of processes that are gone when it starts
+JOB_RECOVERY = True
+
+# Function to get the job manager, started on first use (not in the reloader's parent process)
+def get_jobs():
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = jobs.JobManager(JOB_RUNNERS, recover=JOB_RECOVERY)
+    return _job_manager
+
+_event_indexer = None
+_event_indexer_lock = threading.Lock()
+
+# Function to get the event index of the contract, opened on first use
+def get_indexer():
+    global _event_indexer
+    with _event_indexer_lock:
+        if _event_indexer is None:
+            _event_indexer = event_indexer.EventIndexer(
+                w3, contract, start_block=int(os.environ.get('INDEXER_START_BLOCK', 0))
+            )
+    return _event_indexer
+
+# Function to turn a job into its status response
+def job_status(job):
+    return {
+        "status": "success",
+        "job_id": job['job_id'],
+        "job_status": job['status'],
+        "done": job['done'],
+        "total": job['total'],
+        "summary": job['summary'],
+        "error": job['error'],
+    }
+
+def sse_event(event, data, event_id=None):
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return lines + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Stage timings and counters in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return instrumentation.metrics_response()
+
+# With PROFILE_REQUESTS=1, a request with ?profile=1 is run under the sampling profiler
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') == '1'
+
+@app.before_request
+def start_request_profile():
+    if PROFILE_REQUESTS and request.args.get('profile'):
+        g.profile = contextlib.ExitStack()
+        g.profile.enter_context(profiled(request.endpoint or 'request'))
+
+@app.teardown_request
+def stop_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.close()
+
+# Revoke (or with "reinstate": true, reinstate) ACL grants, given by status list index or
+# student DID. Only the changed 256-entry words are written to the contract.
+@app.route('/revoke', methods=['POST'])
+def revoke():
+    try:
+        data = request.get_json()
+        indices = [int(index) for index in data.get('indices', [])]
+        store = credential_store.get_store()
+        for student_did in data.get('student_dids', []):
+            record = store.get(student_did)
+            if record is None or record['status_index'] is None:
+                raise ValueError(f"No ACL entry for {student_did}")
+            indices.append(status_list.status_index(record))
+
+        with _status_lock:
+            # Work on a copy, so a failed transaction leaves the stored list unchanged
+            status = load_status_list().copy()
+            changed = status.set_revoked(indices, revoked=not data.get('reinstate'))
+            gas_used = publish_status_words(status, changed)
+            status.save()
 
-            # Get employer hashed email from the token file
-            employer_hashed_email = token_data['0']['acl']['employer_hashed_email']
-            print(f"Employer hashed email: {employer_hashed_email}")
+        return jsonify({
+            "status": "success",
+            "changed_words": len(changed),
+            "revoked_count": status.revoked_count(),
+            "gas_used": gas_used
+        })
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Log values to check
-            print(f"R: {R}, s: {s}, G: {G}, P: {P}, challenge: {challenge}, employer_hashed_email: {employer_hashed_email}")
+# Index the contract's logs up to the current head (minus INDEXER_CONFIRMATIONS)
+@app.route('/index_events', methods=['POST'])
+def index_events():
+    try:
+        indexer = get_indexer()
+        with stage('event_index'):
+            stored = indexer.sync()
+        return jsonify({"status": "success", "events_stored": stored, **indexer.stats()})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Call the unified verification function on the blockchain (Schnorr + VC verification)
-            tx_hash = contract.functions.verify(
-                R, s, G, P, challenge, employer_hashed_email,
-                token_data['0']['verifiablePresentation']['verifiableCredential'][0]['hash'], 
-                student_did, ipfs_vc
-            ).transact({'from': w3.eth.accounts[3], 'gas': 200000000})
+# Verification outcomes from the event index, by student_did or tx_hash (both repeatable)
+@app.route('/outcomes', methods=['GET'])
+def verification_outcomes():
+    try:
+        indexer = get_indexer()
+        if request.args.get('sync'):
+            with stage('event_index'):
+                indexer.sync()
+        by_student = {did: indexer.student_outcomes(did) for did in request.args.getlist('student_did')}
+        tx_hashes = request.args.getlist('tx_hash')
+        by_tx = indexer.outcomes(tx_hashes) if tx_hashes else {}
+        return jsonify({"status": "success", "checkpoint": indexer.checkpoint(), "students": by_student, "transactions": by_tx})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Wait for the transaction receipt
+# Store the parameters of SCHNORR_GROUP with the contract, for verifyInGroup()
+@app.route('/set_schnorr_group', methods=['POST'])
+def set_schnorr_group():
+    try:
+        if not PROOF_GROUP:
+            raise ValueError(f"{SCHNORR_GROUP.name} is checked by verify(), no group needs to be stored")
+        with stage('tx_submit'):
+            tx_hash = contract_function('setGroup')(
+                SCHNORR_GROUP.to_bytes(P), SCHNORR_GROUP.q, SCHNORR_GROUP.to_bytes(G)
+            ).transact({'from': owner_account()})
+        with stage('receipt_wait'):
             receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt['status'] != 1:
+            raise RuntimeError("setGroup failed")
+        return jsonify({"status": "success", "group": SCHNORR_GROUP.name, "gas_used": receipt['gasUsed']})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Log if the transaction succeeded or failed
-            if receipt['status'] == 1:
-                print(f"Transaction succeeded for student_did={student_did}")
-            else:
-                print(f"Transaction failed for student_did={student_did}, iteration={i + 1}. Gas used: {receipt['gasUsed']}")
+# Write every non-empty word of the stored status list (e.g. after `python status_list.py`)
+@app.route('/publish_status_list', methods=['POST'])
+def publish_status_list():
+    try:
+        with _status_lock:
+            status = load_status_list()
+            words = status.nonzero_words()
+            gas_used = publish_status_words(status, words)
+        return jsonify({"status": "success", "words": len(words), "gas_used": gas_used})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
+@app.route('/status/<int:status_index>', methods=['GET'])
+def credential_status(status_index):
+    try:
+        return jsonify({
+            "status": "success",
+            "status_index": status_index,
+            "revoked": load_status_list().is_revoked(status_index),
+            "revoked_on_chain": contract_function('isRevoked')(status_index).call()
+        })
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-            # Log the gas used for each iteration
-            print(f"Gas used for iteration {i+1}: {receipt['gasUsed']}")
-            total_gas_used += receipt['gasUsed']
+# Size and hit/miss counters of the verification cache
+@app.route('/verify_cache', methods=['GET'])
+def verify_cache_stats():
+    return jsonify({"status": "success", **verification_cache.stats()})
 
-        # Measure the total time taken for the batch verification process
-        verification_time = time.time() - start_time
+# Submit a batch verification job; returns its id at once
+@app.route('/jobs/batch_verify', methods=['POST'])
+def submit_batch_verify_job():
+    try:
+        params = batch_verify_params(request.get_json(silent=True) or request.form)
+        job_id = get_jobs().submit("batch_verify", params)
+        return jsonify({"status": "success", "job_id": job_id}), 202
+    except jobs.QueueFull as e:
+        return jsonify({"status": "failed", "message": str(e)}), 429
+    except ValueError as e:
+        # Invalid parameters
+        return jsonify({"status": "failed", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
 
-        # Render the results in the HTML page
-        return render_template('batch_result.html', 
-                       valid_students=valid_students, 
-                       verification_time=verification_time, 
-                       loop_count=loop_count,
-                       total_gas_used=total_gas_used)
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({"status": "failed", "message": "Unknown job"}), 404
+    return jsonify(job_status(job))
+
+# Stream a job's per-proof results as Server-Sent Events ("result" per proof, "progress" as it
+# changes, "done" at the end). A reconnecting client resumes after its Last-Event-ID.
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    manager = get_jobs()
+    if manager.get(job_id) is None:
+        return jsonify({"status": "failed", "message": "Unknown job"}), 404
+    last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0)
+
+    def stream():
+        seq = last_seq
+        last_progress = None
+        last_sent = time.time()
+        while True:
+            job = manager.get(job_id)
+            for seq, result in manager.results(job_id, seq):
+                yield sse_event("result", result, seq)
+                last_sent = time.time()
+
+            progress = (job['status'], job['done'], job['total'])
+            if progress != last_progress:
+                yield sse_event("progress", {"job_status": job['status'], "done": job['done'], "total": job['total']})
+                last_progress = progress
+                last_sent = time.time()
+
+            if job['status'] in jobs.FINISHED:
+                yield sse_event("done", job_status(job))
+                return
+            if time.time() - last_sent >= SSE_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            time.sleep(SSE_POLL_INTERVAL)
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Results page of a finished job, as the form used to render it directly
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({"status": "failed", "message": "Unknown job"}), 404
+    if job['status'] != 'succeeded':
+        return jsonify(job_status(job))
+    return render_template('batch_result.html', **job['summary'])
+
+# The form submits a job and follows its progress on batch_job.html
+@app.route('/batch_verify', methods=['POST'])
+def batch_verify_from_form():
+    try:
+        params = batch_verify_params(request.form)
+        job_id = get_jobs().submit("batch_verify", params)
+        return render_template('batch_job.html', job_id=job_id, loop_count=params['loop_count'])
 
+    except ValueError as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "failed", "message": str(e)})
 
+# Function to load the state requests share before serve.py forks its workers, so they all
+# use one copy-on-write copy of it: the student payload, the status list, the credential
+# store's import of the source files and the fixed-base table of the Schnorr group
+def preload():
+    if os.path.exists(PAYLOAD_FILE):
+        load_students()
+    load_status_list()
+    credential_store.get_store()
+    credential_store.close_store()
+    schnorr_groups.fixed_base_table(SCHNORR_GROUP)
+
+# Function to set up what a forked worker must not share with the other processes: its own
+# connection pool to the node (and the contract object bound to it). With recover_jobs the job
+# manager is started right away, so jobs left by a previous run or by a worker that exited are
+# taken over without waiting for a request.
+def after_fork(recover_jobs=True):
+    global w3, contract, JOB_RECOVERY
+    w3 = Web3(rpc.PooledHTTPProvider(RPC_URL, timeout=500))
+    contract = w3.eth.contract(address=contract_address, abi=contract_abi)
+    JOB_RECOVERY = recover_jobs
+    if recover_jobs:
+        get_jobs()
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,28 @@
+# Compare the per-proof verify() loop with verifyBatch on the same Ganache node app.py uses.
+# Run from the repository root:  python -m benchmarks.batch_verify [N ...]
+import sys
+import time
+
+import app
+
+DEFAULT_SIZES = [1, 10, 50, 100, 250, 500, 1000]
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'N':>6} {'loop time (s)':>14} {'loop gas':>12} {'batch time (s)':>15} {'batch gas':>12} {'gas ratio':>10}")
+    for n in sizes:
+        proofs, _ = app.build_proofs(app.load_students(), n)
+
+        start = time.time()
+        loop_gas = app.verify_proofs_loop(proofs)
+        loop_time = time.time() - start
+
+        start = time.time()
+        batch_gas, _ = app.verify_proofs_batch(proofs)
+        batch_time = time.time() - start
+
+        print(f"{n:>6} {loop_time:>14.4f} {loop_gas:>12} {batch_time:>15.4f} {batch_gas:>12} {batch_gas / loop_gas:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Gas comparison of SchnorrBatchVerification (debug events, string hashes) and
+# SchnorrBatchVerificationLean (production build) on an in-process py-evm chain.
+# Needs the Truffle artifacts of both contracts (truffle compile) and eth-tester:
+#   pip install "eth-tester[py-evm]"
+# Run from the repository root:  python -m benchmarks.contract_gas [N]
+import json
+import os
+import sys
+
+from web3 import Web3
+
+import app
+from app import G, P
+from benchmarks.schnorr_batch import make_proof
+
+TX_GAS = 5000000
+
+# Function to deploy a contract from its Truffle build artifact
+def deploy(w3, artifact_path):
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({'from': w3.eth.accounts[0]}))
+    return w3.eth.contract(address=receipt['contractAddress'], abi=artifact['abi'])
+
+def has_function(contract, name):
+    return any(item.get('type') == 'function' and item.get('name') == name for item in contract.abi)
+
+# Function to measure the gas of N verify() calls and of one verifyBatch call over N fresh proofs
+def measure(w3, variant, num_proofs):
+    contract = deploy(w3, app.CONTRACT_ARTIFACTS[variant])
+    sender = w3.eth.accounts[0]
+
+    proofs = [app.contract_proof(make_proof(i, G, P), variant) for i in range(num_proofs)]
+    verify_gas = 0
+    for proof in proofs:
+        R, s, c, employer, vp, did, ipfs = proof
+        tx_hash = contract.functions.verify(R, s, G, P, c, employer, vp, did, ipfs).transact({'from': sender, 'gas': TX_GAS})
+        verify_gas += w3.eth.wait_for_transaction_receipt(tx_hash)['gasUsed']
+
+    batch_gas = None
+    if has_function(contract, 'verifyBatch'):
+        # Fresh DIDs so the Schnorr check is not skipped
+        batch = [app.contract_proof(make_proof(num_proofs + i, G, P), variant) for i in range(num_proofs)]
+        tx_hash = contract.functions.verifyBatch(batch, G, P).transact({'from': sender, 'gas': TX_GAS * num_proofs})
+        batch_gas = w3.eth.wait_for_transaction_receipt(tx_hash)['gasUsed']
+
+    return verify_gas, batch_gas
+
+def main():
+    try:
+        from web3.providers.eth_tester import EthereumTesterProvider
+        w3 = Web3(EthereumTesterProvider())
+    except ImportError:
+        sys.exit('eth-tester is not installed: pip install "eth-tester[py-evm]"')
+
+    num_proofs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print(f"{'contract':>8} {'verify gas/proof':>17} {'verifyBatch gas/proof':>22}")
+    for variant, artifact_path in app.CONTRACT_ARTIFACTS.items():
+        if not os.path.exists(artifact_path):
+            print(f"{variant:>8} artifact {artifact_path} not found, run truffle compile")
+            continue
+        verify_gas, batch_gas = measure(w3, variant, num_proofs)
+        batch_column = f"{batch_gas / num_proofs:>22.0f}" if batch_gas is not None else f"{'n/a':>22}"
+        print(f"{variant:>8} {verify_gas / num_proofs:>17.0f} {batch_column}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Throughput of issue_transcripts.py: transcripts per second for each number of worker
+# processes, with the time per transcript spent in each stage (summed over the workers).
+# Runs in a temporary directory with a generated payload; the PKI keys in pki/ are used.
+# Run from the repository root:
+#   python -m benchmarks.issuance [--students N] [--algorithm rsa-pss|ed25519|ecdsa-p256]
+import argparse
+import json
+import os
+import tempfile
+
+import issue_transcripts
+from pki import signers
+
+def write_payload(path, students):
+    with open(path, 'w') as f:
+        json.dump({"students": [
+            {"email": f"hr{i}@gmail.com", "student_did": f"did:university:student{i}"}
+            for i in range(1, students + 1)
+        ]}, f)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--algorithm', choices=sorted(signers.SIGNERS), default=signers.DEFAULT_ALGORITHM)
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, 2, os.cpu_count() or 1})
+    print(f"{'workers':>8} {'seconds':>8} {'transcripts/s':>14}  ms per transcript by stage")
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                write_payload('payload.json', args.students)
+                count, elapsed, timings = issue_transcripts.issue_transcripts(
+                    'payload.json', 'transcripts', args.algorithm, workers
+                )
+            finally:
+                os.chdir(cwd)
+        stages = ", ".join(f"{stage} {seconds / count * 1000:.2f}" for stage, seconds in timings.items())
+        print(f"{workers:>8} {elapsed:>8.2f} {count / elapsed:>14.1f}  {stages}")
+
+if __name__ == "__main__":
+    main()
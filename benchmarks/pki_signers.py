@@ -0,0 +1,64 @@
+# Compare the transcript signature algorithms of pki/signers.py: sign and verify latency and
+# throughput per backend for several PDF sizes. Every operation includes the streaming
+# SHA-256 pass over the PDF, as in pki/app.py.
+# Run from the repository root:
+#   python -m benchmarks.pki_signers [iterations] [size_kb ...]
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from pki import signers
+
+DEFAULT_SIZES_KB = [100, 1024, 10240]
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.digest()
+
+def time_each(fn, iterations):
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def p95(latencies):
+    return statistics.quantiles(latencies, n=20, method='inclusive')[18] if len(latencies) > 1 else latencies[0]
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sizes_kb = [int(size) for size in sys.argv[2:]] or DEFAULT_SIZES_KB
+
+    with tempfile.TemporaryDirectory() as workdir:
+        loaded = {
+            algorithm: signers.load_signer(algorithm, os.path.join(workdir, f"{algorithm}.pem"))
+            for algorithm in signers.SIGNERS
+        }
+
+        print(f"{'algorithm':>11} {'PDF (KB)':>9} {'sign p50 (ms)':>14} {'sign p95 (ms)':>14} {'sign/s':>9} "
+              f"{'verify p50 (ms)':>16} {'verify p95 (ms)':>16} {'verify/s':>9} {'sig bytes':>10}")
+        for size_kb in sizes_kb:
+            pdf_path = os.path.join(workdir, f"transcript_{size_kb}.pdf")
+            with open(pdf_path, 'wb') as f:
+                f.write(os.urandom(size_kb * 1024))
+
+            for algorithm, signer in loaded.items():
+                signature = signer.sign_digest(hash_file(pdf_path))
+                sign_times = time_each(lambda: signer.sign_digest(hash_file(pdf_path)), iterations)
+                verify_times = time_each(lambda: signer.verify_digest(signature, hash_file(pdf_path)), iterations)
+
+                print(f"{algorithm:>11} {size_kb:>9} "
+                      f"{statistics.median(sign_times) * 1000:>14.3f} {p95(sign_times) * 1000:>14.3f} {iterations / sum(sign_times):>9.1f} "
+                      f"{statistics.median(verify_times) * 1000:>16.3f} {p95(verify_times) * 1000:>16.3f} {iterations / sum(verify_times):>9.1f} "
+                      f"{len(signature):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Micro-benchmark of the off-chain Schnorr pre-verifier: one exact check per proof
+# versus the randomized batch test (with bisection when a batch holds invalid proofs).
+# Run from the repository root:  python -m benchmarks.schnorr_batch [N ...]
+import hashlib
+import random
+import sys
+import time
+
+import schnorr_batch
+from app import G, P
+
+DEFAULT_SIZES = [10000, 100000]
+INVALID_EVERY = 1000  # one invalid proof per this many in the "with invalid" run
+
+# Function to build a proof that satisfies the contract's equation g^s == R * g^(c*x) (mod p)
+def make_proof(i, g, p, valid=True):
+    employer_hashed_email = hashlib.sha256(f"hr{i + 1}@gmail.com".encode()).hexdigest()
+    x = schnorr_batch.email_exponent(employer_hashed_email)
+    c = random.randint(0, schnorr_batch.UINT256_MAX // x)  # keep c * x inside uint256
+    r = random.randint(1, p - 2)
+    R = pow(g, r, p)
+    s = (r + c * x) % (p - 1)
+    if not valid:
+        R = R * g % p
+    hashed_vc = hashlib.sha256(str(i).encode()).hexdigest()
+    return (R, s, c, employer_hashed_email, hashed_vc, f"did:university:student{i + 1}", hashed_vc)
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'N':>8} {'per-proof (s)':>14} {'batch (s)':>10} {'batch w/ invalid (s)':>21} {'found':>6}")
+    for n in sizes:
+        proofs = [make_proof(i, G, P) for i in range(n)]
+        with_invalid = [make_proof(i, G, P, valid=i % INVALID_EVERY != 0) for i in range(n)]
+
+        per_proof_time, _ = time_call(lambda: [schnorr_batch.verify_proof(proof, G, P) for proof in proofs])
+        batch_time, _ = time_call(schnorr_batch.find_invalid, proofs, G, P)
+        invalid_time, found = time_call(schnorr_batch.find_invalid, with_invalid, G, P)
+
+        print(f"{n:>8} {per_proof_time:>14.4f} {batch_time:>10.4f} {invalid_time:>21.4f} {len(found):>6}")
+
+if __name__ == "__main__":
+    main()
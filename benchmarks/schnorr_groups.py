@@ -0,0 +1,56 @@
+# Micro-benchmark of proof generation and off-chain verification per Schnorr group:
+# commitments g^r with plain pow() versus the fixed-base table, and proof checks with two
+# pow() calls (g^s == R * g^(c*x)), one fixed-base exponentiation (g^(s - c*x) == R, as
+# verifyInGroup does) and the batch test with multi-exponentiation.
+# Run from the repository root:  python -m benchmarks.schnorr_groups [N ...]
+import hashlib
+import secrets
+import sys
+import time
+
+import schnorr_batch
+import schnorr_groups
+
+DEFAULT_SIZES = [1000]
+
+# Function to build a proof that satisfies g^((s - c*x) mod q) == R (mod p)
+def make_proof(i, group):
+    employer_hashed_email = hashlib.sha256(f"hr{i + 1}@gmail.com".encode()).hexdigest()
+    x = schnorr_batch.email_exponent(employer_hashed_email)
+    r, R = group.commitment()
+    c = secrets.randbelow(group.q)
+    s = (r + c * x) % group.q
+    hashed_vc = hashlib.sha256(str(i).encode()).hexdigest()
+    return (R, s, c, employer_hashed_email, hashed_vc, f"did:university:student{i + 1}", hashed_vc)
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'group':>12} {'N':>7} {'table (s)':>10} {'pow() R/s':>11} {'table R/s':>11} "
+          f"{'2x pow() (s)':>13} {'fixed-base (s)':>15} {'batch (s)':>10}")
+    for name, group in schnorr_groups.GROUPS.items():
+        table_time, table = time_call(schnorr_groups.fixed_base_table, group)
+        g, p, q = group.g, group.p, group.q
+
+        for n in sizes:
+            exponents = [secrets.randbelow(q - 1) + 1 for _ in range(n)]
+            pow_time, _ = time_call(lambda: [pow(g, r, p) for r in exponents])
+            fixed_time, _ = time_call(lambda: [table.pow(r) for r in exponents])
+
+            proofs = [make_proof(i, group) for i in range(n)]
+            items = [(R, s, c * schnorr_batch.email_exponent(email)) for R, s, c, email, *_ in proofs]
+            two_pow_time, _ = time_call(lambda: [pow(g, s, p) == R * pow(g, cx % q, p) % p for R, s, cx in items])
+            single_time, _ = time_call(lambda: [table.pow((s - cx) % q) == R for R, s, cx in items])
+            batch_time, found = time_call(schnorr_batch.find_invalid, proofs, g, p, (), None, 64, group)
+            assert not found
+
+            print(f"{name:>12} {n:>7} {table_time:>10.4f} {n / pow_time:>11.0f} {n / fixed_time:>11.0f} "
+                  f"{two_pow_time:>13.4f} {single_time:>15.4f} {batch_time:>10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Cold start and memory of the apps under serve.py: import time of app.py with a cold and a
+# warm ABI cache, ABI loading from the build artifact versus the cache, and for the prefork
+# server the time to the first answered request and the RSS, PSS and shared memory of the
+# master and every worker (from /proc/<pid>/smaps_rollup, so Linux only).
+# Run from the repository root:
+#   python -m benchmarks.startup [--app ev|pki] [--workers N]
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import abi_cache
+
+ARTIFACT = 'e-transcript/build/contracts/SchnorrBatchVerification.json'
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+READY_TIMEOUT = 60  # seconds
+
+def time_each(fn, iterations=20):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+def load_artifact_abi():
+    with open(ARTIFACT) as f:
+        return json.load(f)['abi']
+
+# Function to import app.py in a fresh interpreter and return the import time
+def import_time(env):
+    output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+# Function to get memory figures of a process in kB: Rss, Pss and the shared part of Rss
+def memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Rss'], values['Pss'], values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+def measure_server(app_name, workers):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/metrics'
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--app', app_name, '--workers', str(workers), '--port', str(port)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        first_response = None
+        while time.perf_counter() - start < READY_TIMEOUT:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    response.read()
+                first_response = time.perf_counter() - start
+                break
+            except OSError:
+                time.sleep(0.01)
+        print(f"serve.py --app {app_name}: {server.stdout.readline().strip()}")
+        print(f"first response after {first_response:.3f}s" if first_response else "no response")
+
+        # Let every worker answer a few requests, so the figures include a warmed-up worker
+        for _ in range(workers * 4):
+            with urllib.request.urlopen(url, timeout=5) as response:
+                response.read()
+
+        print(f"{'process':>10} {'pid':>8} {'RSS (kB)':>10} {'PSS (kB)':>10} {'shared (kB)':>12}")
+        total_pss = 0
+        for label, pid in [('master', server.pid)] + [(f'worker {i}', pid) for i, pid in enumerate(children(server.pid))]:
+            rss, pss, shared = memory_kb(pid)
+            total_pss += pss
+            print(f"{label:>10} {pid:>8} {rss:>10} {pss:>10} {shared:>12}")
+        print(f"{'total PSS':>10} {'':>8} {'':>10} {total_pss:>10}")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', choices=['ev', 'pki'], default='ev')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"ABI from artifact ({os.path.getsize(ARTIFACT)} bytes): {time_each(load_artifact_abi) * 1000:.3f} ms")
+        abi_cache.load_abi(ARTIFACT, cache_dir)
+        cache_size = os.path.getsize(abi_cache.cache_path_for(ARTIFACT, cache_dir))
+        print(f"ABI from cache ({cache_size} bytes): {time_each(lambda: abi_cache.load_abi(ARTIFACT, cache_dir)) * 1000:.3f} ms")
+
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    shutil.rmtree(abi_cache.ABI_CACHE_DIR, ignore_errors=True)
+    print(f"import app, cold ABI cache: {import_time(env):.3f}s")
+    print(f"import app, warm ABI cache: {import_time(env):.3f}s")
+
+    measure_server(args.app, args.workers)
+
+if __name__ == "__main__":
+    main()
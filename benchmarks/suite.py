@@ -0,0 +1,203 @@
+# Reproducible verification benchmark: starts an in-process py-evm chain, deploys the contract
+# from its Truffle artifact and drives the same code paths as /batch_verify and
+# /store_did_to_index for every N of the sweep. Results are written as JSON or CSV so runs
+# from different commits can be compared.
+# Needs eth-tester:  pip install "eth-tester[py-evm]"
+# Run from the repository root:
+#   python -m benchmarks.suite --sizes 1 10 100 --out bench.csv
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from web3 import Web3
+
+import acl_create
+import app
+import hash_vc
+import vp_gen
+
+SCENARIOS = ('verify-loop', 'verify-batch', 'store-did')
+BLOCK_GAS_LIMIT = 2000000000  # same as the development network in truffle-config.js
+FIELDS = (
+    'commit', 'contract', 'scenario', 'n', 'build_s', 'total_s', 'p50_ms', 'p95_ms', 'p99_ms',
+    'proofs_per_s', 'gas_total', 'gas_per_proof'
+)
+
+# Function to start a fresh in-process chain and deploy the selected contract build on it
+def deploy_contract(artifact_path):
+    from eth_tester import EthereumTester, PyEVMBackend
+    from web3.providers.eth_tester import EthereumTesterProvider
+
+    backend = PyEVMBackend(genesis_parameters=PyEVMBackend.generate_genesis_params({'gas_limit': BLOCK_GAS_LIMIT}))
+    w3 = Web3(EthereumTesterProvider(EthereumTester(backend)))
+
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({'from': w3.eth.accounts[0]}))
+    return w3, w3.eth.contract(address=receipt['contractAddress'], abi=artifact['abi'])
+
+# Function to point app.py at a fresh chain, so every run starts from the same state
+def use_fresh_chain(artifact_path):
+    app.w3, app.contract = deploy_contract(artifact_path)
+    app.contract_address = app.contract.address
+
+# Function to write payload, ipfs.json and token.json for num_students students to the cwd
+def write_fixtures(num_students):
+    acl_list = [acl_create.make_acl_entry(i) for i in range(num_students)]
+    hash_vc.store_hashed_vcs(hash_vc.generate_vcs(num_students))
+    with open('ipfs.json', 'r') as f:
+        vp_gen.store_token_vp(acl_list, json.load(f))
+
+    students = [{"email": f"hr{i+1}@gmail.com", "student_did": entry["student_did"]} for i, entry in enumerate(acl_list)]
+    with open(app.PAYLOAD_FILE, 'w') as f:
+        json.dump({"students": students}, f)
+
+def percentile(samples, q):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+def summarize(scenario, n, build_s, latencies, total_s, gas_total):
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        'contract': app.CONTRACT_VARIANT, 'scenario': scenario, 'n': n, 'build_s': round(build_s, 6),
+        'total_s': round(total_s, 6),
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'proofs_per_s': round(n / total_s, 3) if total_s else None,
+        'gas_total': gas_total, 'gas_per_proof': round(gas_total / n, 1),
+    }
+
+# Each scenario returns (per-operation latencies, total seconds, total gas)
+
+def run_verify_loop(proofs):
+    latencies = []
+    gas_total = 0
+    for proof in proofs:
+        start = time.perf_counter()
+        gas_total += app.verify_proofs_loop([proof])
+        latencies.append(time.perf_counter() - start)
+    return latencies, sum(latencies), gas_total
+
+def run_verify_batch(proofs):
+    chunk_size, _ = app.batch_chunk_size(proofs)
+    latencies = []
+    gas_total = 0
+    for start_index in range(0, len(proofs), chunk_size):
+        start = time.perf_counter()
+        gas, _ = app.verify_proofs_batch(proofs[start_index:start_index + chunk_size])
+        latencies.append(time.perf_counter() - start)
+        gas_total += gas
+    return latencies, sum(latencies), gas_total
+
+def run_store_did(n):
+    with open('ipfs.json', 'r') as f:
+        ipfs_text = f.read()
+    entries = list(json.loads(ipfs_text).items())
+
+    client = app.app.test_client()
+    latencies = []
+    gas_before = app.w3.eth.get_block('latest')['number']
+    try:
+        for i in range(n):
+            index, entry = entries[i % len(entries)]
+            with open('ipfs.json', 'w') as f:
+                json.dump({index: entry}, f)
+            start = time.perf_counter()
+            response = client.post('/store_did_to_index').get_json()
+            latencies.append(time.perf_counter() - start)
+            if response['status'] != 'success':
+                raise RuntimeError(response['message'])
+    finally:
+        with open('ipfs.json', 'w') as f:
+            f.write(ipfs_text)
+
+    blocks = range(gas_before + 1, app.w3.eth.get_block('latest')['number'] + 1)
+    gas_total = sum(app.w3.eth.get_block(number)['gasUsed'] for number in blocks)
+    return latencies, sum(latencies), gas_total
+
+def run_scenario(scenario, n, artifact_path):
+    use_fresh_chain(artifact_path)
+    if scenario == 'store-did':
+        return summarize(scenario, n, 0.0, *run_store_did(n))
+
+    start = time.perf_counter()
+    proofs, _ = app.build_proofs(app.load_students(), n)
+    build_s = time.perf_counter() - start
+
+    if scenario == 'verify-loop':
+        return summarize(scenario, n, build_s, *run_verify_loop(proofs))
+    return summarize(scenario, n, build_s, *run_verify_batch(proofs))
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def write_results(rows, out):
+    if out is None:
+        json.dump(rows, sys.stdout, indent=4)
+        print()
+    elif out.endswith('.csv'):
+        with open(out, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(out, 'w') as f:
+            json.dump(rows, f, indent=4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible verification benchmark on an in-process py-evm chain")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--students', type=int, default=100, help="distinct students in the generated payload")
+    parser.add_argument('--out', help="result file, .csv or .json (default: JSON on stdout)")
+    args = parser.parse_args()
+
+    try:
+        import eth_tester  # noqa: F401
+    except ImportError:
+        sys.exit('eth-tester is not installed: pip install "eth-tester[py-evm]"')
+
+    out = os.path.abspath(args.out) if args.out else None
+    # The fixtures are generated in a temporary directory, so resolve the artifact first
+    artifact_path = os.path.abspath(app.CONTRACT_ARTIFACTS[app.CONTRACT_VARIANT])
+    commit = git_commit()
+    has_batch = app.has_function('verifyBatch')
+
+    rows = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            # Keep the generator scripts' progress messages out of the JSON written to stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_fixtures(args.students)
+            for scenario in args.scenarios:
+                if scenario == 'verify-batch' and not has_batch:
+                    print("Skipping verify-batch: the contract artifact has no verifyBatch (run truffle compile)", file=sys.stderr)
+                    continue
+                for n in args.sizes:
+                    row = run_scenario(scenario, n, artifact_path)
+                    row['commit'] = commit
+                    rows.append({field: row[field] for field in FIELDS})
+                    print(f"{scenario} n={n}: {row['proofs_per_s']} proofs/s, p95 {row['p95_ms']} ms, {row['gas_per_proof']} gas/proof", file=sys.stderr)
+        finally:
+            os.chdir(cwd)
+
+    write_results(rows, out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Size and access time of token.json (as vp_gen.store_token_vp writes it) versus the compact
+# token store: file size, loading one token (full parse versus index lookup and seek) and
+# materializing its VP.
+# Run from the repository root:  python -m benchmarks.token_store [N ...]
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import acl_create
+import token_store
+import vp_gen
+
+DEFAULT_SIZES = [1000, 100000]
+LOOKUPS = 1000
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'N':>8} {'json (MB)':>10} {'tok (MB)':>9} {'json load one (s)':>18} {'tok get (us)':>13} {'tok get+VP (us)':>16}")
+    for n in sizes:
+        acl_data = [acl_create.make_acl_entry(i) for i in range(n)]
+        ipfs_data = {str(i + 1): {"hashed_vc": hashlib.sha256(str(i).encode()).hexdigest()} for i in range(n)}
+
+        with tempfile.TemporaryDirectory() as workdir:
+            json_path = os.path.join(workdir, 'token.json')
+            store_path = os.path.join(workdir, token_store.TOKEN_STORE)
+
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                vp_gen.store_token_vp(acl_data, ipfs_data)
+                token_store.store_tokens(acl_data, ipfs_data, store_path)
+            finally:
+                os.chdir(cwd)
+
+            start = time.perf_counter()
+            with open(json_path) as f:
+                json.load(f)[str(n // 2)]
+            json_time = time.perf_counter() - start
+
+            keys = [random.randint(1, n) for _ in range(LOOKUPS)]
+            with token_store.TokenStore(store_path) as store:
+                start = time.perf_counter()
+                for key in keys:
+                    store.get(key).acl
+                get_time = (time.perf_counter() - start) / LOOKUPS
+
+                start = time.perf_counter()
+                for key in keys:
+                    store.get(key)['verifiablePresentation']
+                vp_time = (time.perf_counter() - start) / LOOKUPS
+
+            json_mb = os.path.getsize(json_path) / 2**20
+            store_mb = (os.path.getsize(store_path) + os.path.getsize(token_store.index_path(store_path))) / 2**20
+            print(f"{n:>8} {json_mb:>10.2f} {store_mb:>9.2f} {json_time:>18.4f} {get_time * 1e6:>13.1f} {vp_time * 1e6:>16.1f}")
+
+if __name__ == "__main__":
+    main()
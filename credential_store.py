@@ -0,0 +1,248 @@
+import json
+import os
+import sqlite3
+import threading
+
+import token_store
+
+# Indexed store of the credential data /batch_verify needs (hashed VC from ipfs.json, ACL and
+# VP hash from token.json), keyed by student DID and kept in SQLite. The source files are
+# imported once; after that refresh() only stats them and imports what changed. For the JSON
+# Lines files written by the --stream generators only the appended lines are read. A source
+# read in full (a .json file, a file that shrank, or another file taking over) replaces what
+# was imported from that kind of source before, so removed DIDs do not linger.
+
+CREDENTIAL_DB = 'credentials.db'
+
+# Candidate source files. For the hashed VCs a .jsonl file is used instead of the .json file
+# next to it when it exists. Tokens can come from the compact token store (token_store.py),
+# token.jsonl or token.json, whichever was written last, so a store left from an earlier run
+# does not hide a newer token.json.
+IPFS_SOURCES = ('ipfs.jsonl', 'ipfs.json')
+TOKEN_SOURCES = (token_store.TOKEN_STORE, 'token.jsonl', 'token.json')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS credentials (
+    student_did TEXT PRIMARY KEY,
+    ipfs_index INTEGER,
+    hashed_vc TEXT,
+    token_index INTEGER,
+    employer_hashed_email TEXT,
+    expiration INTEGER,
+    is_valid INTEGER,
+    vp_hashed_vc TEXT,
+    status_index INTEGER
+);
+CREATE INDEX IF NOT EXISTS credentials_employer ON credentials (employer_hashed_email);
+CREATE INDEX IF NOT EXISTS credentials_ipfs_index ON credentials (ipfs_index);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER,
+    offset INTEGER
+);
+CREATE TABLE IF NOT EXISTS active_sources (
+    kind TEXT PRIMARY KEY,
+    path TEXT
+);
+'''
+
+UPSERT_VC = '''
+INSERT INTO credentials (student_did, ipfs_index, hashed_vc) VALUES (?, ?, ?)
+ON CONFLICT (student_did) DO UPDATE SET ipfs_index = excluded.ipfs_index, hashed_vc = excluded.hashed_vc
+'''
+
+UPSERT_TOKEN = '''
+INSERT INTO credentials (student_did, token_index, employer_hashed_email, expiration, is_valid, vp_hashed_vc, status_index)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (student_did) DO UPDATE SET
+    token_index = excluded.token_index,
+    employer_hashed_email = excluded.employer_hashed_email,
+    expiration = excluded.expiration,
+    is_valid = excluded.is_valid,
+    vp_hashed_vc = excluded.vp_hashed_vc,
+    status_index = excluded.status_index
+'''
+
+# Columns each kind of source fills in. A full import of a source replaces its kind's values.
+SOURCE_COLUMNS = {
+    'vc': ('ipfs_index', 'hashed_vc'),
+    'token': ('token_index', 'employer_hashed_email', 'expiration', 'is_valid', 'vp_hashed_vc', 'status_index'),
+}
+
+COLUMNS = ('student_did', 'ipfs_index', 'hashed_vc', 'token_index', 'employer_hashed_email', 'expiration', 'is_valid', 'vp_hashed_vc', 'status_index')
+
+BATCH_ROWS = 10000  # rows per executemany while importing
+
+def vc_row(index, record, position=None):
+    return (record['student_did'], int(index), record['hashed_vc'])
+
+# Function to get the status list bit of an ACL entry: its statusListIndex, or for entries
+# written before it existed the entry's position in the ACL. That is the token's position in
+# token.json or token.tok; token.jsonl does not record it, but its index is the position + 1.
+def acl_status_index(acl, index, position):
+    if 'statusListIndex' in acl:
+        return acl['statusListIndex']
+    return position if position is not None else int(index) - 1
+
+def token_row(index, token, position=None):
+    acl = token['acl']
+    return (
+        token['student_did'], int(index), acl['employer_hashed_email'], acl['expiration'], int(acl['isValid']),
+        token['verifiablePresentation']['verifiableCredential'][0]['hash'], acl_status_index(acl, index, position)
+    )
+
+# Same as token_row for a token of the compact store, whose VP is not materialized
+def stored_token_row(token, position):
+    acl = token.acl
+    return (
+        token.student_did, token.index, acl['employer_hashed_email'], acl['expiration'], int(acl['isValid']),
+        token.vp_hashed_vc(), acl_status_index(acl, token.index, position)
+    )
+
+class CredentialStore:
+    def __init__(self, db_path=CREDENTIAL_DB, base_dir='.'):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(credentials)')}
+        if 'status_index' not in columns:
+            # Store created before status_index: add it and import every source again
+            self.db.execute('ALTER TABLE credentials ADD COLUMN status_index INTEGER')
+            self.db.execute('DELETE FROM sources')
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # Function to import whatever changed in the source files since the last call
+    def refresh(self):
+        with self.lock:
+            self._refresh_source('vc', IPFS_SOURCES, UPSERT_VC, vc_row, 'index')
+            self._refresh_source('token', TOKEN_SOURCES, UPSERT_TOKEN, token_row, 'index', newest=True)
+
+    # Function to pick the file to import from: the first candidate that exists, or with newest
+    # the most recently modified one
+    def _source_path(self, candidates, newest):
+        paths = [os.path.join(self.base_dir, name) for name in candidates]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return None
+        return max(paths, key=lambda path: os.stat(path).st_mtime_ns) if newest else paths[0]
+
+    def _refresh_source(self, kind, candidates, upsert, make_row, index_key, newest=False):
+        path = self._source_path(candidates, newest)
+        if path is None:
+            return
+
+        stat = os.stat(path)
+        active = self.db.execute('SELECT path FROM active_sources WHERE kind = ?', (kind,)).fetchone()
+        # After a switch to another source file its rows replace all of the old one's
+        known = self.db.execute('SELECT mtime_ns, size, offset FROM sources WHERE path = ?', (path,)).fetchone()
+        if active is None or active[0] != path:
+            known = None
+        elif known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return
+
+        if path.endswith(token_store.TOKEN_STORE):
+            # The offset is the number of tokens imported; a store that shrank is read again
+            offset = known[2] if known and stat.st_size >= known[1] else 0
+            if offset == 0:
+                self._clear_source(kind)
+            with token_store.TokenStore(path) as store:
+                self._import_rows(upsert, (
+                    stored_token_row(token, position) for position, token in enumerate(store.tokens(offset), offset)
+                ))
+                offset = len(store)
+        elif path.endswith('.jsonl'):
+            # Appended lines are read from the last offset; a file that shrank is read again
+            offset = known[2] if known and stat.st_size >= known[1] else 0
+            if offset == 0:
+                self._clear_source(kind)
+            offset = self._import_jsonl(path, offset, upsert, make_row, index_key)
+        else:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self._clear_source(kind)
+            self._import_rows(upsert, (make_row(index, record, position) for position, (index, record) in enumerate(data.items())))
+            offset = stat.st_size
+
+        self.db.execute(
+            'INSERT OR REPLACE INTO sources (path, mtime_ns, size, offset) VALUES (?, ?, ?, ?)',
+            (path, stat.st_mtime_ns, stat.st_size, offset)
+        )
+        self.db.execute('INSERT OR REPLACE INTO active_sources (kind, path) VALUES (?, ?)', (kind, path))
+        self.db.commit()
+
+    # Function to drop a kind's values before its source is imported in full, so DIDs no longer
+    # in the source are gone. Rows left with neither kind are deleted. Runs in the import's
+    # transaction, so other threads (which take the lock) never see the store half empty.
+    def _clear_source(self, kind):
+        self.db.execute(f"UPDATE credentials SET {', '.join(f'{column} = NULL' for column in SOURCE_COLUMNS[kind])}")
+        self.db.execute('DELETE FROM credentials WHERE hashed_vc IS NULL AND token_index IS NULL')
+
+    def _import_jsonl(self, path, offset, upsert, make_row, index_key):
+        def rows():
+            nonlocal offset
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # a line still being written is picked up next time
+                    offset += len(line)
+                    if line.strip():
+                        record = json.loads(line)
+                        yield make_row(record[index_key], record)
+
+        self._import_rows(upsert, rows())
+        return offset
+
+    def _import_rows(self, upsert, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_ROWS:
+                self.db.executemany(upsert, batch)
+                batch = []
+        self.db.executemany(upsert, batch)
+
+    def _rows_to_dicts(self, rows):
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    # Function to look up one student's credential data by DID (None if unknown)
+    def get(self, student_did):
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM credentials WHERE student_did = ?", (student_did,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def find_by_employer(self, employer_hashed_email):
+        with self.lock:
+            rows = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM credentials WHERE employer_hashed_email = ?", (employer_hashed_email,)).fetchall()
+        return self._rows_to_dicts(rows)
+
+    def find_by_index(self, ipfs_index):
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM credentials WHERE ipfs_index = ?", (int(ipfs_index),)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+_store = None
+_store_lock = threading.Lock()
+
+# Function to get the per-process store, refreshed from the source files on every call
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore()
+    _store.refresh()
+    return _store
+
+# Function to close the per-process store, e.g. before forking, since an SQLite connection
+# must not be used by more than one process. The next get_store() opens a new one.
+def close_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
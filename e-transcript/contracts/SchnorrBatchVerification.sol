@@ -6,10 +6,46 @@ contract SchnorrBatchVerification {
     mapping(string => bool) public schnorrProofVerified;
     mapping(string => uint256) public didToIndex;
 
+    // Merkle root over all (studentDid, hashedVC) credentials, see merkle.py
+    bytes32 public credentialRoot;
+    uint256 public credentialCount;
+
+    // Revocation status list of the ACL entries: bit i % 256 of word i / 256 is set when
+    // entry i is revoked
+    mapping(uint256 => uint256) public revocationWords;
+
+    // Production-size group for verifyInGroup (see schnorr_groups.py): p and g as big-endian
+    // bytes of p's length, q prime with q | p - 1 and g of order q
+    bytes public groupP;
+    bytes public groupG;
+    uint256 public groupQ;
+
+    // Deployer, the only account allowed to change the group, the status list and the
+    // credential root
+    address public owner;
+
     event DebugVerification(string step, uint256 R, uint256 s, uint256 challenge, bool proofVerified, string studentDid);
     event DebugVCVerification(bool vcVerified, string hashedVCFromVP, string ipfsHashedVC);
     event DebugSchnorrValues(uint256 lhs, uint256 rhs, bool result, uint256 R, uint256 s, uint256 g, uint256 p, uint256 c, string emailHashed);
     event DebugFailure(string message);
+    event BatchVerification(uint256 batchSize, uint256 passed, uint256[] bitmap);
+    event CredentialRootAnchored(bytes32 root, uint256 credentialCount);
+    event RevocationWordsUpdated(uint256[] wordIndexes);
+
+    // One entry of a verifyBatch call (same fields as the arguments of verify)
+    struct Proof {
+        uint256 R;
+        uint256 s;
+        uint256 c;
+        string employerHashedEmail;
+        string hashedVCFromVP;
+        string studentDid;
+        string ipfsHashedVC;
+    }
+
+    constructor() {
+        owner = msg.sender;
+    }
 
     function storeDidToIndex(string memory studentDid, uint256 index) public {
         didToIndex[studentDid] = index;
@@ -19,10 +55,109 @@ contract SchnorrBatchVerification {
         return didToIndex[studentDid];
     }
 
+    // Overwrites whole words of the status list, so revoking or reinstating up to 256
+    // entries costs a single storage write
+    function setRevocationWords(uint256[] memory wordIndexes, uint256[] memory words) public {
+        require(msg.sender == owner, "Only the owner can change the status list");
+        require(wordIndexes.length == words.length, "Length mismatch");
+        for (uint256 i = 0; i < wordIndexes.length; i++) {
+            revocationWords[wordIndexes[i]] = words[i];
+        }
+        emit RevocationWordsUpdated(wordIndexes);
+    }
+
+    function isRevoked(uint256 statusIndex) public view returns (bool) {
+        return ((revocationWords[statusIndex / 256] >> (statusIndex % 256)) & 1) == 1;
+    }
+
+    // Replaces one storeDidToIndex transaction per student with a single root update. Only
+    // the owner may anchor: any root makes verifyCredentialInclusion accept its own proofs.
+    function anchorCredentialRoot(bytes32 root, uint256 count) public {
+        require(msg.sender == owner, "Only the owner can anchor the credential root");
+        credentialRoot = root;
+        credentialCount = count;
+        emit CredentialRootAnchored(root, count);
+    }
+
+    // Checks that (studentDid, hashedVC) is a leaf of the anchored tree. proof holds the
+    // sibling hashes from the leaf up; pairs are hashed in sorted order.
+    function verifyCredentialInclusion(
+        string memory studentDid,
+        string memory hashedVC,
+        bytes32[] memory proof
+    ) public view returns (bool) {
+        bytes32 node = keccak256(abi.encodePacked(bytes1(0x00), keccak256(bytes(studentDid)), keccak256(bytes(hashedVC))));
+        for (uint256 i = 0; i < proof.length; i++) {
+            node = node < proof[i]
+                ? keccak256(abi.encodePacked(node, proof[i]))
+                : keccak256(abi.encodePacked(proof[i], node));
+        }
+        return node == credentialRoot;
+    }
+
     function getChallenge(uint256 R) public view returns (uint256) {
         return uint256(keccak256(abi.encodePacked(R, block.timestamp))) % 23;
     }
 
+    // Only the owner may set the group: a weak group would let anyone pass verifyInGroup
+    function setGroup(bytes memory p, uint256 q, bytes memory g) public {
+        require(msg.sender == owner, "Only the owner can set the group");
+        require(p.length == g.length && q > 1, "Invalid group");
+        groupP = p;
+        groupQ = q;
+        groupG = g;
+    }
+
+    function getChallengeInGroup(bytes memory R) public view returns (uint256) {
+        return uint256(keccak256(abi.encodePacked(R, block.timestamp))) % groupQ;
+    }
+
+    // verify for the group set with setGroup. R is passed as bytes of p's length. Since all
+    // exponents live mod q, g^s == R * g^(c*x) is checked as the single exponentiation
+    // g^((s - c*x) mod q) == R, done by the modexp precompile.
+    function verifyInGroup(
+        bytes memory R,
+        uint256 s,
+        uint256 c,
+        string memory employerHashedEmail,
+        string memory hashedVCFromVP,
+        string memory studentDid,
+        string memory ipfsHashedVC
+    ) public returns (bool) {
+        // R does not fit the event's uint256, the DID is what the event indexer needs
+        emit DebugVerification("Starting Schnorr proof verification in group", 0, s, c, false, studentDid);
+
+        if (!schnorrProofVerified[studentDid]) {
+            uint256 x = uint256(keccak256(abi.encodePacked(employerHashedEmail)));
+            if (!groupSchnorrHolds(R, s, c, x)) {
+                emit DebugFailure("Schnorr proof verification failed");
+                return false;
+            }
+            schnorrProofVerified[studentDid] = true;
+        }
+
+        bool vcVerified = verifyHashedVC(hashedVCFromVP, ipfsHashedVC);
+        emit DebugVCVerification(vcVerified, hashedVCFromVP, ipfsHashedVC);
+        return vcVerified;
+    }
+
+    function groupSchnorrHolds(bytes memory R, uint256 s, uint256 c, uint256 x) internal view returns (bool) {
+        uint256 q = groupQ;
+        require(q > 0, "Group not set");
+        uint256 e = addmod(s % q, q - mulmod(c % q, x % q, q), q);
+        return R.length == groupP.length && keccak256(bigModExp(groupG, e, groupP)) == keccak256(R);
+    }
+
+    // base^e mod modulus through the EIP-198 modexp precompile (address 0x05); the result
+    // has the length of modulus
+    function bigModExp(bytes memory base, uint256 e, bytes memory modulus) internal view returns (bytes memory) {
+        (bool ok, bytes memory result) = address(5).staticcall(
+            abi.encodePacked(base.length, uint256(32), modulus.length, base, e, modulus)
+        );
+        require(ok, "modexp failed");
+        return result;
+    }
+
     function verify(
         uint256 R, 
         uint256 s, 
@@ -60,6 +195,130 @@ contract SchnorrBatchVerification {
         return true;
     }
 
+    // Verify many proofs in one transaction. All pending Schnorr proofs share a single
+    // random-linear-combination check; only if that fails are they re-checked one by one.
+    // Bit i of the returned bitmap (word i / 256, bit i % 256) is set if proof i passed.
+    // The outcome is that of calling verify() once per proof in order: a proof where verify()
+    // would revert fails, and a proof whose DID an earlier proof of the batch verified skips
+    // the Schnorr check. p must be prime. Where it deliberately differs from verify():
+    //  - p above 128 bits or g >= p is refused as a whole, where verify() reverts on overflow
+    //    for most proofs;
+    //  - the combined check passes a batch holding an invalid proof with a small probability
+    //    (about 2^-64 when g has a large prime order, much more in a toy group).
+    function verifyBatch(Proof[] memory proofs, uint256 g, uint256 p) public returns (uint256[] memory bitmap) {
+        require(p > 2 && p <= type(uint128).max && g < p, "Group must fit 128 bits");
+        uint256 n = proofs.length;
+        bitmap = new uint256[]((n + 255) / 256);
+
+        bool[] memory schnorrOk = new bool[](n);
+        bool[] memory pending = new bool[](n);
+        uint256[] memory x = new uint256[](n);
+        uint256 pendingCount = 0;
+
+        for (uint256 i = 0; i < n; i++) {
+            if (schnorrProofVerified[proofs[i].studentDid]) {
+                schnorrOk[i] = true;
+                continue;
+            }
+            x[i] = uint256(keccak256(abi.encodePacked(proofs[i].employerHashedEmail)));
+            // verify() reverts when c * x overflows, so such a proof can never pass
+            if (x[i] != 0 && proofs[i].c > type(uint256).max / x[i]) {
+                continue;
+            }
+            // An R that is not reduced mod p is checked on its own, with verify()'s arithmetic
+            if (proofs[i].R >= p) {
+                schnorrOk[i] = schnorrHolds(proofs[i], g, p);
+                continue;
+            }
+            pending[i] = true;
+            pendingCount++;
+        }
+
+        if (pendingCount > 0) {
+            bool combined = batchSchnorrCheck(proofs, pending, x, g, p);
+            for (uint256 i = 0; i < n; i++) {
+                if (!pending[i]) {
+                    continue;
+                }
+                schnorrOk[i] = combined || schnorrHolds(proofs[i], g, p);
+            }
+        }
+
+        // In order, as verify() would run them: a DID verified by an earlier proof of the
+        // batch no longer needs its Schnorr check
+        uint256 passed = 0;
+        for (uint256 i = 0; i < n; i++) {
+            if (!schnorrOk[i] && !schnorrProofVerified[proofs[i].studentDid]) {
+                continue;
+            }
+            schnorrProofVerified[proofs[i].studentDid] = true;
+            if (verifyHashedVC(proofs[i].hashedVCFromVP, proofs[i].ipfsHashedVC)) {
+                bitmap[i / 256] |= uint256(1) << (i % 256);
+                passed++;
+            }
+        }
+
+        emit BatchVerification(n, passed, bitmap);
+        return bitmap;
+    }
+
+    // verify()'s check of one proof, false where verify() would revert on the overflow of
+    // R * g^(c*x) (c * x itself is checked by the caller)
+    function schnorrHolds(Proof memory proof, uint256 g, uint256 p) internal pure returns (bool) {
+        uint256 gcx = modExp(g, proof.c * uint256(keccak256(abi.encodePacked(proof.employerHashedEmail))), p);
+        if (gcx != 0 && proof.R > type(uint256).max / gcx) {
+            return false;
+        }
+        return modExp(g, proof.s, p) == (proof.R * gcx) % p;
+    }
+
+    // Checks g^(sum a_i * (s_i - c_i * x_i)) == prod R_i^a_i (mod p) over all pending proofs,
+    // with the weights a_i derived from the batch itself. Exponents are reduced mod p - 1.
+    function batchSchnorrCheck(
+        Proof[] memory proofs,
+        bool[] memory pending,
+        uint256[] memory x,
+        uint256 g,
+        uint256 p
+    ) internal pure returns (bool) {
+        uint256 order = p - 1;
+        bytes32 seed = keccak256(abi.encode(proofs, g, p));
+        uint256[] memory weights = new uint256[](proofs.length);
+        uint256 exponent = 0;
+
+        for (uint256 i = 0; i < proofs.length; i++) {
+            if (!pending[i]) {
+                continue;
+            }
+            weights[i] = uint256(uint64(uint256(keccak256(abi.encodePacked(seed, i))))) | 1;
+            uint256 a = weights[i] % order;
+            uint256 cx = mulmod(proofs[i].c % order, x[i] % order, order);
+            uint256 e = addmod(proofs[i].s % order, order - cx, order);
+            exponent = addmod(exponent, mulmod(a, e, order), order);
+        }
+
+        return modExp(g, exponent, p) == multiExp(proofs, pending, weights, p);
+    }
+
+    // prod R_i^w_i mod p with one shared squaring chain (Straus, 64-bit exponents)
+    function multiExp(
+        Proof[] memory proofs,
+        bool[] memory pending,
+        uint256[] memory weights,
+        uint256 p
+    ) internal pure returns (uint256) {
+        uint256 result = 1;
+        for (uint256 bit = 64; bit > 0; bit--) {
+            result = mulmod(result, result, p);
+            for (uint256 i = 0; i < proofs.length; i++) {
+                if (pending[i] && ((weights[i] >> (bit - 1)) & 1) == 1) {
+                    result = mulmod(result, proofs[i].R, p);
+                }
+            }
+        }
+        return result;
+    }
+
     function verifySchnorrProof(
         uint256 R, 
         uint256 s, 
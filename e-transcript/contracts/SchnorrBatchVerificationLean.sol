@@ -0,0 +1,275 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+// Production build of SchnorrBatchVerification: same checks, without the debug events and
+// with fixed-size arguments. Hashes are passed as bytes32 instead of hex strings:
+//   employerKey = keccak256(bytes(employerHashedEmail))   (the x of the Schnorr check)
+//   didKey      = keccak256(bytes(studentDid))
+//   hashedVC    = the raw 32-byte SHA-256 digest
+// The per-DID state (index and Schnorr flag) is packed into a single storage slot.
+contract SchnorrBatchVerificationLean {
+
+    struct DidRecord {
+        uint248 index;
+        bool schnorrVerified;
+    }
+
+    mapping(bytes32 => DidRecord) private didRecords;
+
+    // Same revocation status list as SchnorrBatchVerification
+    mapping(uint256 => uint256) public revocationWords;
+
+    // Group of verifyInGroup, as in SchnorrBatchVerification
+    bytes public groupP;
+    bytes public groupG;
+    uint256 public groupQ;
+
+    // Deployer, the only account allowed to change the group and the status list
+    address public owner;
+
+    event BatchVerification(uint256 batchSize, uint256 passed, uint256[] bitmap);
+    event RevocationWordsUpdated(uint256[] wordIndexes);
+
+    struct Proof {
+        uint256 R;
+        uint256 s;
+        uint256 c;
+        bytes32 employerKey;
+        bytes32 hashedVCFromVP;
+        bytes32 didKey;
+        bytes32 ipfsHashedVC;
+    }
+
+    constructor() {
+        owner = msg.sender;
+    }
+
+    function storeDidToIndex(bytes32 didKey, uint248 index) public {
+        didRecords[didKey].index = index;
+    }
+
+    function getIndexByDid(bytes32 didKey) public view returns (uint256) {
+        return didRecords[didKey].index;
+    }
+
+    function schnorrProofVerified(bytes32 didKey) public view returns (bool) {
+        return didRecords[didKey].schnorrVerified;
+    }
+
+    function setRevocationWords(uint256[] memory wordIndexes, uint256[] memory words) public {
+        require(msg.sender == owner, "Only the owner can change the status list");
+        require(wordIndexes.length == words.length, "Length mismatch");
+        for (uint256 i = 0; i < wordIndexes.length; i++) {
+            revocationWords[wordIndexes[i]] = words[i];
+        }
+        emit RevocationWordsUpdated(wordIndexes);
+    }
+
+    function isRevoked(uint256 statusIndex) public view returns (bool) {
+        return ((revocationWords[statusIndex / 256] >> (statusIndex % 256)) & 1) == 1;
+    }
+
+    function getChallenge(uint256 R) public view returns (uint256) {
+        return uint256(keccak256(abi.encodePacked(R, block.timestamp))) % 23;
+    }
+
+    // Only the owner may set the group: a weak group would let anyone pass verifyInGroup
+    function setGroup(bytes memory p, uint256 q, bytes memory g) public {
+        require(msg.sender == owner, "Only the owner can set the group");
+        require(p.length == g.length && q > 1, "Invalid group");
+        groupP = p;
+        groupQ = q;
+        groupG = g;
+    }
+
+    function getChallengeInGroup(bytes memory R) public view returns (uint256) {
+        return uint256(keccak256(abi.encodePacked(R, block.timestamp))) % groupQ;
+    }
+
+    function verifyInGroup(
+        bytes memory R,
+        uint256 s,
+        uint256 c,
+        bytes32 employerKey,
+        bytes32 hashedVCFromVP,
+        bytes32 didKey,
+        bytes32 ipfsHashedVC
+    ) public returns (bool) {
+        DidRecord storage record = didRecords[didKey];
+        if (!record.schnorrVerified) {
+            if (!groupSchnorrHolds(R, s, c, uint256(employerKey))) {
+                return false;
+            }
+            record.schnorrVerified = true;
+        }
+        return hashedVCFromVP == ipfsHashedVC;
+    }
+
+    // g^((s - c*x) mod q) == R, one modexp precompile call
+    function groupSchnorrHolds(bytes memory R, uint256 s, uint256 c, uint256 x) internal view returns (bool) {
+        uint256 q = groupQ;
+        require(q > 0, "Group not set");
+        uint256 e = addmod(s % q, q - mulmod(c % q, x % q, q), q);
+        bytes memory p = groupP;
+        (bool ok, bytes memory gE) = address(5).staticcall(
+            abi.encodePacked(groupG.length, uint256(32), p.length, groupG, e, p)
+        );
+        require(ok, "modexp failed");
+        return R.length == p.length && keccak256(gE) == keccak256(R);
+    }
+
+    function verify(
+        uint256 R,
+        uint256 s,
+        uint256 g,
+        uint256 p,
+        uint256 c,
+        bytes32 employerKey,
+        bytes32 hashedVCFromVP,
+        bytes32 didKey,
+        bytes32 ipfsHashedVC
+    ) public returns (bool) {
+        DidRecord storage record = didRecords[didKey];
+        if (!record.schnorrVerified) {
+            if (modExp(g, s, p) != calculateRHS(R, g, c, employerKey, p)) {
+                return false;
+            }
+            record.schnorrVerified = true;
+        }
+        return hashedVCFromVP == ipfsHashedVC;
+    }
+
+    // Same as SchnorrBatchVerification.verifyBatch: one shared random-linear-combination
+    // check for all pending Schnorr proofs, per-proof checks only if it fails, and the
+    // outcome of verify() called once per proof in order.
+    function verifyBatch(Proof[] memory proofs, uint256 g, uint256 p) public returns (uint256[] memory bitmap) {
+        require(p > 2 && p <= type(uint128).max && g < p, "Group must fit 128 bits");
+        uint256 n = proofs.length;
+        bitmap = new uint256[]((n + 255) / 256);
+
+        bool[] memory schnorrOk = new bool[](n);
+        bool[] memory pending = new bool[](n);
+        bool anyPending = false;
+
+        for (uint256 i = 0; i < n; i++) {
+            if (didRecords[proofs[i].didKey].schnorrVerified) {
+                schnorrOk[i] = true;
+                continue;
+            }
+            uint256 x = uint256(proofs[i].employerKey);
+            // verify() reverts when c * x overflows, so such a proof can never pass
+            if (x != 0 && proofs[i].c > type(uint256).max / x) {
+                continue;
+            }
+            // An R that is not reduced mod p is checked on its own, with verify()'s arithmetic
+            if (proofs[i].R >= p) {
+                schnorrOk[i] = schnorrHolds(proofs[i], g, p);
+                continue;
+            }
+            pending[i] = true;
+            anyPending = true;
+        }
+
+        if (anyPending) {
+            bool combined = batchSchnorrCheck(proofs, pending, g, p);
+            for (uint256 i = 0; i < n; i++) {
+                if (pending[i]) {
+                    schnorrOk[i] = combined || schnorrHolds(proofs[i], g, p);
+                }
+            }
+        }
+
+        // In order, as verify() would run them: a DID verified by an earlier proof of the
+        // batch no longer needs its Schnorr check
+        uint256 passed = 0;
+        for (uint256 i = 0; i < n; i++) {
+            if (!schnorrOk[i] && !didRecords[proofs[i].didKey].schnorrVerified) {
+                continue;
+            }
+            didRecords[proofs[i].didKey].schnorrVerified = true;
+            if (proofs[i].hashedVCFromVP == proofs[i].ipfsHashedVC) {
+                bitmap[i / 256] |= uint256(1) << (i % 256);
+                passed++;
+            }
+        }
+
+        emit BatchVerification(n, passed, bitmap);
+        return bitmap;
+    }
+
+    // verify()'s check of one proof, false where verify() would revert on the overflow of
+    // R * g^(c*x) (c * x itself is checked by the caller)
+    function schnorrHolds(Proof memory proof, uint256 g, uint256 p) internal pure returns (bool) {
+        uint256 gcx = modExp(g, proof.c * uint256(proof.employerKey), p);
+        if (gcx != 0 && proof.R > type(uint256).max / gcx) {
+            return false;
+        }
+        return modExp(g, proof.s, p) == (proof.R * gcx) % p;
+    }
+
+    function batchSchnorrCheck(
+        Proof[] memory proofs,
+        bool[] memory pending,
+        uint256 g,
+        uint256 p
+    ) internal pure returns (bool) {
+        uint256 order = p - 1;
+        bytes32 seed = keccak256(abi.encode(proofs, g, p));
+        uint256[] memory weights = new uint256[](proofs.length);
+        uint256 exponent = 0;
+
+        for (uint256 i = 0; i < proofs.length; i++) {
+            if (!pending[i]) {
+                continue;
+            }
+            weights[i] = uint256(uint64(uint256(keccak256(abi.encodePacked(seed, i))))) | 1;
+            uint256 a = weights[i] % order;
+            uint256 cx = mulmod(proofs[i].c % order, uint256(proofs[i].employerKey) % order, order);
+            uint256 e = addmod(proofs[i].s % order, order - cx, order);
+            exponent = addmod(exponent, mulmod(a, e, order), order);
+        }
+
+        return modExp(g, exponent, p) == multiExp(proofs, pending, weights, p);
+    }
+
+    function multiExp(
+        Proof[] memory proofs,
+        bool[] memory pending,
+        uint256[] memory weights,
+        uint256 p
+    ) internal pure returns (uint256) {
+        uint256 result = 1;
+        for (uint256 bit = 64; bit > 0; bit--) {
+            result = mulmod(result, result, p);
+            for (uint256 i = 0; i < proofs.length; i++) {
+                if (pending[i] && ((weights[i] >> (bit - 1)) & 1) == 1) {
+                    result = mulmod(result, proofs[i].R, p);
+                }
+            }
+        }
+        return result;
+    }
+
+    function modExp(uint256 base, uint256 exp, uint256 mod) internal pure returns (uint256) {
+        uint256 result = 1;
+        while (exp > 0) {
+            if (exp % 2 == 1) {
+                result = (result * base) % mod;
+            }
+            base = (base * base) % mod;
+            exp /= 2;
+        }
+        return result;
+    }
+
+    function calculateRHS(
+        uint256 R,
+        uint256 g,
+        uint256 c,
+        bytes32 employerKey,
+        uint256 p
+    ) internal pure returns (uint256) {
+        uint256 g_cx = modExp(g, c * uint256(employerKey), p);
+        return (R * g_cx) % p;
+    }
+}
@@ -1,5 +1,7 @@
 const SchnorrBatchVerification = artifacts.require("SchnorrBatchVerification");
+const SchnorrBatchVerificationLean = artifacts.require("SchnorrBatchVerificationLean");
 
 module.exports = function (deployer) {
   deployer.deploy(SchnorrBatchVerification);
+  deployer.deploy(SchnorrBatchVerificationLean);
 };
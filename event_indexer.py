@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from web3.exceptions import Web3RPCError
+
+# Local index of the contract's events, so verification outcomes come from one eth_getLogs
+# request per block range instead of one receipt per transaction. Logs are decoded with the
+# contract ABI and stored in SQLite by transaction hash and student DID. The last indexed
+# block is checkpointed in the same database transaction as the logs, so sync() resumes
+# where the previous run (or process) stopped.
+#
+# verify() and verifyInGroup() of the debug build log the outcome of every call (DebugFailure
+# or DebugVCVerification), also when they return false without reverting. A reverted
+# transaction has no logs at all. The lean build logs nothing per proof.
+
+EVENT_DB = 'events.db'
+BLOCK_RANGE = int(os.environ.get('INDEXER_BLOCK_RANGE', 2000))  # blocks per eth_getLogs request
+CONFIRMATIONS = int(os.environ.get('INDEXER_CONFIRMATIONS', 0))  # blocks left unindexed behind the head
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    contract_address TEXT,
+    block_number INTEGER,
+    log_index INTEGER,
+    tx_hash TEXT,
+    event TEXT,
+    student_did TEXT,
+    args TEXT,
+    PRIMARY KEY (contract_address, block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_tx_hash ON events (tx_hash);
+CREATE INDEX IF NOT EXISTS events_student_did ON events (student_did);
+CREATE TABLE IF NOT EXISTS outcomes (
+    tx_hash TEXT PRIMARY KEY,
+    contract_address TEXT,
+    block_number INTEGER,
+    student_did TEXT,
+    passed INTEGER,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS outcomes_student_did ON outcomes (student_did);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    contract_address TEXT PRIMARY KEY,
+    block_number INTEGER
+);
+'''
+
+# Parts of the error messages nodes return when an eth_getLogs block range or result is too
+# large (geth, Erigon, Nethermind, Besu and the hosted providers word it differently)
+RANGE_ERROR_MARKERS = ('range', 'more than', 'too many', 'too large', 'limit', 'exceed', 'response size', 'query timeout')
+
+# Function to check whether an eth_getLogs error asks for a smaller request. Other errors
+# (connection failures, timeouts of the HTTP request itself) are raised to the caller.
+def is_range_error(error):
+    if not isinstance(error, Web3RPCError):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+OUTCOME_COLUMNS = ('tx_hash', 'block_number', 'student_did', 'passed', 'reason')
+
+# Function to normalize a transaction hash (bytes or hex string) to lowercase 0x-hex
+def hex_hash(tx_hash):
+    return tx_hash.lower() if isinstance(tx_hash, str) else Web3.to_hex(tx_hash)
+
+# Function to make decoded event arguments JSON serializable (bytes32 values become hex)
+def json_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(value)
+    if isinstance(value, (list, tuple)):
+        return [json_value(item) for item in value]
+    return value
+
+# Function to work out the outcome of one verify() call from its events, in log order.
+# Returns (student_did, passed, reason), or None for transactions that verify nothing.
+def transaction_outcome(tx_events):
+    student_did = next((args['studentDid'] for _, args in tx_events if 'studentDid' in args), None)
+    for event, args in tx_events:
+        if event == 'DebugFailure':
+            return student_did, False, args['message']
+    for event, args in tx_events:
+        if event == 'DebugVCVerification':
+            return student_did, args['vcVerified'], None
+    return None
+
+class EventIndexer:
+    def __init__(self, w3, contract, db_path=EVENT_DB, start_block=0, block_range=BLOCK_RANGE, confirmations=CONFIRMATIONS):
+        self.w3 = w3
+        self.address = contract.address
+        self.start_block = start_block
+        self.block_range = block_range
+        self.confirmations = confirmations
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+        # Event decoders by topic, built once from the ABI
+        self.events_by_topic = {
+            event_abi_to_log_topic(abi): contract.events[abi['name']]()
+            for abi in contract.abi if abi['type'] == 'event' and not abi.get('anonymous')
+        }
+
+    def close(self):
+        self.db.close()
+
+    # Function to get the last indexed block
+    def checkpoint(self):
+        row = self.db.execute('SELECT block_number FROM checkpoints WHERE contract_address = ?', (self.address,)).fetchone()
+        return row[0] if row else self.start_block - 1
+
+    # Function to index all logs up to `to_block` (default: the head minus CONFIRMATIONS).
+    # Returns the number of logs stored.
+    def sync(self, to_block=None):
+        with self.lock:
+            head = self.w3.eth.block_number
+            to_block = head - self.confirmations if to_block is None else min(to_block, head)
+            start = self.checkpoint() + 1
+            stored = 0
+
+            # Nodes cap the block range or result size of eth_getLogs: a range they refuse is
+            # halved, and after each request that succeeds it doubles again, back up to the
+            # configured block_range
+            block_range = self.block_range
+            while start <= to_block:
+                end = min(start + block_range - 1, to_block)
+                try:
+                    logs = self.w3.eth.get_logs({'address': self.address, 'fromBlock': start, 'toBlock': end})
+                except Exception as e:
+                    if end == start or not is_range_error(e):
+                        raise
+                    block_range = max(1, (end - start + 1) // 2)
+                    continue
+                stored += self.store(logs, end)
+                start = end + 1
+                block_range = min(self.block_range, block_range * 2)
+
+            return stored
+
+    # Function to decode and store one range of logs and move the checkpoint to its end.
+    # Several processes may index the same range; rows are replaced and the checkpoint only
+    # moves forward.
+    def store(self, logs, end_block):
+        event_rows = []
+        by_transaction = {}
+        for log in logs:
+            decoder = self.events_by_topic.get(log['topics'][0]) if log['topics'] else None
+            if decoder is None:
+                continue
+            event = decoder.process_log(log)
+            args = {name: json_value(value) for name, value in event['args'].items()}
+            tx_hash = hex_hash(log['transactionHash'])
+            event_rows.append((
+                self.address, log['blockNumber'], log['logIndex'], tx_hash, event['event'],
+                args.get('studentDid'), json.dumps(args)
+            ))
+            by_transaction.setdefault((tx_hash, log['blockNumber']), []).append((event['event'], args))
+
+        outcome_rows = []
+        for (tx_hash, block_number), tx_events in by_transaction.items():
+            outcome = transaction_outcome(tx_events)
+            if outcome:
+                student_did, passed, reason = outcome
+                outcome_rows.append((tx_hash, self.address, block_number, student_did, int(passed), reason))
+
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)', event_rows)
+            self.db.executemany('INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?)', outcome_rows)
+            self.db.execute(
+                'INSERT INTO checkpoints VALUES (?, ?) ON CONFLICT (contract_address) DO UPDATE SET block_number = MAX(block_number, excluded.block_number)',
+                (self.address, end_block)
+            )
+        return len(event_rows)
+
+    def outcome_dict(self, row):
+        outcome = dict(zip(OUTCOME_COLUMNS, row))
+        outcome['passed'] = bool(outcome['passed'])
+        return outcome
+
+    # Function to get the outcomes of the given transactions by hash. Transactions that are
+    # indexed but missing here logged no outcome (e.g. they reverted).
+    def outcomes(self, tx_hashes):
+        tx_hashes = [hex_hash(tx_hash) for tx_hash in tx_hashes]
+        found = {}
+        for start in range(0, len(tx_hashes), 500):
+            chunk = tx_hashes[start:start + 500]
+            rows = self.db.execute(
+                f'SELECT {", ".join(OUTCOME_COLUMNS)} FROM outcomes WHERE tx_hash IN ({", ".join("?" * len(chunk))})', chunk
+            ).fetchall()
+            found.update((row[0], self.outcome_dict(row)) for row in rows)
+        return found
+
+    # Function to get every indexed verification of a student, oldest first
+    def student_outcomes(self, student_did):
+        rows = self.db.execute(
+            f'SELECT {", ".join(OUTCOME_COLUMNS)} FROM outcomes WHERE contract_address = ? AND student_did = ? ORDER BY block_number',
+            (self.address, student_did)
+        ).fetchall()
+        return [self.outcome_dict(row) for row in rows]
+
+    # Function to get the decoded events of one transaction
+    def transaction_events(self, tx_hash):
+        rows = self.db.execute(
+            'SELECT event, args FROM events WHERE tx_hash = ? ORDER BY log_index', (hex_hash(tx_hash),)
+        ).fetchall()
+        return [{"event": event, "args": json.loads(args)} for event, args in rows]
+
+    def stats(self):
+        events, = self.db.execute('SELECT COUNT(*) FROM events WHERE contract_address = ?', (self.address,)).fetchone()
+        passed, failed = self.db.execute(
+            'SELECT COALESCE(SUM(passed), 0), COALESCE(SUM(1 - passed), 0) FROM outcomes WHERE contract_address = ?', (self.address,)
+        ).fetchone()
+        return {"checkpoint": self.checkpoint(), "events": events, "passed": passed, "failed": failed}
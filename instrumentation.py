@@ -0,0 +1,85 @@
+import contextlib
+import logging
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Metrics, logging and profiling for app.py. Hot-path stages are timed into one Prometheus
+# histogram labelled by stage and served as text on /metrics. Per-proof debug output goes
+# through the "ev_transcript" logger at DEBUG level, so it costs nothing unless LOG_LEVEL=DEBUG.
+# Under serve.py every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR and /metrics adds
+# up the files of all of them.
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+log = logging.getLogger('ev_transcript')
+log.setLevel(LOG_LEVEL)
+
+STAGES = (
+    'hash',  # SHA-256 / keccak hashing of proof inputs
+    'get_challenge',  # getChallenge calls for a set of commitments
+    'credential_lookup',  # credential store lookups
+    'file_load',  # reading the payload file
+    'tx_submit',  # sending a transaction
+    'receipt_wait',  # waiting for its receipt
+    'tx_pipeline',  # a whole pipelined run (submit and wait overlap there)
+    'event_index',  # eth_getLogs sync of the event index
+)
+
+# Buckets from 10 microseconds (a hash) to a minute (a large verifyBatch receipt)
+STAGE_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+STAGE_SECONDS = Histogram('ev_transcript_stage_seconds', 'Time spent per hot-path stage', ['stage'], buckets=STAGE_BUCKETS)
+GAS_USED = Counter('ev_transcript_gas_used', 'Gas used by verification transactions', ['mode'])
+PROOFS = Counter('ev_transcript_proofs', 'Proofs verified', ['mode', 'result'])
+
+# Label children are looked up once, so timing a stage is a dict lookup and one observe()
+_stage_histograms = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+# Context manager timing one pass through a stage
+@contextlib.contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_histograms[name].observe(time.perf_counter() - start)
+
+# Function to render the metrics of this process, or of all processes in multiprocess mode
+def metrics_response():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # profiling is optional
+    Profiler = None
+
+# Context manager running the sampling profiler (pyinstrument) over a block and writing its
+# HTML report to PROFILE_DIR. Yields the report path, or None if pyinstrument is missing.
+@contextlib.contextmanager
+def profiled(name):
+    if Profiler is None:
+        log.warning("Profiling requested but pyinstrument is not installed")
+        yield None
+        return
+
+    profiler = Profiler()
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.html")
+    profiler.start()
+    try:
+        yield path
+    finally:
+        profiler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+        log.info("Wrote profile %s", path)
@@ -0,0 +1,259 @@
+import argparse
+import base64
+import copy
+import hashlib
+import json
+import os
+import time
+
+import qrcode
+from fpdf import FPDF
+
+import hash_vc
+import streaming
+from pki import signers
+
+# Bulk transcript issuance. For every student of the batch verification payload a worker
+# process builds the student's VC and hashes it, renders the transcript PDF with a QR code
+# carrying the DID and VC hash, and signs the PDF with the PKI key.
+# PDFs are written to the output directory by the workers; the parent appends one manifest
+# line per transcript (file, PDF digest, signature) and the VC hash to ipfs.jsonl as chunks
+# finish, then rebuilds the Merkle tree, as hash_vc.py --stream does.
+#
+#   python issue_transcripts.py [--payload batch_verification_payload.json] [--algorithm ed25519]
+#
+# Students already in the manifest are skipped, so an interrupted issuance can be restarted
+# with the same arguments.
+
+PAYLOAD_FILE = 'batch_verification_payload.json'
+OUTPUT_DIR = 'transcripts'
+MANIFEST_FILE = 'issued.jsonl'  # inside the output directory
+CHUNK_SIZE = 64  # transcripts per worker task
+STAGES = ('vc', 'qr', 'render', 'sign', 'write')
+QR_POSITION = (150, 8)  # top left corner of the QR code on the page, in mm
+QR_SIZE = 45  # mm
+QR_MASK_PATTERN = 0  # fixed, see qr_matrix
+# What the manifest's signature is, per algorithm. All are signatures over the PDF bytes.
+SIGNATURE_SCHEMES = {'rsa-pss': 'RSASSA-PSS-SHA256', 'ecdsa-p256': 'ECDSA-P256-SHA256', 'ed25519': 'Ed25519'}
+
+# Function to read the students of the payload, either batch_verification_payload.json or the
+# JSON Lines file acl_create.py --stream writes
+def iter_students(path):
+    if path.endswith('.jsonl'):
+        yield from streaming.iter_jsonl(path)
+        return
+    with open(path, 'r') as file:
+        yield from json.load(file)['students']
+
+# Function to get the credential index of a student from its DID (did:university:student<index>)
+def student_index(student_did):
+    return int(student_did.rsplit('student', 1)[1])
+
+_template = None
+_signers = {}
+
+# Function to get this process's transcript template: the page with everything that is the
+# same for every student, laid out once and copied per transcript
+def transcript_template():
+    global _template
+    if _template is None:
+        pdf = FPDF()
+        pdf.set_title('Academic Transcript')
+        pdf.set_creator('did:university:issuer123')
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 18)
+        pdf.cell(0, 12, 'University Academic Transcript', ln=1)
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 6, 'Issuer: did:university:issuer123', ln=1)
+        pdf.cell(0, 6, f"Issued: {hash_vc.make_vc(0)['issuanceDate']}", ln=1)
+        pdf.ln(8)
+        pdf.set_font('Arial', 'B', 11)
+        for label in ('Student', 'Student DID', 'Credential', 'VC hash (SHA-256)'):
+            pdf.cell(45, 8, label, ln=1)
+        pdf.set_y(250)
+        pdf.set_font('Arial', 'I', 8)
+        pdf.multi_cell(0, 4, 'Scan the QR code to read the student DID and the credential hash, and check the '
+                             'hash against the Merkle root on-chain. The PDF is signed with the issuer PKI key.')
+        _template = pdf
+    return _template
+
+def get_signer(algorithm):
+    if algorithm not in _signers:
+        _signers[algorithm] = signers.load_signer(algorithm)
+    return _signers[algorithm]
+
+# Function to sign a PDF. RSA-PSS and ECDSA sign its SHA-256 digest as a prehashed value, which
+# is the same signature as over the PDF; Ed25519 has no prehashed mode and signs the PDF itself.
+def sign_pdf(signer, pdf_bytes, digest):
+    if hasattr(signer, 'sign_message'):
+        return signer.sign_message(pdf_bytes)
+    return signer.sign_digest(digest)
+
+# Function to get the QR code carrying the DID and VC hash as a matrix of dark (True) modules.
+# The mask pattern is fixed instead of trying all eight for the best score, which is most of
+# the encoding time; every mask pattern gives a valid code.
+def qr_matrix(student_did, hashed_vc):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(json.dumps({"did": student_did, "vc_hash": hashed_vc}, separators=(',', ':')))
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+# Function to draw a QR matrix as filled rectangles, one per horizontal run of dark modules.
+# Vector drawing needs no image file, which fpdf 1.7.2 would otherwise read back and decode.
+def draw_qr(pdf, matrix):
+    x0, y0 = QR_POSITION
+    module = QR_SIZE / len(matrix)
+    pdf.set_fill_color(0)
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            run_start = x
+            while x < len(row) and row[x]:
+                x += 1
+            pdf.rect(x0 + run_start * module, y0 + y * module, (x - run_start) * module, module, 'F')
+
+# Function to render one transcript and return the PDF bytes
+def render_transcript(vc, hashed_vc, matrix):
+    pdf = copy.deepcopy(transcript_template())
+    pdf.set_font('Arial', '', 11)
+    for row, value in enumerate((vc['credentialSubject']['name'], vc['credentialSubject']['id'], vc['id'], hashed_vc)):
+        pdf.set_xy(55, 44 + row * 8)
+        pdf.cell(0, 8, value)
+    draw_qr(pdf, matrix)
+    return pdf.output(dest='S').encode('latin-1')
+
+# Worker function: issue the transcripts of one chunk of students. Returns the manifest lines,
+# the (student DID, VC hash) pairs and the time spent per stage.
+def issue_chunk(task):
+    students, output_dir, algorithm = task
+    signer = get_signer(algorithm)
+    timings = dict.fromkeys(STAGES, 0.0)
+    manifest_lines = []
+    hashed_vcs = []
+
+    for index, student_did in students:
+        start = time.perf_counter()
+        vc = hash_vc.make_vc(index)
+        hashed_vc = hash_vc.hash_verifiable_credential(vc)
+        built = time.perf_counter()
+        matrix = qr_matrix(student_did, hashed_vc)
+        coded = time.perf_counter()
+        pdf_bytes = render_transcript(vc, hashed_vc, matrix)
+        rendered = time.perf_counter()
+        digest = hashlib.sha256(pdf_bytes).digest()
+        signature = sign_pdf(signer, pdf_bytes, digest)
+        signed = time.perf_counter()
+        filename = f'student{index}.pdf'
+        with open(os.path.join(output_dir, filename), 'wb') as file:
+            file.write(pdf_bytes)
+        written = time.perf_counter()
+
+        timings['vc'] += built - start
+        timings['qr'] += coded - built
+        timings['render'] += rendered - coded
+        timings['sign'] += signed - rendered
+        timings['write'] += written - signed
+        manifest_lines.append(streaming.dump_line({
+            "index": index,
+            "student_did": student_did,
+            "hashed_vc": hashed_vc,
+            "file": filename,
+            "pdf_sha256": digest.hex(),
+            "algorithm": algorithm,
+            "signature_scheme": SIGNATURE_SCHEMES[algorithm],
+            "signature": base64.b64encode(signature).decode()
+        }))
+        hashed_vcs.append((student_did, hashed_vc))
+
+    return manifest_lines, hashed_vcs, timings
+
+# Function to get what is needed to append to ipfs.jsonl without breaking its numbering: the
+# stored DIDs, the indices in use and the offset of index over student number of its last
+# record. The shipped ipfs.json does not number every student by its DID (student1 is at
+# index 0), so new records follow the file rather than the DID.
+def ipfs_numbering():
+    stored = set()
+    used = set()
+    offset = 0
+    for record in streaming.iter_jsonl(hash_vc.IPFS_JSONL):
+        stored.add(record["student_did"])
+        used.add(record["index"])
+        offset = record["index"] - student_index(record["student_did"])
+    return stored, used, offset
+
+# Function to issue the transcripts of every student in the payload that is not in the
+# manifest yet. ipfs.jsonl is first seeded from ipfs.json, then VC hashes are appended unless
+# the student's DID is already there (make_vc is deterministic, so the stored hash is the
+# same). An appended record's index is the student number plus the offset of the file's last
+# record, or the next free index if that one is taken.
+# Returns the number issued, the elapsed time and the time per stage summed over the workers.
+def issue_transcripts(payload=PAYLOAD_FILE, output_dir=OUTPUT_DIR, algorithm=signers.DEFAULT_ALGORITHM,
+                      workers=None, chunk_size=CHUNK_SIZE):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    hash_vc.seed_ipfs_jsonl()
+    # Indices rather than the last record, since the payload need not be sorted
+    issued = {record["index"] for record in streaming.iter_jsonl(manifest_path)}
+    stored, used, offset = ipfs_numbering()
+    next_free = max(used) + 1 if used else 0
+
+    get_signer(algorithm)  # make sure the key file exists before the workers load it
+    students = (
+        (student_index(student['student_did']), student['student_did'])
+        for student in iter_students(payload)
+    )
+
+    # Function to pass on each student not issued yet, once
+    def pending(students):
+        for index, student_did in students:
+            if index not in issued:
+                issued.add(index)
+                yield index, student_did
+
+    tasks = ((chunk, output_dir, algorithm) for chunk in streaming.chunked(pending(students), chunk_size))
+
+    count = 0
+    timings = dict.fromkeys(STAGES, 0.0)
+    start = time.perf_counter()
+    for manifest_lines, hashed_vcs, chunk_timings in streaming.parallel_map(issue_chunk, tasks, workers):
+        streaming.append_lines(manifest_path, manifest_lines)
+        new_lines = []
+        for student_did, hashed_vc in hashed_vcs:
+            if student_did in stored:
+                continue
+            index = student_index(student_did) + offset
+            if index in used or index < 0:
+                index = next_free
+            used.add(index)
+            next_free = max(next_free, index + 1)
+            stored.add(student_did)
+            new_lines.append(streaming.dump_line({"index": index, "student_did": student_did, "hashed_vc": hashed_vc}))
+        streaming.append_lines(hash_vc.IPFS_JSONL, new_lines)
+        count += len(manifest_lines)
+        for stage, seconds in chunk_timings.items():
+            timings[stage] += seconds
+    return count, time.perf_counter() - start, timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Issue signed transcript PDFs for every student of the payload")
+    parser.add_argument('--payload', default=PAYLOAD_FILE)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--algorithm', choices=sorted(signers.SIGNERS), default=signers.DEFAULT_ALGORITHM)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    count, elapsed, timings = issue_transcripts(args.payload, args.output_dir, args.algorithm, args.workers, args.chunk_size)
+    print(f"{count} transcripts issued to {args.output_dir} in {elapsed:.2f}s "
+          f"({count / elapsed if elapsed else 0:.1f} transcripts/s, {args.algorithm}).")
+    if count:
+        print("Time per transcript: " + ", ".join(
+            f"{stage} {seconds / count * 1000:.2f} ms" for stage, seconds in timings.items()
+        ))
+        hash_vc.rebuild_merkle_tree_stream()
+
+if __name__ == "__main__":
+    main()
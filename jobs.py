@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for long-running requests such as /batch_verify. Each job runs on a small
+# thread pool; its state, progress and per-item results are kept in SQLite, so a client can
+# poll or stream them and the job table survives a restart. Every job records the process that
+# owns it; when that process is gone (a restart, or a serve.py worker that exited) the next
+# manager to recover takes its jobs over. Jobs that were still queued are started again; jobs
+# that were running are marked failed, since their transactions may already have been sent.
+
+JOB_DB = 'jobs.db'
+JOB_WORKERS = 2  # jobs running at the same time
+MAX_QUEUED_JOBS = 16  # jobs waiting for a worker before submit() refuses new ones
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT,
+    params TEXT,
+    status TEXT,
+    total INTEGER,
+    done INTEGER,
+    created REAL,
+    started REAL,
+    finished REAL,
+    summary TEXT,
+    error TEXT,
+    owner INTEGER
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT,
+    seq INTEGER,
+    result TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+'''
+
+JOB_COLUMNS = ('job_id', 'kind', 'params', 'status', 'total', 'done', 'created', 'started', 'finished', 'summary', 'error')
+FINISHED = ('succeeded', 'failed')
+
+class QueueFull(Exception):
+    pass
+
+# Function to check whether the process with this pid still exists
+def process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Handle a running job uses to report its progress
+class JobProgress:
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+
+    def set_total(self, total):
+        self.manager._execute('UPDATE jobs SET total = ? WHERE job_id = ?', (total, self.job_id))
+
+    # Function to record the result of one item; results are numbered in the order reported
+    def add_result(self, result):
+        with self.manager.lock:
+            done = self.manager.db.execute('SELECT done FROM jobs WHERE job_id = ?', (self.job_id,)).fetchone()[0]
+            self.manager.db.execute('INSERT INTO job_results (job_id, seq, result) VALUES (?, ?, ?)', (self.job_id, done + 1, json.dumps(result)))
+            self.manager.db.execute('UPDATE jobs SET done = ? WHERE job_id = ?', (done + 1, self.job_id))
+            self.manager.db.commit()
+
+class JobManager:
+    # runners maps a job kind to fn(params, progress) returning a JSON-serializable summary
+    # recover=False leaves the jobs of processes that are gone to another manager
+    def __init__(self, runners, db_path=JOB_DB, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS, recover=True):
+        self.runners = runners
+        self.max_queued = max_queued
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(jobs)')}
+        if 'owner' not in columns:
+            # Table created before owner: the jobs in it have none, so the next recover() takes them
+            self.db.execute('ALTER TABLE jobs ADD COLUMN owner INTEGER')
+            self.db.commit()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        if recover:
+            self.recover()
+
+    def _execute(self, sql, args=()):
+        with self.lock:
+            self.db.execute(sql, args)
+            self.db.commit()
+
+    # Function to take over the unfinished jobs of processes that are gone. Each job is claimed
+    # with a conditional update on its old owner, so managers recovering at the same time (e.g.
+    # several serve.py workers) never both take the same job.
+    def recover(self):
+        owner = os.getpid()
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT job_id, status, owner FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            ).fetchall()
+        for job_id, status, previous in rows:
+            if previous == owner or process_alive(previous):
+                continue
+            if status == 'running':
+                self._claim(
+                    "UPDATE jobs SET status = 'failed', finished = ?, error = ?, owner = ? WHERE job_id = ? AND owner IS ? AND status = 'running'",
+                    (time.time(), "Interrupted: its process exited", owner, job_id, previous)
+                )
+            elif self._claim("UPDATE jobs SET owner = ? WHERE job_id = ? AND owner IS ? AND status = 'queued'", (owner, job_id, previous)):
+                self.executor.submit(self._run, job_id)
+
+    # Function to run a claiming update; returns whether it changed the job
+    def _claim(self, sql, args):
+        with self.lock:
+            claimed = self.db.execute(sql, args).rowcount == 1
+            self.db.commit()
+        return claimed
+
+    def queued_count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    # Function to queue a job and return its id straight away. Raises QueueFull when
+    # max_queued jobs are already waiting.
+    def submit(self, kind, params):
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.queued_count() >= self.max_queued:
+            raise QueueFull(f"{self.max_queued} jobs are already waiting, try again later")
+
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (job_id, kind, params, status, total, done, created, owner) VALUES (?, ?, ?, 'queued', 0, 0, ?, ?)",
+            (job_id, kind, json.dumps(params), time.time(), os.getpid())
+        )
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        self._execute("UPDATE jobs SET status = 'running', started = ? WHERE job_id = ?", (time.time(), job_id))
+        try:
+            summary = self.runners[job['kind']](job['params'], JobProgress(self, job_id))
+            self._execute(
+                "UPDATE jobs SET status = 'succeeded', finished = ?, summary = ? WHERE job_id = ?",
+                (time.time(), json.dumps(summary), job_id)
+            )
+        except Exception as e:
+            self._execute(
+                "UPDATE jobs SET status = 'failed', finished = ?, error = ? WHERE job_id = ?",
+                (time.time(), str(e), job_id)
+            )
+
+    # Function to get a job as a dict (None if unknown)
+    def get(self, job_id):
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['summary'] = json.loads(job['summary']) if job['summary'] else None
+        return job
+
+    # Function to get the results of a job after result number `after`, as (seq, result) pairs
+    def results(self, job_id, after=0):
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT seq, result FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq', (job_id, after)
+            ).fetchall()
+        return [(seq, json.loads(result)) for seq, result in rows]
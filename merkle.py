@@ -0,0 +1,165 @@
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from eth_hash.auto import keccak
+
+# Merkle tree over (student_did, hashed_vc) credentials, kept on disk so proofs can be
+# produced for millions of leaves without holding the tree in memory.
+#
+# Leaf:  keccak256(0x00 || keccak256(studentDid) || keccak256(hashedVC))
+# Node:  keccak256(min(left, right) || max(left, right))   (sorted pair, so proofs need no
+#        left/right flags; an unpaired last node is carried up unchanged)
+#
+# File layout (big-endian):
+#   b'MRKL' | uint64 leaf count | level 0 (leaves) | level 1 | ... | root | uint64 index per leaf
+# Leaves are stored in ascending order of their ipfs.json index, which lets a leaf be found
+# from its index with a binary search.
+
+MERKLE_TREE_FILE = 'ipfs_merkle.bin'
+
+MAGIC = b'MRKL'
+HEADER = struct.Struct('>4sQ')
+NODE_SIZE = 32
+INDEX = struct.Struct('>Q')
+CHUNK_NODES = 65536  # nodes read or written per I/O call while building
+
+def leaf_hash(student_did, hashed_vc):
+    return keccak(b'\x00' + keccak(student_did.encode()) + keccak(hashed_vc.encode()))
+
+def hash_pair(a, b):
+    return keccak(a + b) if a < b else keccak(b + a)
+
+# Number of nodes on every level, from the leaves up to the root
+def level_sizes(leaf_count):
+    sizes = [leaf_count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+# Function to build the tree file from (index, student_did, hashed_vc) tuples in ascending
+# index order. Only one chunk of nodes is in memory at a time. Returns (root, leaf count).
+def build_tree(credentials, path=MERKLE_TREE_FILE):
+    directory = os.path.dirname(os.path.abspath(path))
+    leaf_count = 0
+    last_index = -1
+
+    with open(path, 'wb') as out, tempfile.TemporaryFile(dir=directory) as indices:
+        out.write(HEADER.pack(MAGIC, 0))
+
+        leaves = []
+        for index, student_did, hashed_vc in credentials:
+            index = int(index)
+            if index <= last_index:
+                raise ValueError(f"Credentials must be in ascending index order (got {index} after {last_index})")
+            last_index = index
+            leaves.append(leaf_hash(student_did, hashed_vc))
+            indices.write(INDEX.pack(index))
+            leaf_count += 1
+            if len(leaves) == CHUNK_NODES:
+                out.write(b''.join(leaves))
+                leaves = []
+        out.write(b''.join(leaves))
+
+        if leaf_count == 0:
+            raise ValueError("Cannot build a Merkle tree without credentials")
+
+        # Each level is read back from the file and its parents appended after it
+        out.flush()
+        with open(path, 'rb') as level_in:
+            offset = HEADER.size
+            for size in level_sizes(leaf_count)[:-1]:
+                level_in.seek(offset)
+                remaining = size
+                while remaining:
+                    count = min(remaining, CHUNK_NODES)  # CHUNK_NODES is even, so pairs never straddle chunks
+                    data = level_in.read(count * NODE_SIZE)
+                    parents = [
+                        hash_pair(data[i:i + NODE_SIZE], data[i + NODE_SIZE:i + 2 * NODE_SIZE])
+                        if i + NODE_SIZE < len(data) else data[i:i + NODE_SIZE]
+                        for i in range(0, len(data), 2 * NODE_SIZE)
+                    ]
+                    out.write(b''.join(parents))
+                    remaining -= count
+                out.flush()
+                offset += size * NODE_SIZE
+
+            level_in.seek(offset)
+            root = level_in.read(NODE_SIZE)
+
+        indices.seek(0)
+        while True:
+            data = indices.read(CHUNK_NODES * INDEX.size)
+            if not data:
+                break
+            out.write(data)
+
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, leaf_count))
+
+    return root, leaf_count
+
+def verify_proof(student_did, hashed_vc, proof, root):
+    node = leaf_hash(student_did, hashed_vc)
+    for sibling in proof:
+        node = hash_pair(node, sibling)
+    return node == root
+
+# Read-only, memory-mapped view of a tree file
+class MerkleTree:
+    def __init__(self, path=MERKLE_TREE_FILE):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.leaf_count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Merkle tree file")
+
+        self.level_offsets = []
+        offset = HEADER.size
+        self.sizes = level_sizes(self.leaf_count)
+        for size in self.sizes:
+            self.level_offsets.append(offset)
+            offset += size * NODE_SIZE
+        self.indices_offset = offset
+        self.root = self.node(len(self.sizes) - 1, 0)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def node(self, level, position):
+        offset = self.level_offsets[level] + position * NODE_SIZE
+        return self.data[offset:offset + NODE_SIZE]
+
+    def index_at(self, position):
+        return INDEX.unpack_from(self.data, self.indices_offset + position * INDEX.size)[0]
+
+    # Function to find the leaf position of an ipfs.json index, or None if it is not in the tree
+    def position_of(self, index):
+        positions = range(self.leaf_count)
+        position = bisect.bisect_left(positions, int(index), key=self.index_at)
+        if position < self.leaf_count and self.index_at(position) == int(index):
+            return position
+        return None
+
+    # Sibling hashes from the leaf up to the root (levels where the node is unpaired are skipped)
+    def proof(self, position):
+        siblings = []
+        for level, size in enumerate(self.sizes[:-1]):
+            sibling = position ^ 1
+            if sibling < size:
+                siblings.append(self.node(level, sibling))
+            position //= 2
+        return siblings
+
+    # Generator over (index, proof) for every leaf, in leaf order
+    def iter_proofs(self):
+        for position in range(self.leaf_count):
+            yield self.index_at(position), self.proof(position)
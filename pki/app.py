@@ -1,18 +1,26 @@
-from flask import Flask, request, render_template, flash, redirect, url_for
+from flask import Flask, request, render_template, flash, redirect, url_for, jsonify
 from werkzeug.utils import secure_filename
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
-from time import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from time import time, perf_counter
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest, multiprocess
+import hashlib
 import os
 import random
+import sys
+import threading
+
+if __package__:
+    from . import signers
+else:
+    # Started as a script (python pki/app.py): import signers from the pki package all the same
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pki import signers
 
 app = Flask(__name__)
 app.secret_key = 'super secret key'  # Needed for flashing messages
 
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = os.path.join(signers.PKI_DIR, 'uploads')
 ALLOWED_EXTENSIONS = {'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure the upload folder exists
@@ -20,16 +28,107 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure the upload folder exists
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def load_keys():
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
-    public_key = private_key.public_key()
-    return private_key, public_key
-
-private_key, public_key = load_keys()
+HASH_CHUNK_SIZE = 1024 * 1024  # bytes read per step when hashing an uploaded PDF
+MAX_LOOPS = 1000
+MAX_BATCH_LOOPS = 100000  # batch mode spreads the work over all cores
+BATCH_CHUNK_SIZE = 64  # signatures per worker task
+
+# Time per stage (hash, sign, verify) and algorithm, served on /metrics
+STAGE_SECONDS = Histogram(
+    'pki_stage_seconds', 'Time spent per signing stage', ['stage', 'algorithm'],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+_signers = {}
+_signers_lock = threading.Lock()
+
+# Function to get the signer for an algorithm, its key loaded on first use instead of at import
+def get_signer(algorithm=signers.DEFAULT_ALGORITHM):
+    with _signers_lock:
+        if algorithm not in _signers:
+            _signers[algorithm] = signers.load_signer(algorithm)
+    return _signers[algorithm]
+
+# Function to hash a file in fixed-size chunks, so large PDFs are never read into memory whole.
+# Returns the hash object, which callers copy() to hash further data after the file.
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher
+
+# Function to get the SHA-256 digest of the PDF followed by a random number, as the loop used
+# to sign. Only the random number is hashed per call, the PDF state comes from pdf_hasher.
+def randomized_digest(pdf_hasher):
+    random_number = random.randint(100, 100000000000000000000000000)
+    hasher = pdf_hasher.copy()
+    hasher.update(str(random_number).encode())
+    return hasher.digest()
+
+# Function to sign a digest and verify the signature. Raises InvalidSignature on failure.
+# Returns the sign and verify times in seconds.
+def sign_and_verify(signer, digest):
+    start = perf_counter()
+    signature = signer.sign_digest(digest)
+    signed = perf_counter()
+    signer.verify_digest(signature, digest)
+    return signed - start, perf_counter() - signed
+
+def observe_timings(algorithm, timings):
+    sign_histogram = STAGE_SECONDS.labels('sign', algorithm)
+    verify_histogram = STAGE_SECONDS.labels('verify', algorithm)
+    for sign_time, verify_time in timings:
+        sign_histogram.observe(sign_time)
+        verify_histogram.observe(verify_time)
+
+# Worker side of batch mode: each process loads the key once and signs chunks of digests.
+# Returns the error of the first failed verification (or None) and the timings, which the
+# parent process records, since metrics live there.
+def sign_and_verify_chunk(task):
+    algorithm, digests = task
+    signer = get_signer(algorithm)
+    timings = []
+    try:
+        for digest in digests:
+            timings.append(sign_and_verify(signer, digest))
+    except Exception as e:
+        return str(e) or type(e).__name__, timings
+    return None, timings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to get the process pool for batch mode, started on first use and kept between requests
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor()
+    return _pool
+
+def sign_serial(pdf_hasher, num_loops, algorithm):
+    signer = get_signer(algorithm)
+    sign_histogram = STAGE_SECONDS.labels('sign', algorithm)
+    verify_histogram = STAGE_SECONDS.labels('verify', algorithm)
+    for i in range(num_loops):
+        try:
+            sign_time, verify_time = sign_and_verify(signer, randomized_digest(pdf_hasher))
+            sign_histogram.observe(sign_time)
+            verify_histogram.observe(verify_time)
+        except Exception as e:
+            return f"Verification failed: {str(e) or type(e).__name__}"
+    return "Verification successful!"
+
+def sign_batch(pdf_hasher, num_loops, algorithm):
+    get_signer(algorithm)  # make sure the key file exists before the workers load it
+    digests = [randomized_digest(pdf_hasher) for i in range(num_loops)]
+    chunks = [(algorithm, digests[i:i + BATCH_CHUNK_SIZE]) for i in range(0, num_loops, BATCH_CHUNK_SIZE)]
+    for error, timings in get_pool().map(sign_and_verify_chunk, chunks):
+        observe_timings(algorithm, timings)
+        if error is not None:
+            return f"Verification failed: {error}"
+    return "Verification successful!"
 
 @app.route('/')
 def index():
@@ -42,13 +141,20 @@ def process_file():
         return redirect(request.url)
     pdf_file = request.files['pdf_file']
     num_loops = request.form.get('num_loops', '1')
+    mode = request.form.get('mode', 'serial')
+    algorithm = request.form.get('algorithm', signers.DEFAULT_ALGORITHM)
+    max_loops = MAX_BATCH_LOOPS if mode == 'batch' else MAX_LOOPS
 
     if pdf_file.filename == '':
         flash('No selected file')
         return redirect(request.url)
 
-    if not num_loops.isdigit() or int(num_loops) < 1 or int(num_loops) > 1000:
-        flash('Number of loops must be between 1 and 1000')
+    if not num_loops.isdigit() or int(num_loops) < 1 or int(num_loops) > max_loops:
+        flash(f'Number of loops must be between 1 and {max_loops}')
+        return redirect(request.url)
+
+    if algorithm not in signers.SIGNERS:
+        flash(f"Unknown signature algorithm: {algorithm}")
         return redirect(request.url)
 
     if pdf_file and allowed_file(pdf_file.filename):
@@ -58,47 +164,68 @@ def process_file():
 
         total_time_start = time()
 
-        with open(pdf_path, 'rb') as f:
-            original_pdf_data = f.read()
-
-        verification_status = "Verification successful!"
-        for i in range(int(num_loops)):
-            # Append a random number to the PDF data
-            random_number = random.randint(100, 100000000000000000000000000)
-            pdf_data = original_pdf_data + str(random_number).encode()
-
-            signature = private_key.sign(
-                pdf_data,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-
-            try:
-                public_key.verify(
-                    signature,
-                    pdf_data,
-                    padding.PSS(
-                        mgf=padding.MGF1(hashes.SHA256()),
-                        salt_length=padding.PSS.MAX_LENGTH
-                    ),
-                    hashes.SHA256()
-                )
-            except Exception as e:
-                verification_status = f"Verification failed: {str(e)}"
-                break
+        with STAGE_SECONDS.labels('hash', algorithm).time():
+            pdf_hasher = hash_file(pdf_path)
+        if mode == 'batch':
+            verification_status = sign_batch(pdf_hasher, int(num_loops), algorithm)
+        else:
+            verification_status = sign_serial(pdf_hasher, int(num_loops), algorithm)
 
         total_time_end = time()
         total_elapsed_time = total_time_end - total_time_start
 
         return (f"{verification_status}\n"
-                f"Total time for all cycles: {total_elapsed_time:.4f} seconds.")
+                f"Total time for all cycles: {total_elapsed_time:.4f} seconds.\n"
+                f"Throughput: {int(num_loops) / total_elapsed_time:.1f} signatures/s ({algorithm}, {mode}).")
 
     else:
         flash('Allowed file types are PDF only.')
         return redirect(request.url)
 
+# Under serve.py the metrics of all workers, which write them to PROMETHEUS_MULTIPROC_DIR
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+# Sign a VC or VP (JSON body: document, algorithm, verification_method, optional proof fields)
+@app.route('/sign_credential', methods=['POST'])
+def sign_credential():
+    try:
+        data = request.get_json()
+        algorithm = data.get('algorithm', 'ed25519')
+        if algorithm not in signers.SIGNERS:
+            raise ValueError(f"Unknown signature algorithm: {algorithm}")
+        created = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        signed = signers.sign_credential(
+            data['document'], get_signer(algorithm), data.get('verification_method', 'did:university:issuer123#key-1'),
+            created, **data.get('proof', {"proofPurpose": "assertionMethod"})
+        )
+        return jsonify({"status": "success", "document": signed})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
+
+# Verify the proof of a VC or VP signed by /sign_credential, with the algorithm its JWS names
+@app.route('/verify_credential', methods=['POST'])
+def verify_credential():
+    try:
+        document = request.get_json()['document']
+        algorithm = signers.credential_algorithm(document)
+        signers.verify_credential(document, get_signer(algorithm))
+        return jsonify({"status": "success", "algorithm": algorithm, "verified": True})
+    except signers.InvalidSignature:
+        return jsonify({"status": "success", "verified": False})
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)})
+
+# Function to load the keys of all algorithms before serve.py forks its workers, so they share
+# them copy-on-write. The process pool of batch mode is still started per worker, on first use.
+def preload():
+    for algorithm in signers.SIGNERS:
+        get_signer(algorithm)
+
 if __name__ == '__main__':
     app.run(debug=True)
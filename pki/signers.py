@@ -0,0 +1,207 @@
+import base64
+import json
+import os
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+# Signature algorithms for transcripts and VC/VP proofs. Every signer works on SHA-256
+# digests, so large documents are hashed once in a streaming pass and only the 32-byte digest
+# is signed. RSA-PSS and ECDSA sign it as a prehashed SHA-256 value. Ed25519 has no
+# prehashed mode in cryptography, so it signs the digest bytes as its message.
+# sign_digest/verify_digest raise cryptography.exceptions.InvalidSignature on a bad signature.
+# Credential proofs are JWS (RFC 7515/7518/8037) and use jws_sign/jws_verify instead, which sign
+# the JWS signing input itself in the encoding JOSE libraries expect.
+
+PREHASHED_SHA256 = Prehashed(hashes.SHA256())
+# PS256 (JWS) uses a salt as long as the hash
+JWS_PSS_PADDING = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=32)
+
+class Signer:
+    name = None
+    jws_alg = None  # "alg" of the JWS header
+    proof_type = 'JsonWebSignature2020'  # "type" of the VC/VP proof
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+
+class RSAPSSSigner(Signer):
+    name = 'rsa-pss'
+    jws_alg = 'PS256'
+    padding = padding.PSS(
+        mgf=padding.MGF1(hashes.SHA256()),
+        salt_length=padding.PSS.MAX_LENGTH
+    )
+
+    @staticmethod
+    def generate_key():
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+
+    def sign_digest(self, digest):
+        return self.private_key.sign(digest, self.padding, PREHASHED_SHA256)
+
+    def verify_digest(self, signature, digest):
+        self.public_key.verify(signature, digest, self.padding, PREHASHED_SHA256)
+
+    def jws_sign(self, signing_input):
+        return self.private_key.sign(signing_input, JWS_PSS_PADDING, hashes.SHA256())
+
+    def jws_verify(self, signature, signing_input):
+        self.public_key.verify(signature, signing_input, JWS_PSS_PADDING, hashes.SHA256())
+
+class Ed25519Signer(Signer):
+    name = 'ed25519'
+    jws_alg = 'EdDSA'
+    proof_type = 'Ed25519Signature2020'
+
+    @staticmethod
+    def generate_key():
+        return ed25519.Ed25519PrivateKey.generate()
+
+    def sign_digest(self, digest):
+        return self.private_key.sign(digest)
+
+    def verify_digest(self, signature, digest):
+        self.public_key.verify(signature, digest)
+
+    # Ed25519 signs the message itself, which is what JWS and a PDF signature should cover
+    def sign_message(self, message):
+        return self.private_key.sign(message)
+
+    def verify_message(self, signature, message):
+        self.public_key.verify(signature, message)
+
+    jws_sign = sign_message
+    jws_verify = verify_message
+
+class ECDSAP256Signer(Signer):
+    name = 'ecdsa-p256'
+    jws_alg = 'ES256'
+    algorithm = ec.ECDSA(PREHASHED_SHA256)
+
+    @staticmethod
+    def generate_key():
+        return ec.generate_private_key(ec.SECP256R1(), default_backend())
+
+    def sign_digest(self, digest):
+        return self.private_key.sign(digest, self.algorithm)
+
+    def verify_digest(self, signature, digest):
+        self.public_key.verify(signature, digest, self.algorithm)
+
+    # ES256 signatures are r || s as two 32-byte big-endian integers, not DER
+    def jws_sign(self, signing_input):
+        r, s = decode_dss_signature(self.private_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, 'big') + s.to_bytes(32, 'big')
+
+    def jws_verify(self, signature, signing_input):
+        if len(signature) != 64:
+            raise InvalidSignature()
+        der = encode_dss_signature(int.from_bytes(signature[:32], 'big'), int.from_bytes(signature[32:], 'big'))
+        self.public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+
+SIGNERS = {signer.name: signer for signer in (RSAPSSSigner, Ed25519Signer, ECDSAP256Signer)}
+SIGNERS_BY_JWS_ALG = {signer.jws_alg: signer for signer in SIGNERS.values()}
+DEFAULT_ALGORITHM = 'rsa-pss'
+
+PKI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Key file per algorithm, in pki/ whatever the working directory; PKI_KEY_FILE keeps pointing
+# at the RSA key used so far
+KEY_FILES = {
+    'rsa-pss': os.environ.get('PKI_KEY_FILE', os.path.join(PKI_DIR, 'pki_private_key.pem')),
+    'ed25519': os.environ.get('PKI_ED25519_KEY_FILE', os.path.join(PKI_DIR, 'pki_ed25519_key.pem')),
+    'ecdsa-p256': os.environ.get('PKI_ECDSA_P256_KEY_FILE', os.path.join(PKI_DIR, 'pki_ecdsa_p256_key.pem')),
+}
+
+# Function to load the signer for an algorithm from its key file, creating the key on first
+# use. The same key is used after a restart, so earlier signatures still verify.
+def load_signer(algorithm, key_file=None):
+    signer_class = SIGNERS[algorithm]
+    key_file = key_file or KEY_FILES[algorithm]
+
+    if os.path.exists(key_file):
+        with open(key_file, 'rb') as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None, backend=default_backend())
+    else:
+        private_key = signer_class.generate_key()
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        # Only the owner may read the key
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
+    return signer_class(private_key)
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def b64url_decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+# Proof fields sign_credential sets itself; the caller's extra proof fields may not replace them
+FIXED_PROOF_KEYS = ('type', 'created', 'verificationMethod', 'jws')
+
+# Function to get the bytes a credential proof signs: the document with its proof options (the
+# proof without the jws) in place of the proof, as canonical JSON (sorted keys, no whitespace).
+# The options are signed too, so a proof cannot be moved to another challenge or domain.
+def canonical_document(document, proof_options):
+    unsigned = {key: value for key, value in document.items() if key != 'proof'}
+    unsigned['proof'] = proof_options
+    return json.dumps(unsigned, sort_keys=True, separators=(',', ':')).encode()
+
+# Function to get the JWS signing input: the protected header, a dot and the (unencoded) payload
+def jws_signing_input(header_b64, document, proof_options):
+    return header_b64.encode() + b'.' + canonical_document(document, proof_options)
+
+# Function to add a proof to a VC or VP, signed with a detached JWS (RFC 7797, unencoded
+# payload) over the canonical document and proof options, like the "jws" field the credentials
+# already carry. The signature is a standard PS256, ES256 or EdDSA (Ed25519) one over the
+# signing input. Returns a new document; `proof` holds extra proof fields (proofPurpose,
+# challenge, domain, ...), which must not include FIXED_PROOF_KEYS.
+def sign_credential(document, signer, verification_method, created, **proof):
+    overridden = sorted(set(proof) & set(FIXED_PROOF_KEYS))
+    if overridden:
+        raise ValueError(f"Proof fields {', '.join(overridden)} are set by the signer")
+    proof_options = {
+        "type": signer.proof_type,
+        "created": created,
+        "verificationMethod": verification_method,
+        **proof,
+    }
+    header_b64 = b64url(json.dumps({"alg": signer.jws_alg, "b64": False, "crit": ["b64"]}, separators=(',', ':')).encode())
+    signature = signer.jws_sign(jws_signing_input(header_b64, document, proof_options))
+    signed = dict(document)
+    signed['proof'] = {**proof_options, "jws": f"{header_b64}..{b64url(signature)}"}
+    return signed
+
+# Function to get the algorithm name (a SIGNERS key) a signed credential was signed with
+def credential_algorithm(document):
+    header_b64 = document['proof']['jws'].split('.')[0]
+    return SIGNERS_BY_JWS_ALG[json.loads(b64url_decode(header_b64))['alg']].name
+
+# Function to check the proof of a credential signed by sign_credential. Raises
+# InvalidSignature if the signature does not match, ValueError if the proof is malformed.
+def verify_credential(document, signer):
+    header_b64, payload, signature_b64 = document['proof']['jws'].split('.')
+    if payload:
+        raise ValueError("Expected a detached JWS")
+    if json.loads(b64url_decode(header_b64)).get('alg') != signer.jws_alg:
+        raise ValueError(f"Credential is not signed with {signer.name}")
+    proof_options = {key: value for key, value in document['proof'].items() if key != 'jws'}
+    if proof_options.get('type') != signer.proof_type:
+        raise ValueError(f"Proof type is not {signer.proof_type}")
+    signer.jws_verify(b64url_decode(signature_b64), jws_signing_input(header_b64, document, proof_options))
@@ -0,0 +1,62 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3.providers import JSONBaseProvider
+
+# Node access for app.py: one pooled keep-alive HTTP session shared by every thread, and
+# JSON-RPC batching so many read-only contract calls go to the node in a single request.
+
+POOL_SIZE = 32  # keep-alive connections kept open to the node
+RPC_BATCH_SIZE = 500  # calls per JSON-RPC batch request
+
+# HTTP provider whose requests all go through one pooled requests.Session. Connections that
+# fail to open are retried; requests that reached the node are not, since they may have
+# had side effects.
+class PooledHTTPProvider(JSONBaseProvider):
+    def __init__(self, endpoint_uri, timeout=500, pool_size=POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint_uri = endpoint_uri
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size,
+            max_retries=Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.1)
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    def __str__(self):
+        return f"Pooled RPC connection {self.endpoint_uri}"
+
+    def _post(self, data):
+        response = self.session.post(self.endpoint_uri, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
+    def make_request(self, method, params):
+        return self._post(self.encode_rpc_request(method, params))
+
+    def make_batch_request(self, batch_requests):
+        responses = self._post(self.encode_batch_rpc_request(batch_requests))
+        if isinstance(responses, dict):
+            # The node rejected the batch as a whole; web3 raises on this error response
+            return responses
+        # JSON-RPC does not guarantee the order of batch responses
+        return sorted(responses, key=lambda response: response['id'])
+
+# Function to run read-only contract calls (e.g. contract.functions.getChallenge(R)) with one
+# JSON-RPC batch request per batch_size calls. Returns the decoded results in call order.
+# Providers without batch support (e.g. the in-process eth-tester chain) get one call each.
+def batch_calls(w3, calls, batch_size=RPC_BATCH_SIZE):
+    if not isinstance(w3.provider, JSONBaseProvider):
+        return [call.call() for call in calls]
+
+    results = []
+    for start in range(0, len(calls), batch_size):
+        with w3.batch_requests() as batch:
+            for call in calls[start:start + batch_size]:
+                batch.add(call)
+            results.extend(batch.execute())
+    return results
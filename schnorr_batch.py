@@ -0,0 +1,178 @@
+import secrets
+from eth_utils import keccak
+
+# Off-chain mirror of the Schnorr and VC checks done by SchnorrBatchVerification.verify().
+# A proof is the same tuple as the contract's Proof struct:
+#   (R, s, c, employerHashedEmail, hashedVCFromVP, studentDid, ipfsHashedVC)
+# Functions taking a `group` (a schnorr_groups.SchnorrGroup) mirror verifyInGroup() instead,
+# which works mod q and has no uint256 overflow cases.
+
+UINT256_MAX = 2**256 - 1
+
+# Below this many proofs a failing batch is checked proof by proof instead of split again
+BISECT_LEAF_SIZE = 4
+
+# Function to compute x = uint256(keccak256(abi.encodePacked(employerHashedEmail)))
+def email_exponent(employer_hashed_email):
+    return int.from_bytes(keccak(text=employer_hashed_email), 'big')
+
+# Same as the contract's verifySchnorrProof: g^s == R * g^(c*x) (mod p).
+# Cases where the contract reverts on overflow count as a failed proof.
+def verify_schnorr(R, s, c, employer_hashed_email, g, p):
+    cx = c * email_exponent(employer_hashed_email)
+    if cx > UINT256_MAX:
+        return False
+    g_cx = pow(g, cx, p)
+    if R * g_cx > UINT256_MAX:
+        return False
+    return pow(g, s, p) == (R * g_cx) % p
+
+# Same as the contract's verifyInGroup: g^((s - c*x) mod q) == R (mod p)
+def verify_schnorr_in_group(R, s, c, employer_hashed_email, group):
+    return group.verify(R, s, c, email_exponent(employer_hashed_email))
+
+# Same as the contract's verifyHashedVC (keccak of both strings compared)
+def verify_hashed_vc(hashed_vc_from_vp, ipfs_hashed_vc):
+    return hashed_vc_from_vp == ipfs_hashed_vc
+
+# Function to check a single proof exactly like verify() would.
+# DIDs in verified_dids already have schnorrProofVerified set, so only the VC is checked for them.
+def verify_proof(proof, g, p, verified_dids=(), group=None):
+    R, s, c, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_hashed_vc = proof
+    if student_did not in verified_dids:
+        if group:
+            schnorr_ok = verify_schnorr_in_group(R, s, c, employer_hashed_email, group)
+        else:
+            schnorr_ok = verify_schnorr(R, s, c, employer_hashed_email, g, p)
+        if not schnorr_ok:
+            return False
+    return verify_hashed_vc(hashed_vc_from_vp, ipfs_hashed_vc)
+
+# Function to compute prod(bases[i] ^ exponents[i]) mod p with the bucket (Pippenger) method,
+# so all bases share one chain of squarings instead of one per exponentiation
+def multi_exp(bases, exponents, p, exponent_bits):
+    n = len(bases)
+    if n == 0:
+        return 1 % p
+
+    window = max(1, min(16, n.bit_length() - 2))
+    mask = (1 << window) - 1
+    result = 1
+    for shift in range((exponent_bits - 1) // window * window, -1, -window):
+        for _ in range(window):
+            result = result * result % p
+
+        buckets = [1] * (mask + 1)
+        for base, exponent in zip(bases, exponents):
+            digit = (exponent >> shift) & mask
+            if digit:
+                buckets[digit] = buckets[digit] * base % p
+
+        # sum_d d * bucket[d] done as a running product of running products
+        running = 1
+        window_sum = 1
+        for digit in range(mask, 0, -1):
+            running = running * buckets[digit] % p
+            window_sum = window_sum * running % p
+        result = result * window_sum % p
+
+    return result
+
+# Randomized linear-combination (small exponent) test for a batch of Schnorr proofs:
+#   g^(sum a_i * (s_i - c_i * x_i)) == prod R_i^a_i (mod p)
+# with random weights a_i. Valid batches always pass; a batch holding an invalid proof
+# fails with high probability in a prime-order group. order defaults to p - 1 (p prime).
+# pow_g, if given, computes g^e mod p (e.g. with a fixed-base table).
+def batch_schnorr_check(items, g, p, order=None, weight_bits=64, pow_g=None):
+    order = order or p - 1
+    weights = [secrets.randbits(weight_bits) | 1 for _ in items]
+
+    exponent = 0
+    for a, (R, s, cx) in zip(weights, items):
+        exponent = (exponent + a * (s - cx)) % order
+
+    lhs = pow_g(exponent) if pow_g else pow(g, exponent, p)
+    return lhs == multi_exp([R for R, _, _ in items], weights, p, weight_bits)
+
+# Function to return the indices of proofs that verify() would reject when they are sent in
+# this order. verify() skips the Schnorr check for a DID once schnorrProofVerified is set, which
+# happens for DIDs in verified_dids and, during the run, for every DID after its first proof
+# whose Schnorr check passes (even if its VC check then fails). So a later proof of such a DID
+# only needs a matching VC. With keep_flag_setters, rejected proofs that still set the flag are
+# not returned, so dropping the returned proofs leaves the results of the others unchanged.
+# Proofs that can use the batch test are checked with it and, when a batch fails, the batch is
+# bisected until the invalid proofs are found. Everything else is checked one by one.
+# Since a batch can (rarely) pass with an invalid proof in it, use this as a filter in front of
+# the contract, not as a replacement for it. With a group, proofs are checked like
+# verifyInGroup() does and g^e uses the group's fixed-base table.
+# The combined equation is only sound for R in the order-q subgroup, so when the order is not
+# p - 1 every R is checked with R^q == 1 first; verify() and verifyInGroup() reject such an R
+# anyway, since g^e is always in the subgroup.
+def find_invalid(proofs, g, p, verified_dids=(), order=None, weight_bits=64, group=None, keep_flag_setters=False):
+    pow_g = None
+    if group:
+        g, p, order, pow_g = group.g, group.p, group.q, group.pow_g
+    order = order or p - 1
+    check_subgroup = order != p - 1
+    schnorr_failed = []
+    batchable = []  # (proof index, (R, s, c*x))
+
+    # Schnorr check of every proof whose DID is not verified before the run. Later proofs of a
+    # DID verified during the run are checked too and their result ignored below.
+    for i, proof in enumerate(proofs):
+        R, s, c, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_hashed_vc = proof
+        if student_did in verified_dids:
+            continue
+
+        cx = c * email_exponent(employer_hashed_email)
+        if group:
+            if not 0 < R < p:
+                schnorr_failed.append(i)
+                continue
+            cx %= order
+        elif cx > UINT256_MAX or R == 0 or R >= p:
+            # Overflow, degenerate or unreduced values are left to the exact check
+            if not verify_schnorr(R, s, c, employer_hashed_email, g, p):
+                schnorr_failed.append(i)
+            continue
+        if check_subgroup and pow(R, order, p) != 1:
+            schnorr_failed.append(i)
+            continue
+        batchable.append((i, (R, s, cx)))
+
+    def holds(R, s, cx):
+        if group:
+            return group.pow_g((s - cx) % order) == R
+        return pow(g, s, p) == R * pow(g, cx, p) % p
+
+    def bisect(items):
+        if len(items) <= BISECT_LEAF_SIZE:
+            for i, (R, s, cx) in items:
+                if not holds(R, s, cx):
+                    schnorr_failed.append(i)
+            return
+        if batch_schnorr_check([item for _, item in items], g, p, order, weight_bits, pow_g):
+            return
+        middle = len(items) // 2
+        bisect(items[:middle])
+        bisect(items[middle:])
+
+    bisect(batchable)
+
+    # Replay the proofs in order, like consecutive verify() calls
+    schnorr_failed = set(schnorr_failed)
+    verified = set(verified_dids)
+    invalid = []
+    for i, proof in enumerate(proofs):
+        student_did = proof[5]
+        vc_ok = verify_hashed_vc(proof[4], proof[6])
+        if student_did in verified:
+            if not vc_ok:
+                invalid.append(i)
+        elif i in schnorr_failed:
+            invalid.append(i)
+        else:
+            verified.add(student_did)
+            if not vc_ok and not keep_flag_setters:
+                invalid.append(i)
+    return invalid
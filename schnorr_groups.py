@@ -0,0 +1,194 @@
+import hashlib
+import secrets
+import sys
+import threading
+from itertools import count
+
+# Schnorr group parameter sets shared by the prover (app.py) and the contract. A group is a
+# prime p, a prime q dividing p - 1 and a generator g of the order-q subgroup; exponents
+# are reduced mod q. The contract verifies a proof with a single modular exponentiation,
+#   g^((s - c*x) mod q) == R (mod p),
+# through the EIP-198 modexp precompile. Since q fits in 256 bits, everything mod q is plain
+# uint256 arithmetic on chain, while p can be 2048 bits.
+#
+# "toy" is the original G = 2, P = 23 setup (exponents mod P - 1) that the uint256 verify()
+# and verifyBatch() use. "schnorr2048" is a 2048-bit p with a 256-bit q, generated from a
+# public seed by generate_group() below, so anyone can rebuild and check it.
+
+GROUP_SEED = b'EV-TRANSCRIPT Schnorr group 2048-256'
+
+class SchnorrGroup:
+    def __init__(self, name, p, q, g):
+        self.name = name
+        self.p = p
+        self.q = q
+        self.g = g
+        self.byte_length = (p.bit_length() + 7) // 8
+
+    # Whether verify() and verifyBatch() can use the group. Their modExp multiplies two
+    # residues mod p in checked uint256 arithmetic (result * base % p), so the product of two
+    # numbers below p must fit 256 bits: p of at most 128 bits.
+    @property
+    def fits_uint256_products(self):
+        return self.p.bit_length() <= 128
+
+    # Function to check the group structure (primality is checked by generate_group)
+    def validate(self):
+        return (self.p - 1) % self.q == 0 and 1 < self.g < self.p and pow(self.g, self.q, self.p) == 1
+
+    def to_bytes(self, value):
+        return value.to_bytes(self.byte_length, 'big')
+
+    # Function to compute g^e mod p with the cached fixed-base table of this group. For
+    # moduli of a machine word or two the builtin pow() is faster than any table.
+    def pow_g(self, e):
+        if self.fits_uint256_products:
+            return pow(self.g, e, self.p)
+        return fixed_base_table(self).pow(e)
+
+    # Function to create a random commitment r, R = g^r mod p
+    def commitment(self):
+        r = secrets.randbelow(self.q - 1) + 1
+        return r, self.pow_g(r)
+
+    # Function to check g^((s - c*x) mod q) == R, as the contract's verifyInGroup does
+    def verify(self, R, s, c, x):
+        return 0 < R < self.p and self.pow_g((s - c * x) % self.q) == R
+
+# Fixed-base windowed exponentiation: rows[j][d] = g^(d * 2^(window * j)) mod p, so g^e is one
+# table lookup and one multiplication per window of e instead of a square-and-multiply chain.
+class FixedBaseTable:
+    def __init__(self, g, p, exponent_bits, window=8):
+        self.p = p
+        self.window = window
+        self.mask = (1 << window) - 1
+        self.rows = []
+        base = g % p
+        for _ in range((exponent_bits + window - 1) // window):
+            row = [1] * (1 << window)
+            for d in range(1, 1 << window):
+                row[d] = row[d - 1] * base % p
+            self.rows.append(row)
+            base = row[-1] * base % p  # g^(2^(window * (j + 1)))
+
+    def pow(self, e):
+        p = self.p
+        result = 1
+        for row in self.rows:
+            if e == 0:
+                return result
+            digit = e & self.mask
+            if digit:
+                result = result * row[digit] % p
+            e >>= self.window
+        if e:
+            raise ValueError("Exponent larger than the table")
+        return result
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+# Function to get the fixed-base table of a group's generator, built once per process and
+# shared by all requests. Exponents are always reduced mod q, so q's size bounds them.
+def fixed_base_table(group):
+    table = _tables.get(group.name)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(group.name)
+            if table is None:
+                window = 8 if group.q.bit_length() > 32 else 4
+                table = _tables[group.name] = FixedBaseTable(group.g, group.p, group.q.bit_length(), window)
+    return table
+
+GROUPS = {
+    'toy': SchnorrGroup('toy', p=23, q=22, g=2),
+    'schnorr2048': SchnorrGroup(
+        'schnorr2048',
+        p=int(
+            '966e65037eb0bbd4f863ac6b1cc55ca618799b8f24cae4e51b93b287e9019e1f'
+            'b65e02ca86f68f0eea6475af951e8ca3b5c145245a12da41de2edda72c1fcd76'
+            '761306277780ee42532414dbbe5bc5f459de39b79512ccf12745cc3df0bb0616'
+            '57f03ef3d4732d04229b78f99ba10cee81e0264dd246259a7e9b937bdb0b35ac'
+            '0c0dfba4af6d7a16cd3804cce3a45b5df12928cfd6ecefbdb33a6a15a2c26b82'
+            '755980ff629bc71621edafc9ad4e61ece27da8d01f23c9d27558b38a27c505b3'
+            '9a080623336336aef2d36faeaebbdb9d99074dd9befbe40242728e415627a620'
+            'ea23b18cc3ff207e52291e88f8a6b5c65dec2db479edbb330b56d5daafb77ee1',
+            16
+        ),
+        q=int('c5e1425a5035646f4d7e73891b0989aa27fd3ae2325bf43fd1eea0faee476cb7', 16),
+        g=int(
+            '17f58334a95450294d750eed20d228321d9d2d55634d8373166feb4cb2858069'
+            'd2a5ccfa600f443181389aed3b26f182e9309bafc5a9a32cb50228234118b9a7'
+            'baf93e8d0f7934fdb6ab38af2fbb957d164134f8d1d9f0e2b6147e696aeec5ad'
+            'fe278600f35ad6aa82e7b661169f70fcc0cad6d83a4e668135c9b7b5f2a768ad'
+            '8d7e321d20e614d4eb51ba6a406b5a0d061ee4afb32a16343d8244c2b588d146'
+            '31dbd36421c24c8df816410b020773f9488ecee8d7fb1f017e1b5718f8216ea3'
+            'cf55cec1c8aa3cbb6488760f90b1d79e88136caa5eee73413cedbdb7e7513c59'
+            '83a7b74cddf65c74e730017eb52afe58bda407662fd59c6c737f314434dcd391',
+            16
+        ),
+    ),
+}
+
+DEFAULT_GROUP = 'toy'
+
+def get_group(name=DEFAULT_GROUP):
+    if name not in GROUPS:
+        raise ValueError(f"Unknown Schnorr group: {name}")
+    return GROUPS[name]
+
+_SMALL_PRIMES = [n for n in range(3, 2000, 2) if all(n % d for d in range(3, int(n ** 0.5) + 1, 2))]
+
+def is_probable_prime(n, rounds=64):
+    if n < 2:
+        return False
+    for prime in [2] + _SMALL_PRIMES:
+        if n % prime == 0:
+            return n == prime
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        a = secrets.randbelow(n - 3) + 2
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+# Function to stretch the seed to a number of exactly `bits` bits (top bit set)
+def expand(seed, label, bits):
+    data = b''.join(hashlib.sha256(seed + label + i.to_bytes(4, 'big')).digest() for i in range((bits + 255) // 256))
+    value = int.from_bytes(data, 'big') >> (len(data) * 8 - bits)
+    return value | (1 << (bits - 1))
+
+# Function to derive a Schnorr group from a seed, in the style of FIPS 186 domain parameters:
+# q is the first prime after expand(seed, "q"); p is the first candidate p = X - (X mod 2q) + 1,
+# X = expand(seed, "p" || counter), that is prime; g = h^((p - 1) / q) for the smallest h > 1
+# giving g != 1.
+def generate_group(name, seed=GROUP_SEED, p_bits=2048, q_bits=256):
+    q = expand(seed, b'q', q_bits) | 1
+    while not is_probable_prime(q):
+        q += 2
+
+    for counter in count():
+        X = expand(seed, b'p' + counter.to_bytes(4, 'big'), p_bits)
+        p = X - (X % (2 * q)) + 1
+        if p.bit_length() == p_bits and is_probable_prime(p):
+            break
+
+    for h in count(2):
+        g = pow(h, (p - 1) // q, p)
+        if g != 1:
+            return SchnorrGroup(name, p, q, g)
+
+if __name__ == "__main__":
+    # Print the parameters of a generated group, e.g. to check the constants above
+    group = generate_group(sys.argv[1] if len(sys.argv) > 1 else 'schnorr2048')
+    print(f"p = 0x{group.p:x}\nq = 0x{group.q:x}\ng = 0x{group.g:x}")
@@ -0,0 +1,155 @@
+import argparse
+import gc
+import importlib
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from werkzeug.serving import make_server
+
+# Prefork server for app.py ("ev") and pki/app.py ("pki"), instead of the single-process
+# app.run() development server. The master imports the app and calls its preload(), then
+# forks the workers, so everything loaded up to that point (ABI, contract object, keys,
+# credential data, lookup tables) is shared copy-on-write rather than loaded once per worker.
+# Each worker calls the app's after_fork() (e.g. to open its own node connection), is pinned
+# to one CPU and serves the shared listening socket with a threaded WSGI server. Workers that
+# exit are started again. Needs os.fork, so POSIX only.
+#
+#   python serve.py --app ev --workers 4 --port 5000
+#
+# (pki/app.py on its own: python pki/app.py, or python -m pki.app from the repository root)
+#
+# Prometheus metrics run in multiprocess mode: every process writes them to files in
+# PROMETHEUS_MULTIPROC_DIR (a temporary directory unless set) and /metrics adds them up.
+# Other in-memory state, such as the verification cache, is per worker.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIRS = {'ev': BASE_DIR, 'pki': os.path.join(BASE_DIR, 'pki')}
+APP_MODULES = {'ev': 'app', 'pki': 'pki.app'}
+RESPAWN_DELAY = 1  # seconds to wait before replacing a worker that exited
+
+# Function to set up the directory of Prometheus multiprocess mode. It must be set before the
+# app imports prometheus_client, and start empty, or counters of an earlier run would add up.
+# Returns the directory if it was created here (and is removed on exit).
+def prepare_metrics_dir():
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        path = tempfile.mkdtemp(prefix='serve-metrics-')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = path
+        return path
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+    return None
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+# Function to load the app module in the master. Returns it and the import and preload times.
+def load_app(name):
+    os.chdir(APP_DIRS[name])
+    sys.path.insert(0, BASE_DIR)
+
+    start = time.perf_counter()
+    module = importlib.import_module(APP_MODULES[name])
+    imported = time.perf_counter()
+    if hasattr(module, 'preload'):
+        module.preload()
+    return module, imported - start, time.perf_counter() - imported
+
+def run_worker(module, listener, index, cpu, host, port):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+    after_fork = getattr(module, 'after_fork', None)
+    if after_fork:
+        # Every worker, including one started again, takes over the jobs of processes that are
+        # gone: those of a previous run, or of the worker it replaces
+        after_fork(recover_jobs=True)
+
+    server = make_server(host, port, module.app, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefork server for the EV-transcript apps")
+    parser.add_argument('--app', choices=sorted(APP_DIRS), default='ev')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=len(available_cpus()))
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--no-pin', action='store_true', help="do not pin workers to CPUs")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    created_metrics_dir = prepare_metrics_dir()
+    module, import_time, preload_time = load_app(args.app)
+    from prometheus_client import multiprocess
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog)
+
+    # Move everything allocated so far out of the collector's reach, so collections in the
+    # workers do not write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    cpus = [None] if args.no_pin else available_cpus()
+    workers = {}  # pid -> worker index
+
+    def spawn(index):
+        cpu = cpus[index % len(cpus)]
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(module, listener, index, cpu, args.host, args.port)
+            finally:
+                os._exit(1)
+        workers[pid] = index
+
+    for index in range(args.workers):
+        spawn(index)
+    print(
+        f"Master {os.getpid()} serving {args.app} on {args.host}:{args.port} with {args.workers} workers "
+        f"(import {import_time:.3f}s, preload {preload_time:.3f}s, ready {time.perf_counter() - started:.3f}s)",
+        flush=True
+    )
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        multiprocess.mark_process_dead(pid)  # its live gauges no longer count
+        if index is None or stopping:
+            continue
+        print(f"Worker {index} (pid {pid}) exited with status {status}, restarting", flush=True)
+        time.sleep(RESPAWN_DELAY)
+        spawn(index)
+
+    if created_metrics_dir:
+        shutil.rmtree(created_metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+
+from bitarray import bitarray
+from bitarray.util import zeros
+
+import credential_store
+
+# Revocation status list for ACL entries. Every ACL entry has a bit, at its position in
+# acl.json ("statusListIndex", kept by the credential store as status_index). A set bit means
+# the grant is revoked. The bits are packed like the contract's revocationWords: bit i is bit
+# i % 256 of word i // 256, least significant bit first, so a changed word is pushed on chain
+# as is.
+
+STATUS_LIST_FILE = 'status_list.bin'
+WORD_BITS = 256
+
+# Function to get the status list bit of a credential store record
+def status_index(record):
+    return record['status_index']
+
+class StatusList:
+    def __init__(self, bits=None):
+        self.bits = bits if bits is not None else bitarray(endian='little')
+
+    @classmethod
+    def load(cls, path=STATUS_LIST_FILE):
+        bits = bitarray(endian='little')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                bits.frombytes(f.read())
+        return cls(bits)
+
+    def save(self, path=STATUS_LIST_FILE):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.bits.tobytes())
+        os.replace(tmp_path, path)
+
+    def copy(self):
+        return StatusList(self.bits.copy())
+
+    # Function to check one entry: a single bit lookup
+    def is_revoked(self, index):
+        if index < 0:
+            raise ValueError(f"Invalid status list index: {index}")
+        return index < len(self.bits) and bool(self.bits[index])
+
+    # Function to set (revoke) or clear (reinstate) the bits of the given entries.
+    # Returns the indexes of the words that changed.
+    def set_revoked(self, indices, revoked=True):
+        changed = set()
+        for index in indices:
+            if index < 0:
+                raise ValueError(f"Invalid status list index: {index}")
+            if index >= len(self.bits):
+                # Grow by whole words, new entries are valid
+                words = index // WORD_BITS + 1
+                self.bits.extend(zeros(words * WORD_BITS - len(self.bits), endian='little'))
+            if self.bits[index] != revoked:
+                self.bits[index] = revoked
+                changed.add(index // WORD_BITS)
+        return sorted(changed)
+
+    # Function to get word `word_index` as the uint256 the contract stores
+    def word(self, word_index):
+        start = word_index * WORD_BITS
+        chunk = self.bits[start:start + WORD_BITS]
+        return int.from_bytes(chunk.tobytes(), 'little')
+
+    def word_count(self):
+        return (len(self.bits) + WORD_BITS - 1) // WORD_BITS
+
+    # Function to get the indexes of all words with at least one revoked entry
+    def nonzero_words(self):
+        return [word_index for word_index in range(self.word_count()) if self.bits[word_index * WORD_BITS:(word_index + 1) * WORD_BITS].any()]
+
+    def revoked_count(self):
+        return self.bits.count(1)
+
+# Function to build the status list from the isValid flags of the ACL entries in the
+# credential store
+def build_from_store(store):
+    status = StatusList()
+    with store.lock:
+        rows = store.db.execute('SELECT status_index FROM credentials WHERE is_valid = 0 AND status_index IS NOT NULL').fetchall()
+    status.set_revoked(index for (index,) in rows)
+    return status
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else STATUS_LIST_FILE
+    status = build_from_store(credential_store.get_store())
+    status.save(path)
+    print(f"Status list with {status.revoked_count()} revoked entries in {status.word_count()} words stored in {path}.")
@@ -0,0 +1,111 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Helpers shared by the generator scripts (acl_create.py, hash_vc.py, vp_gen.py) for their
+# streaming mode: records are written as JSON Lines, one object per line, and appended as
+# they are produced, so memory use does not grow with the number of students.
+
+CHUNK_SIZE = 10000  # records handled by one worker task
+
+# Function to split an iterable into lists of at most `size` items
+def chunked(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Function to split the range [start, end) into (chunk_start, chunk_end) pairs
+def ranges(start, end, size=CHUNK_SIZE):
+    for chunk_start in range(start, end, size):
+        yield chunk_start, min(chunk_start + size, end)
+
+# Function to run fn over items in worker processes and yield the results in input order.
+# Unlike Pool.imap, at most `max_pending` tasks are queued at a time, so a large or endless
+# input is never pulled into memory ahead of the consumer.
+def parallel_map(fn, items, workers=None, max_pending=None):
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def dump_line(record):
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+# Function to append already serialized lines to a JSON Lines file
+def append_lines(path, lines):
+    with open(path, 'a') as file:
+        file.writelines(lines)
+
+def iter_jsonl(path):
+    if not os.path.exists(path):
+        return
+    with open(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+# Function to read the last record of a JSON Lines file without reading the whole file
+def last_jsonl_record(path):
+    if not os.path.exists(path) or os.stat(path).st_size == 0:
+        return None
+
+    with open(path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        tail = b''
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            file.seek(position)
+            tail = file.read(step) + tail
+            lines = tail.rstrip(b'\n').split(b'\n')
+            if len(lines) > 1 or position == 0:
+                return json.loads(lines[-1])
+    return None
+
+# Function to find where the line ending at offset `end` starts
+def _line_start(file, end):
+    position = end - 1  # before the line's own newline
+    while position > 0:
+        step = min(4096, position)
+        file.seek(position - step)
+        newline = file.read(step).rfind(b'\n')
+        if newline != -1:
+            return position - step + newline + 1
+        position -= step
+    return 0
+
+# Function to drop records from the end of a JSON Lines file until its last record is one that
+# keep(record) accepts. A last line cut short by an interrupted write is always dropped.
+def truncate_jsonl(path, keep):
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r+b') as file:
+        end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = _line_start(file, end)
+            file.seek(start)
+            line = file.read(end - start)
+            if line.endswith(b'\n') and (not line.strip() or keep(json.loads(line))):
+                break
+            end = start
+        file.truncate(end)
+
+# Function to get the record a streaming generator continues after: the last complete record
+# of its output file, once a line cut short by an interrupted run has been dropped
+def resume_jsonl(path):
+    truncate_jsonl(path, lambda record: True)
+    return last_jsonl_record(path)
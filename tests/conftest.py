@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root and are imported as the scripts import them
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BUILD_DIR = os.path.join(ROOT, 'e-transcript', 'build', 'contracts')
+ARTIFACTS = {'debug': 'SchnorrBatchVerification.json', 'lean': 'SchnorrBatchVerificationLean.json'}
+BLOCK_GAS_LIMIT = 2000000000  # same as the development network in truffle-config.js
+
+# Function to deploy a contract build on a fresh in-process chain. The test is skipped when
+# eth-tester is missing or the Truffle artifact is missing or predates one of `functions`.
+def deploy_contract(variant, *functions):
+    pytest.importorskip('eth_tester')
+    from eth_tester import EthereumTester, PyEVMBackend
+    from web3 import Web3
+    from web3.providers.eth_tester import EthereumTesterProvider
+
+    path = os.path.join(BUILD_DIR, ARTIFACTS[variant])
+    if not os.path.exists(path):
+        pytest.skip(f"{ARTIFACTS[variant]} is not built, run truffle compile in e-transcript/")
+    with open(path) as f:
+        artifact = json.load(f)
+    names = {item.get('name') for item in artifact['abi'] if item.get('type') == 'function'}
+    missing = [name for name in functions if name not in names]
+    if missing:
+        pytest.skip(f"{ARTIFACTS[variant]} predates {', '.join(missing)}(), run truffle compile in e-transcript/")
+
+    backend = PyEVMBackend(genesis_parameters=PyEVMBackend.generate_genesis_params({'gas_limit': BLOCK_GAS_LIMIT}))
+    w3 = Web3(EthereumTesterProvider(EthereumTester(backend)))
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({'from': w3.eth.accounts[0]}))
+    return w3, w3.eth.contract(address=receipt['contractAddress'], abi=artifact['abi'])
+
+@pytest.fixture
+def deploy():
+    return deploy_contract
+
+# app.py, imported from the repository root since it reads its artifacts relative to it
+@pytest.fixture(scope='session')
+def app_module():
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
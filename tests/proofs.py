@@ -0,0 +1,56 @@
+import hashlib
+import random
+
+import schnorr_batch
+
+# Schnorr proofs for the tests, in the proof tuple format of schnorr_batch.py:
+#   (R, s, c, employerHashedEmail, hashedVCFromVP, studentDid, ipfsHashedVC)
+# The group is the largest verify() and verifyBatch() take (p of 128 bits at most) with g of
+# large order, so the combined batch check does not pass an invalid proof by chance.
+P = 2**127 - 1
+G = 3
+
+# Function to build student i's proof, deterministic for the same arguments. An invalid proof
+# has R off by a factor g; bad_vc gives it a VP hash that does not match the stored one.
+def make_proof(i, g=G, p=P, valid=True, bad_vc=False, seed=0):
+    rng = random.Random(f"{i}-{seed}")
+    employer_hashed_email = hashlib.sha256(f"hr{i + 1}@gmail.com".encode()).hexdigest()
+    x = schnorr_batch.email_exponent(employer_hashed_email)
+    c = rng.randint(0, schnorr_batch.UINT256_MAX // x)  # keep c * x inside uint256
+    r = rng.randint(1, p - 2)
+    R = pow(g, r, p)
+    s = (r + c * x) % (p - 1)
+    if not valid:
+        R = R * g % p
+    hashed_vc = hashlib.sha256(str(i).encode()).hexdigest()
+    hashed_vc_from_vp = hashlib.sha256(b'other').hexdigest() if bad_vc else hashed_vc
+    return (R, s, c, employer_hashed_email, hashed_vc_from_vp, f"did:university:student{i + 1}", hashed_vc)
+
+# Function to get what verify() returns for each proof when they are sent one by one in order.
+# The DIDs left with schnorrProofVerified set are added to `verified`.
+def sequential_results(proofs, g=G, p=P, verified=None):
+    verified = set() if verified is None else verified
+    results = []
+    for R, s, c, employer_hashed_email, hashed_vc_from_vp, student_did, ipfs_hashed_vc in proofs:
+        if student_did not in verified:
+            if not schnorr_batch.verify_schnorr(R, s, c, employer_hashed_email, g, p):
+                results.append(False)
+                continue
+            verified.add(student_did)
+        results.append(schnorr_batch.verify_hashed_vc(hashed_vc_from_vp, ipfs_hashed_vc))
+    return results
+
+# A sequence with every case verify() handles differently from a plain check of the proof
+def mixed_proofs():
+    proofs = [make_proof(i) for i in range(4)]
+    proofs.append(make_proof(4, valid=False))  # bad Schnorr proof
+    proofs.append(make_proof(0, valid=False, seed=1))  # bad, but its DID was verified above
+    proofs.append(make_proof(5, bad_vc=True))  # fails on the VC, still verifies the DID
+    proofs.append(make_proof(5, valid=False, seed=1))  # ... so this one passes
+    proofs.append(make_proof(6, valid=False))  # fails, and leaves the DID unverified
+    proofs.append(make_proof(6, seed=1))  # ... so this one is checked and passes
+    R, *rest = make_proof(7)
+    proofs.append((R + P, *rest))  # R not reduced mod p: verify() accepts it
+    R, *rest = make_proof(8)
+    proofs.append((R + P * 2**128, *rest))  # R * g^(c*x) overflows: verify() reverts
+    return proofs
@@ -0,0 +1,60 @@
+import pytest
+from web3.exceptions import ContractLogicError
+
+from proofs import G, P, make_proof
+
+TX_GAS = 50000000
+NUM_PROOFS = 5
+
+# Function to get the gas of NUM_PROOFS verify() calls with fresh DIDs
+def verify_gas(w3, contract, app_module, variant):
+    sender = w3.eth.accounts[0]
+    gas = 0
+    for i in range(NUM_PROOFS):
+        R, s, c, employer, vp, did, ipfs = app_module.contract_proof(make_proof(i), variant)
+        tx_hash = contract.functions.verify(R, s, G, P, c, employer, vp, did, ipfs).transact({'from': sender, 'gas': TX_GAS})
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        assert receipt['status'] == 1
+        gas += receipt['gasUsed']
+    return gas
+
+def test_lean_verify_uses_less_gas(deploy, app_module):
+    gas = {}
+    for variant in ('debug', 'lean'):
+        w3, contract = deploy(variant, 'verify')
+        gas[variant] = verify_gas(w3, contract, app_module, variant)
+    assert gas['lean'] < gas['debug']
+
+def test_lean_verify_batch_uses_less_gas(deploy, app_module):
+    gas = {}
+    for variant in ('debug', 'lean'):
+        w3, contract = deploy(variant, 'verifyBatch')
+        batch = [app_module.contract_proof(make_proof(i), variant) for i in range(NUM_PROOFS)]
+        tx_hash = contract.functions.verifyBatch(batch, G, P).transact({'from': w3.eth.accounts[0], 'gas': TX_GAS})
+        gas[variant] = w3.eth.wait_for_transaction_receipt(tx_hash)['gasUsed']
+    assert gas['lean'] < gas['debug']
+
+# Function to get the admin calls of a contract build with their arguments
+def admin_calls(contract, variant):
+    calls = [
+        contract.functions.setRevocationWords([0], [1]),
+        contract.functions.setGroup(P.to_bytes(16, 'big'), (P - 1) // 2, G.to_bytes(16, 'big')),
+    ]
+    if variant == 'debug':
+        calls.append(contract.functions.anchorCredentialRoot(b'\x01' * 32, 1))
+    return calls
+
+@pytest.mark.parametrize('variant', ['debug', 'lean'])
+def test_admin_functions_are_owner_only(deploy, variant):
+    w3, contract = deploy(variant, 'owner', 'setRevocationWords', 'setGroup')
+    owner, other = w3.eth.accounts[0], w3.eth.accounts[1]
+    assert contract.functions.owner().call() == owner
+
+    for call in admin_calls(contract, variant):
+        with pytest.raises(ContractLogicError):
+            call.transact({'from': other, 'gas': TX_GAS})
+    assert contract.functions.isRevoked(0).call() is False
+
+    for call in admin_calls(contract, variant):
+        assert w3.eth.wait_for_transaction_receipt(call.transact({'from': owner, 'gas': TX_GAS}))['status'] == 1
+    assert contract.functions.isRevoked(0).call() is True
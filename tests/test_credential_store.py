@@ -0,0 +1,91 @@
+import itertools
+import json
+import os
+
+import pytest
+
+import acl_create
+import credential_store
+import streaming
+import token_store
+
+@pytest.fixture
+def store(tmp_path):
+    store = credential_store.CredentialStore(str(tmp_path / 'credentials.db'), base_dir=str(tmp_path))
+    yield store
+    store.close()
+
+def vc_record(i):
+    return {'student_did': f"did:university:student{i}", 'hashed_vc': f"{i:064x}"}
+
+def token(i):
+    acl = acl_create.make_acl_entry(i - 1)
+    return {'student_did': acl['student_did'], 'acl': acl, 'verifiablePresentation': {'verifiableCredential': [{'hash': f"{i:064x}"}]}}
+
+# Modification times one second apart, so every write is seen by the mtime check and the
+# newest source is the one written last, however coarse the file system clock
+MTIMES = itertools.count(1700000000 * 10**9, 10**9)
+
+def touch(path):
+    mtime = next(MTIMES)
+    os.utime(path, ns=(mtime, mtime))
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    touch(path)
+
+def dids(store):
+    return sorted(row[0] for row in store.db.execute('SELECT student_did FROM credentials'))
+
+def test_lookups(tmp_path, store):
+    write_json(tmp_path / 'ipfs.json', {str(i): vc_record(i) for i in range(1, 4)})
+    write_json(tmp_path / 'token.json', {str(i): token(i) for i in range(1, 3)})
+    store.refresh()
+
+    record = store.get('did:university:student1')
+    assert record['hashed_vc'] == record['vp_hashed_vc'] == f"{1:064x}"
+    assert record['status_index'] == 0 and record['is_valid'] == 1
+    assert store.get('did:university:student3')['token_index'] is None
+    assert store.get('did:university:student9') is None
+    assert store.find_by_index(2)['student_did'] == 'did:university:student2'
+    employer = token(2)['acl']['employer_hashed_email']
+    assert [row['student_did'] for row in store.find_by_employer(employer)] == ['did:university:student2']
+
+def test_jsonl_lines_are_imported_as_appended(tmp_path, store):
+    path = str(tmp_path / 'ipfs.jsonl')
+    streaming.append_lines(path, [streaming.dump_line({'index': i, **vc_record(i)}) for i in range(1, 3)])
+    store.refresh()
+    torn = streaming.dump_line({'index': 3, **vc_record(3)})
+    streaming.append_lines(path, [torn[:-5]])
+    store.refresh()
+    assert dids(store) == ['did:university:student1', 'did:university:student2']
+
+    streaming.append_lines(path, [torn[-5:]])
+    store.refresh()
+    assert store.find_by_index(3)['hashed_vc'] == f"{3:064x}"
+
+# A full import of ipfs.json replaces what it imported before, keeping the token data
+def test_rows_removed_from_a_source_are_dropped(tmp_path, store):
+    write_json(tmp_path / 'ipfs.json', {str(i): vc_record(i) for i in range(1, 4)})
+    write_json(tmp_path / 'token.json', {'1': token(1)})
+    store.refresh()
+    write_json(tmp_path / 'ipfs.json', {'1': vc_record(1), '2': vc_record(2)})
+    store.refresh()
+    assert dids(store) == ['did:university:student1', 'did:university:student2']
+
+    write_json(tmp_path / 'ipfs.json', {'2': vc_record(2)})
+    store.refresh()
+    assert dids(store) == ['did:university:student1', 'did:university:student2']
+    assert store.get('did:university:student1')['hashed_vc'] is None
+    assert store.get('did:university:student1')['token_index'] == 1
+
+# Tokens come from the most recently written source; a switch replaces the old source's rows
+def test_source_switch_replaces_the_old_rows(tmp_path, store):
+    write_json(tmp_path / 'token.json', {str(i): token(i) for i in range(1, 4)})
+    store.refresh()
+    write_json(tmp_path / 'small.json', {'1': token(1)})
+    token_store.pack(str(tmp_path / 'small.json'), str(tmp_path / token_store.TOKEN_STORE))
+    touch(tmp_path / token_store.TOKEN_STORE)
+    store.refresh()
+    assert dids(store) == ['did:university:student1']
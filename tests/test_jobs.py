@@ -0,0 +1,152 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+import jobs
+
+# Runner that reports one result per item and sums them
+def run_sum(params, progress):
+    progress.set_total(len(params['items']))
+    for item in params['items']:
+        progress.add_result({'item': item, 'double': item * 2})
+    return {'sum': sum(params['items'])}
+
+def run_failing(params, progress):
+    progress.add_result({'item': 0})
+    raise RuntimeError("node unreachable")
+
+RUNNERS = {'sum': run_sum, 'fail': run_failing}
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+# Function to wait for every job submitted so far to finish
+def drain(manager):
+    manager.executor.shutdown(wait=True)
+
+def test_job_runs_and_keeps_its_results(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path)
+    job_id = manager.submit('sum', {'items': [1, 2, 3]})
+    drain(manager)
+
+    job = manager.get(job_id)
+    assert job['status'] == 'succeeded'
+    assert (job['total'], job['done']) == (3, 3)
+    assert job['params'] == {'items': [1, 2, 3]}
+    assert job['summary'] == {'sum': 6}
+    assert manager.results(job_id) == [(1, {'item': 1, 'double': 2}), (2, {'item': 2, 'double': 4}), (3, {'item': 3, 'double': 6})]
+    assert manager.results(job_id, after=2) == [(3, {'item': 3, 'double': 6})]
+
+def test_failure_is_recorded(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path)
+    job_id = manager.submit('fail', {})
+    drain(manager)
+
+    job = manager.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == "node unreachable"
+    assert job['finished'] is not None
+    assert manager.results(job_id) == [(1, {'item': 0})]
+
+def test_unknown_jobs(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path)
+    with pytest.raises(ValueError):
+        manager.submit('other', {})
+    assert manager.get('missing') is None
+    drain(manager)
+
+def test_queue_full(db_path):
+    release = threading.Event()
+    runners = {'wait': lambda params, progress: release.wait(10)}
+    manager = jobs.JobManager(runners, db_path, workers=1, max_queued=2)
+    try:
+        running = manager.submit('wait', {})
+        while manager.get(running)['status'] != 'running':
+            time.sleep(0.01)
+        manager.submit('wait', {})
+        manager.submit('wait', {})
+        with pytest.raises(jobs.QueueFull):
+            manager.submit('wait', {})
+    finally:
+        release.set()
+        drain(manager)
+
+def test_jobs_survive_a_restart(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path)
+    job_id = manager.submit('sum', {'items': [4]})
+    drain(manager)
+
+    reopened = jobs.JobManager(RUNNERS, db_path)
+    assert reopened.get(job_id)['summary'] == {'sum': 4}
+    assert reopened.results(job_id) == [(1, {'item': 4, 'double': 8})]
+    drain(reopened)
+
+# Function to get the pid of a process that has exited
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+# Function to add a job as a process that is not this one left it
+def add_job(manager, status, owner):
+    job_id = uuid.uuid4().hex
+    manager._execute(
+        "INSERT INTO jobs (job_id, kind, params, status, total, done, created, owner) VALUES (?, 'sum', ?, ?, 0, 0, ?, ?)",
+        (job_id, json.dumps({'items': [5]}), status, time.time(), owner)
+    )
+    return job_id
+
+def test_recover_takes_over_the_jobs_of_a_dead_process(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path, recover=False)
+    owner = dead_pid()
+    running = add_job(manager, 'running', owner)
+    queued = add_job(manager, 'queued', owner)
+    legacy = add_job(manager, 'queued', None)  # from a table without the owner column
+    drain(manager)
+
+    recovering = jobs.JobManager(RUNNERS, db_path)
+    drain(recovering)
+    job = recovering.get(running)
+    assert job['status'] == 'failed'
+    assert job['error'] == "Interrupted: its process exited"
+    assert recovering.get(queued)['status'] == 'succeeded'
+    assert recovering.get(queued)['summary'] == {'sum': 5}
+    assert recovering.get(legacy)['status'] == 'succeeded'
+
+def test_recover_leaves_the_jobs_of_live_processes(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path, recover=False)
+    parent = os.getppid()
+    running = add_job(manager, 'running', parent)
+    queued = add_job(manager, 'queued', parent)
+    drain(manager)
+
+    recovering = jobs.JobManager(RUNNERS, db_path)
+    drain(recovering)
+    assert recovering.get(running)['status'] == 'running'
+    assert recovering.get(queued)['status'] == 'queued'
+
+# Two managers recovering the same jobs run each of them once
+def test_a_job_is_recovered_once(db_path):
+    manager = jobs.JobManager(RUNNERS, db_path, recover=False)
+    owner = dead_pid()
+    queued = [add_job(manager, 'queued', owner) for _ in range(5)]
+    drain(manager)
+
+    managers = [jobs.JobManager(RUNNERS, db_path, recover=False) for _ in range(2)]
+    threads = [threading.Thread(target=m.recover) for m in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for m in managers:
+        drain(m)
+    for job_id in queued:
+        assert managers[0].get(job_id)['status'] == 'succeeded'
+        assert managers[0].results(job_id) == [(1, {'item': 5, 'double': 10})]
@@ -0,0 +1,66 @@
+import pytest
+
+import merkle
+
+# Function to get (index, student_did, hashed_vc) credentials with gaps in the indices
+def credentials(n):
+    return [(index, f"did:university:student{index}", f"{index:064x}") for index in range(0, 3 * n, 3)]
+
+@pytest.mark.parametrize('n', [1, 2, 3, 7, 8, 33])
+def test_every_proof_verifies(tmp_path, n):
+    creds = credentials(n)
+    path = str(tmp_path / 'tree.bin')
+    root, leaf_count = merkle.build_tree(iter(creds), path)
+    assert leaf_count == n
+
+    with merkle.MerkleTree(path) as tree:
+        assert tree.root == root
+        proofs = list(tree.iter_proofs())
+        assert [index for index, _ in proofs] == [index for index, _, _ in creds]
+        for (index, student_did, hashed_vc), (_, proof) in zip(creds, proofs):
+            assert merkle.verify_proof(student_did, hashed_vc, proof, root)
+
+def test_root_matches_an_in_memory_tree(tmp_path):
+    creds = credentials(11)
+    level = [merkle.leaf_hash(did, hashed_vc) for _, did, hashed_vc in creds]
+    while len(level) > 1:
+        level = [merkle.hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    root, _ = merkle.build_tree(creds, str(tmp_path / 'tree.bin'))
+    assert root == level[0]
+
+def test_position_of(tmp_path):
+    path = str(tmp_path / 'tree.bin')
+    merkle.build_tree(credentials(10), path)
+    with merkle.MerkleTree(path) as tree:
+        assert tree.position_of(0) == 0
+        assert tree.position_of(27) == 9
+        assert tree.position_of(4) is None
+        assert tree.position_of(30) is None
+
+def test_tampered_proofs_fail(tmp_path):
+    creds = credentials(9)
+    path = str(tmp_path / 'tree.bin')
+    root, _ = merkle.build_tree(creds, path)
+    index, student_did, hashed_vc = creds[4]
+    with merkle.MerkleTree(path) as tree:
+        proof = tree.proof(tree.position_of(index))
+
+    assert not merkle.verify_proof(student_did, f"{1:064x}", proof, root)
+    assert not merkle.verify_proof("did:university:student999", hashed_vc, proof, root)
+    assert not merkle.verify_proof(student_did, hashed_vc, proof[:-1], root)
+    tampered = [proof[0][:-1] + bytes([proof[0][-1] ^ 1])] + proof[1:]
+    assert not merkle.verify_proof(student_did, hashed_vc, tampered, root)
+
+def test_build_tree_rejects_bad_input(tmp_path):
+    path = str(tmp_path / 'tree.bin')
+    with pytest.raises(ValueError):
+        merkle.build_tree([], path)
+    with pytest.raises(ValueError):
+        merkle.build_tree([(2, 'a', 'b'), (1, 'c', 'd')], path)
+
+def test_not_a_tree_file(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'XXXX' + bytes(8 + 32))
+    with pytest.raises(ValueError):
+        merkle.MerkleTree(str(path))
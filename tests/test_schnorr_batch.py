@@ -0,0 +1,66 @@
+import random
+
+import schnorr_batch
+import schnorr_groups
+from proofs import G, P, make_proof, mixed_proofs, sequential_results
+
+def test_valid_proofs_pass():
+    proofs = [make_proof(i) for i in range(50)]
+    assert all(schnorr_batch.verify_proof(proof, G, P) for proof in proofs)
+    assert schnorr_batch.find_invalid(proofs, G, P) == []
+
+def test_bad_signatures_are_found_by_bisection():
+    bad = {3, 17, 40}
+    proofs = [make_proof(i, valid=i not in bad) for i in range(64)]
+    assert sorted(schnorr_batch.find_invalid(proofs, G, P)) == sorted(bad)
+
+def test_find_invalid_matches_verify_in_order():
+    proofs = mixed_proofs()
+    expected = [i for i, passed in enumerate(sequential_results(proofs)) if not passed]
+    assert schnorr_batch.find_invalid(proofs, G, P) == expected
+
+def test_verified_dids_skip_the_schnorr_check():
+    proof = make_proof(0, valid=False)
+    assert schnorr_batch.find_invalid([proof], G, P) == [0]
+    assert schnorr_batch.find_invalid([proof], G, P, verified_dids={proof[5]}) == []
+
+# A proof that fails on its VC but sets schnorrProofVerified is kept with keep_flag_setters,
+# so the later proof of the same DID still passes once the returned proofs are dropped
+def test_keep_flag_setters():
+    proofs = mixed_proofs()
+    flag_setter = 6
+    assert flag_setter in schnorr_batch.find_invalid(proofs, G, P)
+    kept = schnorr_batch.find_invalid(proofs, G, P, keep_flag_setters=True)
+    assert flag_setter not in kept
+    remaining = [proof for i, proof in enumerate(proofs) if i not in kept]
+    assert sequential_results(remaining) == [i != flag_setter for i in range(len(proofs)) if i not in kept]
+
+def test_multi_exp_matches_pow():
+    rng = random.Random(1)
+    bases = [rng.randrange(1, P) for _ in range(40)]
+    exponents = [rng.getrandbits(64) for _ in bases]
+    expected = 1
+    for base, exponent in zip(bases, exponents):
+        expected = expected * pow(base, exponent, P) % P
+    assert schnorr_batch.multi_exp(bases, exponents, P, 64) == expected
+
+# Proof for verifyInGroup(): g^((s - c*x) mod q) == R
+def group_proof(i, group, valid=True):
+    R, s, c, employer, vp, did, ipfs = make_proof(i)
+    x = schnorr_batch.email_exponent(employer)
+    r = random.Random(i).randrange(1, group.q)
+    s = (r + c * x) % group.q
+    R = group.pow_g(r) if valid else group.pow_g(r + 1)
+    return (R, s, c, employer, vp, did, ipfs)
+
+def test_group_proofs():
+    group = schnorr_groups.get_group('schnorr2048')
+    proofs = [group_proof(i, group, valid=i != 2) for i in range(8)]
+    assert schnorr_batch.find_invalid(proofs, None, None, group=group) == [2]
+
+def test_group_rejects_r_outside_the_subgroup():
+    group = schnorr_groups.get_group('schnorr2048')
+    proofs = [group_proof(i, group) for i in range(8)]
+    R, *rest = proofs[5]
+    proofs[5] = (group.p - R, *rest)  # -R has even order, so it is not in the order-q subgroup
+    assert schnorr_batch.find_invalid(proofs, None, None, group=group) == [5]
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+import pytest
+from cryptography.exceptions import InvalidSignature
+
+from pki import signers
+
+ALGORITHMS = sorted(signers.SIGNERS)
+
+CREDENTIAL = {
+    "@context": ["https://www.w3.org/2018/credentials/v1"],
+    "type": ["VerifiableCredential", "StudentCredential"],
+    "issuer": "did:university:issuer123",
+    "credentialSubject": {"id": "did:university:student1", "name": "John Doe"},
+}
+CREATED = "2024-09-25T20:10:10Z"
+METHOD = "did:university:issuer123#key-1"
+
+@pytest.fixture(scope='module', params=ALGORITHMS)
+def signer(request):
+    signer_class = signers.SIGNERS[request.param]
+    return signer_class(signer_class.generate_key())
+
+def sign(signer, **proof):
+    return signers.sign_credential(CREDENTIAL, signer, METHOD, CREATED, proofPurpose="authentication", **proof)
+
+def test_digest_round_trip(signer):
+    digest = hashlib.sha256(b'transcript').digest()
+    signature = signer.sign_digest(digest)
+    signer.verify_digest(signature, digest)
+    with pytest.raises(InvalidSignature):
+        signer.verify_digest(signature, hashlib.sha256(b'other').digest())
+
+def test_credential_round_trip(signer):
+    signed = sign(signer, challenge="abc", domain="example.com")
+    assert signed['proof']['type'] == signer.proof_type
+    assert 'proof' not in CREDENTIAL
+    assert signers.credential_algorithm(signed) == signer.name
+    signers.verify_credential(signed, signer)
+
+def test_tampered_document_fails(signer):
+    signed = sign(signer)
+    signed['credentialSubject'] = {**signed['credentialSubject'], "name": "Jane Doe"}
+    with pytest.raises(InvalidSignature):
+        signers.verify_credential(signed, signer)
+
+# The proof options are signed with the document, so a proof cannot be moved to another challenge
+@pytest.mark.parametrize('field, value', [('challenge', 'other'), ('domain', 'evil.com'), ('created', '2030-01-01T00:00:00Z')])
+def test_tampered_proof_options_fail(signer, field, value):
+    signed = sign(signer, challenge="abc", domain="example.com")
+    signed['proof'] = {**signed['proof'], field: value}
+    with pytest.raises(InvalidSignature):
+        signers.verify_credential(signed, signer)
+
+def test_bad_signature_fails(signer):
+    signed = sign(signer)
+    header_b64, _, signature_b64 = signed['proof']['jws'].split('.')
+    signature = bytearray(signers.b64url_decode(signature_b64))
+    signature[0] ^= 1
+    signed['proof'] = {**signed['proof'], 'jws': f"{header_b64}..{signers.b64url(bytes(signature))}"}
+    with pytest.raises(InvalidSignature):
+        signers.verify_credential(signed, signer)
+
+def test_other_key_fails(signer):
+    other = type(signer)(type(signer).generate_key())
+    with pytest.raises(InvalidSignature):
+        signers.verify_credential(sign(signer), other)
+
+def test_other_algorithm_is_rejected(signer):
+    other_class = next(signers.SIGNERS[name] for name in ALGORITHMS if name != signer.name)
+    with pytest.raises(ValueError):
+        signers.verify_credential(sign(signer), other_class(other_class.generate_key()))
+
+def test_fixed_proof_keys_cannot_be_overridden(signer):
+    for field in ('type', 'verificationMethod', 'jws'):
+        with pytest.raises(ValueError):
+            sign(signer, **{field: 'x'})
+
+def test_proof_type_is_checked(signer):
+    signed = sign(signer)
+    signed['proof'] = {**signed['proof'], 'type': 'SomeOtherProof'}
+    with pytest.raises(ValueError):
+        signers.verify_credential(signed, signer)
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_load_signer_keeps_its_key(tmp_path, algorithm):
+    key_file = str(tmp_path / f"{algorithm}.pem")
+    signed = sign(signers.load_signer(algorithm, key_file))
+    assert os.stat(key_file).st_mode & 0o777 == 0o600
+    signers.verify_credential(signed, signers.load_signer(algorithm, key_file))
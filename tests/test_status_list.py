@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import credential_store
+import status_list
+from status_list import WORD_BITS, StatusList
+
+def test_set_and_clear():
+    status = StatusList()
+    assert not status.is_revoked(5)
+    assert status.set_revoked([5, 300]) == [0, 1]
+    assert status.is_revoked(5) and status.is_revoked(300)
+    assert not status.is_revoked(6)
+    assert status.set_revoked([5]) == []  # already revoked, no word changed
+    assert status.set_revoked([5], revoked=False) == [0]
+    assert not status.is_revoked(5)
+    assert status.revoked_count() == 1
+
+def test_grows_by_whole_words():
+    status = StatusList()
+    status.set_revoked([WORD_BITS])
+    assert len(status.bits) == 2 * WORD_BITS
+    assert status.word_count() == 2
+
+def test_negative_index_is_rejected():
+    status = StatusList()
+    with pytest.raises(ValueError):
+        status.is_revoked(-1)
+    with pytest.raises(ValueError):
+        status.set_revoked([-1])
+
+# Bit i is bit i % 256 of word i // 256, as the contract's revocationWords
+def test_words_match_the_contract_layout():
+    status = StatusList()
+    status.set_revoked([0, 3, 255, 256 + 7])
+    assert status.word(0) == (1 << 0) | (1 << 3) | (1 << 255)
+    assert status.word(1) == 1 << 7
+    assert status.word(2) == 0
+    assert status.nonzero_words() == [0, 1]
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'status_list.bin')
+    status = StatusList()
+    status.set_revoked([1, 2, 700])
+    status.save(path)
+    loaded = StatusList.load(path)
+    assert loaded.bits == status.bits
+    assert [loaded.word(i) for i in range(loaded.word_count())] == [status.word(i) for i in range(status.word_count())]
+    assert StatusList.load(str(tmp_path / 'missing.bin')).revoked_count() == 0
+
+def test_copy_is_independent():
+    status = StatusList()
+    copy = status.copy()
+    copy.set_revoked([4])
+    assert not status.is_revoked(4)
+
+def token(i, is_valid, status_index=None):
+    acl = {'student_did': f"did:university:student{i}", 'employer_hashed_email': f"{i:064x}", 'expiration': 1687581600, 'isValid': is_valid}
+    if status_index is not None:
+        acl['statusListIndex'] = status_index
+    return {
+        'student_did': acl['student_did'], 'acl': acl,
+        'verifiablePresentation': {'verifiableCredential': [{'hash': f"{i:064x}"}]},
+    }
+
+def test_build_from_store(tmp_path):
+    tokens = {'0': token(1, True), '1': token(2, False), '2': token(3, True), '3': token(4, False, status_index=500)}
+    (tmp_path / 'token.json').write_text(json.dumps(tokens))
+    store = credential_store.CredentialStore(str(tmp_path / 'credentials.db'), base_dir=str(tmp_path))
+    try:
+        store.refresh()
+        status = status_list.build_from_store(store)
+    finally:
+        store.close()
+    assert [i for i in range(len(status.bits)) if status.is_revoked(i)] == [1, 500]
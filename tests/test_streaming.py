@@ -0,0 +1,76 @@
+import json
+
+import acl_create
+import hash_vc
+import streaming
+
+def write_lines(path, records, torn=None):
+    with open(path, 'w') as f:
+        f.writelines(streaming.dump_line(record) for record in records)
+        if torn is not None:
+            f.write(streaming.dump_line(torn)[:-5])
+
+def read_records(path):
+    return list(streaming.iter_jsonl(path))
+
+def test_resume_drops_a_torn_last_line(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    write_lines(path, [{'index': 1}, {'index': 2}], torn={'index': 3})
+    assert streaming.resume_jsonl(path) == {'index': 2}
+    assert read_records(path) == [{'index': 1}, {'index': 2}]
+    assert streaming.resume_jsonl(path) == {'index': 2}
+
+def test_resume_of_missing_or_empty_files(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    assert streaming.resume_jsonl(path) is None
+    write_lines(path, [], torn={'index': 1})
+    assert streaming.resume_jsonl(path) is None
+    assert read_records(path) == []
+
+def test_truncate_keeps_records_up_to_the_predicate(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    write_lines(path, [{'index': i} for i in range(1, 8)], torn={'index': 8})
+    streaming.truncate_jsonl(path, lambda record: record['index'] <= 4)
+    assert read_records(path) == [{'index': i} for i in range(1, 5)]
+
+# Lines longer than the 4096-byte blocks the end of the file is read back in
+def test_truncate_long_lines(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    records = [{'index': i, 'data': 'x' * 10000} for i in range(1, 4)]
+    write_lines(path, records, torn=records[0])
+    assert streaming.resume_jsonl(path) == records[-1]
+    streaming.truncate_jsonl(path, lambda record: record['index'] == 1)
+    assert read_records(path) == records[:1]
+
+# Function to get the contents of acl.jsonl and the payload in the working directory
+def acl_files():
+    contents = []
+    for path in (acl_create.ACL_JSONL, acl_create.PAYLOAD_JSONL):
+        with open(path) as f:
+            contents.append(f.read())
+    return contents
+
+# An interrupted run left acl.jsonl a chunk ahead of the payload, whose last line is cut short.
+# The next run continues after the entries in both, as one uninterrupted run would.
+def test_acl_stream_resumes_after_an_interrupted_run(tmp_path, monkeypatch):
+    (tmp_path / 'clean').mkdir()
+    monkeypatch.chdir(tmp_path / 'clean')
+    acl_create.generate_acl_stream(18, workers=1)
+    expected = acl_files()
+
+    (tmp_path / 'interrupted').mkdir()
+    monkeypatch.chdir(tmp_path / 'interrupted')
+    acl_create.generate_acl_stream(10, workers=1)
+    acl_lines, payload_lines = acl_create.acl_chunk_lines((10, 14))
+    streaming.append_lines(acl_create.ACL_JSONL, acl_lines)
+    streaming.append_lines(acl_create.PAYLOAD_JSONL, payload_lines[:2] + [payload_lines[2][:-5]])
+    acl_create.generate_acl_stream(6, workers=1)
+    assert acl_files() == expected
+
+def test_hashed_vc_stream_resumes_after_a_torn_line(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    hash_vc.store_hashed_vcs_stream(3, workers=1)
+    line = hash_vc.hashed_vc_chunk_lines((4, 5))[0]
+    streaming.append_lines(hash_vc.IPFS_JSONL, [line[:-5]])
+    hash_vc.store_hashed_vcs_stream(3, workers=1)
+    assert read_records(hash_vc.IPFS_JSONL) == [json.loads(line) for line in hash_vc.hashed_vc_chunk_lines((1, 7))]
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+import acl_create
+import streaming
+import token_store
+import vp_gen
+from conftest import ROOT
+
+# Function to get the first n tokens of the shipped token.json, with a token of every record
+# layout appended: a VP that is not the template, an unpacked ACL and an unknown token shape
+def sample_tokens(n=20):
+    with open(os.path.join(ROOT, 'token.json')) as f:
+        tokens = dict(list(json.load(f).items())[:n])
+    base = next(iter(tokens.values()))
+    tokens['9001'] = {**base, 'verifiablePresentation': {**base['verifiablePresentation'], 'holder': 'did:other'}}
+    tokens['9002'] = {**base, 'acl': {**base['acl'], 'note': 'extra key'}}
+    tokens['9003'] = {'student_did': 'did:university:student9003', 'extra': [1, 2, 3]}
+    return tokens
+
+def test_json_round_trip(tmp_path):
+    source = str(tmp_path / 'token.json')
+    with open(source, 'w') as f:
+        json.dump(sample_tokens(), f, indent=4)
+    path = str(tmp_path / 'token.tok')
+    token_store.pack(source, path)
+    output = str(tmp_path / 'exported.json')
+    token_store.export_json(path, output)
+    with open(source) as expected, open(output) as exported:
+        assert exported.read() == expected.read()
+
+def test_jsonl_round_trip(tmp_path):
+    source = str(tmp_path / 'token.jsonl')
+    streaming.append_lines(source, [streaming.dump_line({'index': int(index), **token}) for index, token in sample_tokens().items()])
+    path = str(tmp_path / 'token.tok')
+    token_store.pack(source, path)
+    output = str(tmp_path / 'exported.jsonl')
+    token_store.export_jsonl(path, output)
+    with open(source) as expected, open(output) as exported:
+        assert exported.read() == expected.read()
+
+def test_lookup(tmp_path):
+    tokens = sample_tokens()
+    source = str(tmp_path / 'token.json')
+    with open(source, 'w') as f:
+        json.dump(tokens, f)
+    path = str(tmp_path / 'token.tok')
+    token_store.pack(source, path)
+
+    with token_store.TokenStore(path) as store:
+        assert len(store) == len(tokens)
+        for index in ('0', '19', '9002', '9003'):
+            assert store.get(index).to_dict() == tokens[index]
+        assert store.get(5000) is None
+        token = store.get(3)
+        assert token['acl'] == tokens['3']['acl']
+        assert token.vp_hashed_vc() == tokens['3']['verifiablePresentation']['verifiableCredential'][0]['hash']
+
+def test_not_a_token_store(tmp_path):
+    path = tmp_path / 'token.tok'
+    path.write_bytes(b'NOTATOKENSTORE')
+    with pytest.raises(ValueError):
+        token_store.TokenWriter(str(path))
+
+# Function to write acl.jsonl and ipfs.jsonl for the students in `numbers`, as the --stream
+# generators do; every third student has no hashed VC
+def append_sources(numbers):
+    acl, ipfs = [], []
+    for i in numbers:
+        acl.append(streaming.dump_line(acl_create.make_acl_entry(i)))
+        if i % 3 != 2:
+            ipfs.append(streaming.dump_line({'index': i + 1, 'student_did': f"did:university:student{i + 1}", 'hashed_vc': f"{i:064x}"}))
+    streaming.append_lines(vp_gen.ACL_JSONL, acl)
+    streaming.append_lines(vp_gen.IPFS_JSONL, ipfs)
+
+# The store written in two runs holds the tokens of store_token_vp() for all the entries
+def test_store_tokens_stream_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    append_sources(range(10))
+    token_store.store_tokens_stream()
+    with token_store.TokenStore() as store:
+        first_run = len(store)
+    append_sources(range(10, 25))
+    token_store.store_tokens_stream()
+
+    acl_data = list(streaming.iter_jsonl(vp_gen.ACL_JSONL))
+    ipfs_data = {str(record['index']): record for record in streaming.iter_jsonl(vp_gen.IPFS_JSONL)}
+    vp_gen.store_token_vp(acl_data, ipfs_data)
+    token_store.export_json(token_store.TOKEN_STORE, 'exported.json')
+    with open('token.json') as expected, open('exported.json') as exported:
+        assert exported.read() == expected.read()
+    with token_store.TokenStore() as store:
+        assert first_run < len(store) == len(ipfs_data)
@@ -0,0 +1,60 @@
+import pytest
+from web3.exceptions import ContractLogicError
+
+from proofs import G, P, mixed_proofs, sequential_results
+
+TX_GAS = 50000000
+
+def bitmap_bits(bitmap, n):
+    return [bool((bitmap[i // 256] >> (i % 256)) & 1) for i in range(n)]
+
+def test_mixed_proofs_cover_every_case():
+    assert sequential_results(mixed_proofs()) == [
+        True, True, True, True, False, True, False, True, False, True, True, False
+    ]
+
+# verify() of the contract, sent once per proof, against the off-chain mirror
+@pytest.mark.parametrize('variant', ['debug', 'lean'])
+def test_verify_in_order_matches_mirror(deploy, app_module, variant):
+    w3, contract = deploy(variant, 'verify')
+    sender = w3.eth.accounts[0]
+    proofs = mixed_proofs()
+
+    results = []
+    for proof in proofs:
+        R, s, c, employer, vp, did, ipfs = app_module.contract_proof(proof, variant)
+        call = contract.functions.verify(R, s, G, P, c, employer, vp, did, ipfs)
+        try:
+            results.append(call.call({'from': sender}))
+        except ContractLogicError:
+            results.append(False)
+            continue
+        w3.eth.wait_for_transaction_receipt(call.transact({'from': sender, 'gas': TX_GAS}))
+
+    assert results == sequential_results(proofs)
+
+# One verifyBatch call gives the results of verify() sent once per proof in order, and
+# leaves the same DIDs verified
+@pytest.mark.parametrize('variant', ['debug', 'lean'])
+def test_verify_batch_matches_verify_in_order(deploy, app_module, variant):
+    w3, contract = deploy(variant, 'verifyBatch')
+    sender = w3.eth.accounts[0]
+    proofs = mixed_proofs()
+    batch = [app_module.contract_proof(proof, variant) for proof in proofs]
+
+    call = contract.functions.verifyBatch(batch, G, P)
+    bitmap = call.call({'from': sender, 'gas': TX_GAS})
+    receipt = w3.eth.wait_for_transaction_receipt(call.transact({'from': sender, 'gas': TX_GAS}))
+
+    verified = set()
+    assert receipt['status'] == 1
+    assert bitmap_bits(bitmap, len(proofs)) == sequential_results(proofs, verified=verified)
+    for student_did in {proof[5] for proof in proofs}:
+        assert contract.functions.schnorrProofVerified(app_module.did_key(student_did, variant)).call() == (student_did in verified)
+
+@pytest.mark.parametrize('variant', ['debug', 'lean'])
+def test_verify_batch_refuses_groups_above_128_bits(deploy, app_module, variant):
+    w3, contract = deploy(variant, 'verifyBatch')
+    batch = [app_module.contract_proof(mixed_proofs()[0], variant)]
+    with pytest.raises(ContractLogicError):
+        contract.functions.verifyBatch(batch, G, 2**129 + 51).call({'from': w3.eth.accounts[0], 'gas': TX_GAS})
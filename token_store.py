@@ -0,0 +1,404 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from collections.abc import Mapping
+
+import streaming
+import vp_gen
+
+# Compact storage for the tokens vp_gen.py writes to token.json (ACL entry plus Verifiable
+# Presentation per student). Every VP vp_gen.generate_vp() builds is the same document except
+# for the student's DID and hashed VC, so the VP template is stored once in the file header
+# and each record only holds the varying fields in a binary layout:
+#
+#   token.tok      header: MAGIC, u32 length + template (compact JSON with placeholders),
+#                  then one record per token
+#   token.tok.idx  one (u64 token index, u64 record offset) entry per token, in append order
+#
+# Record: u8 flags, then length-prefixed fields (u16 for short strings, u32 for JSON):
+#   TEMPLATE_VP   DID and hashed VC; the VP is the template filled in with them.
+#                 Without it the VP is stored as JSON.
+#   HASH_BYTES    the hashed VC is lowercase hex, stored as its raw bytes
+#   ACL_PACKED    the ACL has the keys of acl_create.make_acl_entry(): employer hash as
+#                 32 bytes, expiration as i64, isValid as u8, statusListIndex as u32 when
+#                 ACL_STATUS is set. Without it the ACL is stored as JSON.
+#   RAW           anything else: the whole token as JSON
+#
+# A token is loaded with one index lookup and one seek; its VP is only built from the template
+# when it is accessed. export_json() writes back exactly what store_token_vp() writes.
+
+TOKEN_STORE = 'token.tok'
+MAGIC = b'EVTOKEN1'
+
+TEMPLATE_VP = 0x01
+HASH_BYTES = 0x02
+ACL_PACKED = 0x04
+ACL_STATUS = 0x08
+RAW = 0x10
+
+DID_PLACEHOLDER = '@@student_did@@'
+HASH_PLACEHOLDER = '@@hashed_vc@@'
+PLACEHOLDER_RE = re.compile(f'{DID_PLACEHOLDER}|{HASH_PLACEHOLDER}')
+COMPACT = (',', ':')
+
+TOKEN_KEYS = ['student_did', 'acl', 'verifiablePresentation']
+ACL_KEYS = ['student_did', 'employer_hashed_email', 'expiration', 'isValid']
+ACL_KEYS_WITH_STATUS = ACL_KEYS + ['statusListIndex']
+
+INDEX_ENTRY = struct.Struct('<QQ')
+ACL_FIXED = struct.Struct('<32sqB')
+HEX_64 = re.compile('[0-9a-f]{64}')
+
+def index_path(path):
+    return path + '.idx'
+
+# Function to get the VP template of vp_gen.generate_vp() as compact JSON with placeholders
+def current_template():
+    return json.dumps(vp_gen.generate_vp(HASH_PLACEHOLDER, DID_PLACEHOLDER), separators=COMPACT)
+
+# Function to fill in a template; the values are JSON-escaped since they go inside strings
+def fill_template(template, student_did, hashed_vc):
+    values = {DID_PLACEHOLDER: json.dumps(student_did)[1:-1], HASH_PLACEHOLDER: json.dumps(hashed_vc)[1:-1]}
+    return PLACEHOLDER_RE.sub(lambda match: values[match.group(0)], template)
+
+def pack_str(value, length_format='<H'):
+    data = value.encode()
+    return struct.pack(length_format, len(data)) + data
+
+def unpack_str(buffer, offset, length_format='<H'):
+    (length,) = struct.unpack_from(length_format, buffer, offset)
+    offset += struct.calcsize(length_format)
+    return bytes(buffer[offset:offset + length]).decode(), offset + length
+
+def pack_json(value):
+    return pack_str(json.dumps(value, separators=COMPACT), '<I')
+
+def unpack_json(buffer, offset):
+    text, offset = unpack_str(buffer, offset, '<I')
+    return json.loads(text), offset
+
+def packable_acl(acl, student_did):
+    keys = list(acl)
+    return (
+        keys in (ACL_KEYS, ACL_KEYS_WITH_STATUS) and acl['student_did'] == student_did
+        and isinstance(acl['employer_hashed_email'], str) and HEX_64.fullmatch(acl['employer_hashed_email'])
+        and type(acl['expiration']) is int and -2**63 <= acl['expiration'] < 2**63
+        and type(acl['isValid']) is bool
+        and (keys == ACL_KEYS or (type(acl['statusListIndex']) is int and 0 <= acl['statusListIndex'] < 2**32))
+    )
+
+# Function to encode the fields of a token whose VP is the template filled in with
+# (student_did, hashed_vc)
+def encode_fields(student_did, acl, hashed_vc):
+    flags = TEMPLATE_VP
+    fields = [pack_str(student_did)]
+
+    if HEX_64.fullmatch(hashed_vc):
+        flags |= HASH_BYTES
+        fields.append(bytes.fromhex(hashed_vc))
+    else:
+        fields.append(pack_str(hashed_vc))
+
+    if packable_acl(acl, student_did):
+        flags |= ACL_PACKED
+        fields.append(ACL_FIXED.pack(bytes.fromhex(acl['employer_hashed_email']), acl['expiration'], acl['isValid']))
+        if 'statusListIndex' in acl:
+            flags |= ACL_STATUS
+            fields.append(struct.pack('<I', acl['statusListIndex']))
+    else:
+        fields.append(pack_json(acl))
+
+    return bytes([flags]) + b''.join(fields)
+
+# Function to encode any token, using the template where the token allows it
+def encode_token(token, template):
+    if list(token) == TOKEN_KEYS and isinstance(token['student_did'], str):
+        student_did, acl, vp = token['student_did'], token['acl'], token['verifiablePresentation']
+        try:
+            hashed_vc = vp['verifiableCredential'][0]['hash']
+        except (TypeError, KeyError, IndexError):
+            hashed_vc = None
+        if isinstance(hashed_vc, str) and isinstance(acl, dict):
+            if json.dumps(vp, separators=COMPACT) == fill_template(template, student_did, hashed_vc):
+                return encode_fields(student_did, acl, hashed_vc)
+            return bytes([0]) + pack_str(student_did) + pack_json(vp) + pack_json(acl)
+    return bytes([RAW]) + pack_json(token)
+
+# A token read from the store. Behaves like the token dict of token.json; the VP is only
+# materialized from the template when it is accessed.
+class Token(Mapping):
+    def __init__(self, index, template, buffer, offset):
+        self.index = index
+        self.template = template
+        self._raw = None
+        self._vp = None
+        self.hashed_vc = None
+
+        flags = buffer[offset]
+        offset += 1
+        if flags & RAW:
+            self._raw, _ = unpack_json(buffer, offset)
+            self.student_did = self._raw.get('student_did')
+            self.acl = self._raw.get('acl')
+            return
+
+        self.student_did, offset = unpack_str(buffer, offset)
+        if flags & TEMPLATE_VP:
+            if flags & HASH_BYTES:
+                self.hashed_vc = bytes(buffer[offset:offset + 32]).hex()
+                offset += 32
+            else:
+                self.hashed_vc, offset = unpack_str(buffer, offset)
+        else:
+            self._vp, offset = unpack_json(buffer, offset)
+
+        if flags & ACL_PACKED:
+            employer_hash, expiration, is_valid = ACL_FIXED.unpack_from(buffer, offset)
+            offset += ACL_FIXED.size
+            self.acl = {
+                "student_did": self.student_did,
+                "employer_hashed_email": employer_hash.hex(),
+                "expiration": expiration,
+                "isValid": bool(is_valid),
+            }
+            if flags & ACL_STATUS:
+                (self.acl["statusListIndex"],) = struct.unpack_from('<I', buffer, offset)
+        else:
+            self.acl, _ = unpack_json(buffer, offset)
+
+    @property
+    def verifiable_presentation(self):
+        if self._raw is not None:
+            return self._raw.get('verifiablePresentation')
+        if self._vp is None:
+            self._vp = json.loads(fill_template(self.template, self.student_did, self.hashed_vc))
+        return self._vp
+
+    # Function to get the hashed VC of the VP, without materializing it when possible
+    def vp_hashed_vc(self):
+        if self.hashed_vc is not None:
+            return self.hashed_vc
+        return self.verifiable_presentation['verifiableCredential'][0]['hash']
+
+    def to_dict(self):
+        if self._raw is not None:
+            return self._raw
+        return {"student_did": self.student_did, "acl": self.acl, "verifiablePresentation": self.verifiable_presentation}
+
+    def __getitem__(self, key):
+        if self._raw is not None:
+            return self._raw[key]
+        if key == 'student_did':
+            return self.student_did
+        if key == 'acl':
+            return self.acl
+        if key == 'verifiablePresentation':
+            return self.verifiable_presentation
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._raw if self._raw is not None else TOKEN_KEYS)
+
+    def __len__(self):
+        return len(self._raw if self._raw is not None else TOKEN_KEYS)
+
+# Read-only view of a token store, memory-mapped. Entries appended after opening are not seen.
+class TokenStore:
+    def __init__(self, path=TOKEN_STORE):
+        self.path = path
+        self._data_file = open(path, 'rb')
+        self._index_file = open(index_path(path), 'rb')
+        self.data = self._map(self._data_file)
+        self.index = self._map(self._index_file)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a token store")
+        self.template, _ = unpack_str(self.data, len(MAGIC), '<I')
+        self.count = len(self.index) // INDEX_ENTRY.size
+
+    @staticmethod
+    def _map(f):
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for mapped in (self.data, self.index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._data_file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, position):
+        return INDEX_ENTRY.unpack_from(self.index, position * INDEX_ENTRY.size)
+
+    def token_at(self, position):
+        index, offset = self.entry(position)
+        return Token(index, self.template, self.data, offset)
+
+    # Function to find the position of a token index. Indexes are normally consecutive, so
+    # the first guess is direct; otherwise the (ascending) index is binary searched.
+    def position_of(self, index):
+        if self.count == 0:
+            return None
+        first, _ = self.entry(0)
+        guess = index - first
+        if 0 <= guess < self.count and self.entry(guess)[0] == index:
+            return guess
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            middle_index, _ = self.entry(middle)
+            if middle_index == index:
+                return middle
+            if middle_index < index:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    # Function to load one token by its index (the key in token.json), None if missing
+    def get(self, index):
+        position = self.position_of(int(index))
+        return None if position is None else self.token_at(position)
+
+    def tokens(self, start=0):
+        for position in range(start, self.count):
+            yield self.token_at(position)
+
+# Appends tokens to a store, creating it with the current VP template if it does not exist
+class TokenWriter:
+    def __init__(self, path=TOKEN_STORE):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(MAGIC + pack_str(current_template(), '<I'))
+            open(index_path(path), 'wb').close()
+
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a token store")
+            (length,) = struct.unpack('<I', f.read(4))
+            self.template = f.read(length).decode()
+        # Records can only use the template if vp_gen still builds the same VP
+        self.template_current = self.template == current_template()
+
+        self.data = open(path, 'ab')
+        self.index = open(index_path(path), 'ab')
+        self.offset = self.data.tell()
+
+    def close(self):
+        # Records first, so the index never points past the end of the data
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _append(self, index, record):
+        self.data.write(record)
+        self.index.write(INDEX_ENTRY.pack(index, self.offset))
+        self.offset += len(record)
+
+    def append(self, index, token):
+        self._append(int(index), encode_token(token, self.template))
+
+    # Function to append the token store_token_vp() would build for these fields, without
+    # building its VP
+    def append_fields(self, index, student_did, acl, hashed_vc):
+        if self.template_current:
+            self._append(int(index), encode_fields(student_did, acl, hashed_vc))
+        else:
+            self.append(index, {"student_did": student_did, "acl": acl, "verifiablePresentation": vp_gen.generate_vp(hashed_vc, student_did)})
+
+# Function to convert token.json or token.jsonl to a new token store
+def pack(source, path=TOKEN_STORE):
+    for stale in (path, index_path(path)):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    with TokenWriter(path) as writer:
+        if source.endswith('.jsonl'):
+            for record in streaming.iter_jsonl(source):
+                index = record.pop('index')
+                writer.append(index, record)
+        else:
+            with open(source, 'r') as f:
+                tokens = json.load(f)
+            for index, token in tokens.items():
+                writer.append(index, token)
+
+# Function to write the tokens store_token_vp() builds into a new store, without building
+# any VP
+def store_tokens(acl_data, ipfs_data, path=TOKEN_STORE):
+    for stale in (path, index_path(path)):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    with TokenWriter(path) as writer:
+        for index, student in enumerate(acl_data):
+            hashed_vc = ipfs_data.get(str(index + 1), {}).get('hashed_vc', None)
+            if hashed_vc:
+                writer.append_fields(index + 1, student['student_did'], student, hashed_vc)
+    print(f"Token data with ACL and VP successfully stored in {path}.")
+
+# Function to append the tokens of acl.jsonl and ipfs.jsonl to the store, continuing after
+# the last token already in it (the compact counterpart of vp_gen.store_token_vp_stream)
+def store_tokens_stream(path=TOKEN_STORE):
+    start = 1
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with TokenStore(path) as store:
+            if len(store):
+                start = store.entry(len(store) - 1)[0] + 1
+
+    count = 0
+    with TokenWriter(path) as writer:
+        for token_index, student, hashed_vc in vp_gen.iter_acl_with_hashed_vc(start):
+            writer.append_fields(token_index, student['student_did'], student, hashed_vc)
+            count += 1
+    print(f"{count} tokens with ACL and VP appended to {path}.")
+
+# Function to write a store back as token.json, byte for byte what json.dump(tokens,
+# indent=4) writes, one token at a time
+def export_json(path, output):
+    with TokenStore(path) as store, open(output, 'w') as out:
+        if len(store) == 0:
+            out.write('{}')
+            return
+        out.write('{')
+        for position, token in enumerate(store.tokens()):
+            body = json.dumps(token.to_dict(), indent=4).replace('\n', '\n    ')
+            out.write(('\n    ' if position == 0 else ',\n    ') + json.dumps(str(token.index)) + ': ' + body)
+        out.write('\n}')
+
+# Function to write a store back as token.jsonl, as vp_gen.py --stream writes it
+def export_jsonl(path, output):
+    with TokenStore(path) as store, open(output, 'w') as out:
+        for token in store.tokens():
+            out.write(streaming.dump_line({"index": token.index, **token.to_dict()}))
+
+if __name__ == "__main__":
+    # python token_store.py pack token.json         token.json (or .jsonl) -> token.tok
+    # python token_store.py export token.json       token.tok -> token.json (or .jsonl)
+    command, target = sys.argv[1], sys.argv[2]
+    if command == 'pack':
+        pack(target)
+        print(f"Packed {target} into {TOKEN_STORE} ({os.path.getsize(TOKEN_STORE)} bytes).")
+    elif command == 'export':
+        (export_jsonl if target.endswith('.jsonl') else export_json)(TOKEN_STORE, target)
+        print(f"Exported {TOKEN_STORE} to {target}.")
+    else:
+        raise SystemExit(f"Unknown command: {command}")
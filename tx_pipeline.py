@@ -0,0 +1,104 @@
+import asyncio
+from web3 import AsyncWeb3
+from web3.exceptions import TimeExhausted
+
+from instrumentation import log
+
+# Gas price bump used when a dropped transaction is re-sent with the same nonce
+REPLACEMENT_GAS_PRICE_BUMP = 1.125
+
+# Function to send a transaction, retrying when the node rejects or fails the request
+async def send_with_retry(aw3, tx, max_retries, backoff=0.5):
+    for attempt in range(max_retries + 1):
+        try:
+            return await aw3.eth.send_transaction(tx)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            log.warning("Sending transaction with nonce %s failed (%s), retrying", tx['nonce'], e)
+            await asyncio.sleep(backoff * (attempt + 1))
+
+# Function to wait for the receipt of a transaction, re-sending it with the same nonce if it was dropped
+async def wait_or_resend(aw3, tx, tx_hash, max_retries, receipt_timeout):
+    sent_hashes = [tx_hash]
+    for attempt in range(max_retries + 1):
+        try:
+            return await aw3.eth.wait_for_transaction_receipt(sent_hashes[-1], timeout=receipt_timeout)
+        except TimeExhausted:
+            # An earlier attempt with the same nonce may have been mined in the meantime
+            for earlier_hash in sent_hashes[:-1]:
+                try:
+                    return await aw3.eth.get_transaction_receipt(earlier_hash)
+                except Exception:
+                    pass
+
+            if attempt == max_retries:
+                raise
+
+            log.warning("Transaction with nonce %s was dropped, re-sending", tx['nonce'])
+            tx = dict(tx, gasPrice=int(tx['gasPrice'] * REPLACEMENT_GAS_PRICE_BUMP))
+            sent_hashes.append(await send_with_retry(aw3, tx, max_retries))
+
+# Function to send pre-encoded contract calls from one account with locally assigned nonces.
+# Transactions are sent in nonce order while up to `window` of them wait for their receipts
+# concurrently. Returns the receipts in the same order as `payloads`.
+async def send_pipelined(rpc_url, sender, to, payloads, gas, window=32, max_retries=3, receipt_timeout=120):
+    if window < 1:
+        raise ValueError(f"window must be at least 1, got {window}")
+    aw3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url, request_kwargs={'timeout': 500}))
+
+    # Everything the node would otherwise fill in per transaction is fetched once
+    nonce = await aw3.eth.get_transaction_count(sender, 'pending')
+    gas_price = await aw3.eth.gas_price
+    chain_id = await aw3.eth.chain_id
+
+    in_flight = asyncio.Semaphore(window)
+
+    async def track(tx, tx_hash):
+        try:
+            return await wait_or_resend(aw3, tx, tx_hash, max_retries, receipt_timeout)
+        finally:
+            in_flight.release()
+
+    tasks = []
+    try:
+        for i, data in enumerate(payloads):
+            await in_flight.acquire()
+            tx = {
+                'from': sender, 'to': to, 'data': data, 'value': 0,
+                'gas': gas, 'gasPrice': gas_price, 'chainId': chain_id, 'nonce': nonce + i
+            }
+            try:
+                tx_hash = await send_with_retry(aw3, tx, max_retries)
+            except Exception:
+                in_flight.release()
+                raise
+            tasks.append(asyncio.create_task(track(tx, tx_hash)))
+
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await aw3.provider.disconnect()
+
+# Function to send pre-encoded contract calls from one account with locally assigned nonces,
+# without waiting for any receipt. Returns the transaction hashes in the order of `payloads`.
+# Transactions of one sender are mined in nonce order, so once the last one has a receipt
+# all of them are mined. Dropped transactions are not re-sent here.
+async def send_all(rpc_url, sender, to, payloads, gas, max_retries=3):
+    aw3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url, request_kwargs={'timeout': 500}))
+    try:
+        nonce = await aw3.eth.get_transaction_count(sender, 'pending')
+        gas_price = await aw3.eth.gas_price
+        chain_id = await aw3.eth.chain_id
+
+        tx_hashes = []
+        for i, data in enumerate(payloads):
+            tx = {
+                'from': sender, 'to': to, 'data': data, 'value': 0,
+                'gas': gas, 'gasPrice': gas_price, 'chainId': chain_id, 'nonce': nonce + i
+            }
+            tx_hashes.append(await send_with_retry(aw3, tx, max_retries))
+        return tx_hashes
+    finally:
+        await aw3.provider.disconnect()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+# In-memory cache of successful verifications, so verifying the same credential for the same
+# employer again is answered without a new transaction. An entry lives until the ACL entry
+# expires, and never longer than max_ttl, which bounds how long an on-chain change made
+# outside this app can go unnoticed. Lookups compare the cached ACL state with the current one,
+# so an entry is dropped as soon as isValid or the expiration changes. When full, the least
+# recently used entry is evicted.
+
+MAX_ENTRIES = 100000
+MAX_TTL = 300  # seconds
+
+class VerificationCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_ttl=MAX_TTL):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, state)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # dropped to stay under max_entries
+        self.expirations = 0  # dropped because their TTL ran out
+        self.invalidations = 0  # dropped because the ACL or on-chain state changed
+
+    # Function to check whether `key` is cached with the given ACL state. `state` is a tuple
+    # such as (expiration, is_valid, vp_hashed_vc); a different state drops the entry.
+    def get(self, key, state, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+
+            expires_at, cached_state = entry
+            if cached_state != state:
+                del self.entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return False
+            if now >= expires_at:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    # Function to cache a successful verification until `expiration` (a Unix time). Nothing is
+    # cached for an ACL entry that is invalid or already expired.
+    def put(self, key, state, expiration, is_valid, now=None):
+        now = now if now is not None else time.time()
+        if not is_valid or expiration <= now:
+            return False
+        with self.lock:
+            self.entries[key] = (min(expiration, now + self.max_ttl), state)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    # Function to drop every entry whose key matches `predicate`, e.g. all entries of one DID
+    def invalidate(self, predicate):
+        with self.lock:
+            stale = [key for key in self.entries if predicate(key)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
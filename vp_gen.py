@@ -1,4 +1,10 @@
 import json
+import sys
+import streaming
+
+ACL_JSONL = 'acl.jsonl'
+IPFS_JSONL = 'ipfs.jsonl'
+TOKEN_JSONL = 'token.jsonl'
 
 # Function to load ACL data from acl.json
 def load_acl_data():
@@ -83,8 +89,60 @@ def store_token_vp(acl_data, ipfs_data):
 
     print("Token data with ACL and VP successfully created in token.json.")
 
+# Function to pair every ACL entry with its hashed VC (ipfs index = ACL position + 1) while
+# reading both JSON Lines files only once; both are in ascending order
+def iter_acl_with_hashed_vc(start):
+    ipfs_records = streaming.iter_jsonl(IPFS_JSONL)
+    ipfs_record = next(ipfs_records, None)
+
+    for index, student in enumerate(streaming.iter_jsonl(ACL_JSONL)):
+        token_index = index + 1
+        if token_index < start:
+            continue
+        while ipfs_record is not None and ipfs_record['index'] < token_index:
+            ipfs_record = next(ipfs_records, None)
+        if ipfs_record is not None and ipfs_record['index'] == token_index:
+            yield token_index, student, ipfs_record['hashed_vc']
+
+# Worker function for the streaming mode: token.jsonl lines for a chunk of ACL entries
+def token_chunk_lines(chunk):
+    return [
+        streaming.dump_line({
+            "index": token_index,
+            "student_did": student['student_did'],
+            "acl": student,
+            "verifiablePresentation": generate_vp(hashed_vc, student['student_did'])
+        })
+        for token_index, student, hashed_vc in chunk
+    ]
+
+# Function to build tokens from acl.jsonl and ipfs.jsonl and append them to token.jsonl,
+# continuing after the last token already in the file
+def store_token_vp_stream(workers=None):
+    last_token = streaming.resume_jsonl(TOKEN_JSONL)
+    start = last_token["index"] + 1 if last_token else 1
+
+    count = 0
+    chunks = streaming.chunked(iter_acl_with_hashed_vc(start))
+    for lines in streaming.parallel_map(token_chunk_lines, chunks, workers):
+        streaming.append_lines(TOKEN_JSONL, lines)
+        count += len(lines)
+
+    print(f"{count} tokens with ACL and VP appended to {TOKEN_JSONL}.")
+
 
 if __name__ == "__main__":
-    acl_data = load_acl_data()  # Load ACL from acl.json
-    ipfs_data = load_hashed_vcs()  # Load hashed VCs from ipfs.json
-    store_token_vp(acl_data, ipfs_data)    # Store the ACL and VP in token.json
+    # --compact writes token.tok (token_store.py) instead, with the VP template stored once
+    if '--compact' in sys.argv:
+        import token_store
+        if '--stream' in sys.argv:
+            token_store.store_tokens_stream()
+        else:
+            token_store.store_tokens(load_acl_data(), load_hashed_vcs())
+    # --stream reads and appends JSON Lines incrementally using all CPU cores
+    elif '--stream' in sys.argv:
+        store_token_vp_stream()
+    else:
+        acl_data = load_acl_data()  # Load ACL from acl.json
+        ipfs_data = load_hashed_vcs()  # Load hashed VCs from ipfs.json
+        store_token_vp(acl_data, ipfs_data)    # Store the ACL and VP in token.json